@@ -37,6 +37,10 @@ _S: Dict[str, Any] = _load_settings(SETTINGS_PATH)
 # ---- Requeridos de Telegram (desde .env)
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+# Secreto del webhook (cabecera X-Telegram-Bot-Api-Secret-Token; notifier.webhook)
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+# Base de la Bot API (p. ej. un utils.fake_telegram local para pruebas de carga)
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "") or str(_S.get("TELEGRAM_API_BASE", "https://api.telegram.org"))
 
 # ---- Parámetros (con defaults sanos)
 # Nota: si existen en _S, los sobreescribimos; si no, usamos el default.
@@ -1,14 +1,17 @@
 # data/symbols.py
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 import time
-import requests
+
+import utils.data_loader as data_loader
 
 # ───────────────────────── Config locales ─────────────────────────
-_BINANCE_SPOT_EXCHANGEINFO = "https://api.binance.com/api/v3/exchangeInfo"
-_BINANCE_FUT_EXCHANGEINFO  = "https://fapi.binance.com/fapi/v1/exchangeInfo"
-_BINANCE_FUT_TICKER_24H    = "https://fapi.binance.com/fapi/v1/ticker/24hr"
+# Las URLs se resuelven con los bases de utils.data_loader (fallback entre
+# dominios, overridables por entorno y record/replay vía utils.snapshot).
+_BINANCE_SPOT_EXCHANGEINFO = data_loader.SPOT_EXCHANGEINFO_PATH
+_BINANCE_FUT_EXCHANGEINFO  = data_loader.FAPI_EXCHANGEINFO_PATH
+_BINANCE_FUT_TICKER_24H    = data_loader.FAPI_TICKER_24H_PATH
 
 # Caché simple en memoria
 _CACHE: dict = {
@@ -18,16 +21,15 @@ _CACHE: dict = {
 CACHE_TTL_SEC = 15 * 60  # 15 min
 
 
-def _get_json(url: str, timeout: int = 12) -> dict:
-    resp = requests.get(url, timeout=timeout)
-    resp.raise_for_status()
-    return resp.json()
+def _get_json(path: str, timeout: int = 12) -> dict:
+    bases = data_loader.SPOT_BASES if path.startswith("/api/") else data_loader.FAPI_BASES
+    return data_loader._http_get_first_ok(bases, path, {}, timeout=(5.0, float(timeout)))
 
 
 def _get_futures_exchange_info() -> dict:
     now = time.time()
     item = _CACHE["fut_exchange_info"]
-    if item["data"] is not None and (now - item["ts"] < CACHE_TTL_SEC):
+    if item["data"] is not None and (now - item["ts"] < CACHE_TTL_SEC) and data_loader.snapshot.active() is None:
         return item["data"]
     data = _get_json(_BINANCE_FUT_EXCHANGEINFO)
     _CACHE["fut_exchange_info"] = {"ts": now, "data": data}
@@ -37,7 +39,7 @@ def _get_futures_exchange_info() -> dict:
 def _get_spot_exchange_info() -> dict:
     now = time.time()
     item = _CACHE["spot_exchange_info"]
-    if item["data"] is not None and (now - item["ts"] < CACHE_TTL_SEC):
+    if item["data"] is not None and (now - item["ts"] < CACHE_TTL_SEC) and data_loader.snapshot.active() is None:
         return item["data"]
     data = _get_json(_BINANCE_SPOT_EXCHANGEINFO)
     _CACHE["spot_exchange_info"] = {"ts": now, "data": data}
@@ -64,12 +66,26 @@ def get_usdt_futures_universe(limit: Optional[int] = None) -> List[str]:
     return symbols
 
 
+def get_quote_volumes() -> Dict[str, float]:
+    """
+    Volumen 24h en USDT (quoteVolume) por símbolo de Futures, de una sola
+    petición a /fapi/v1/ticker/24hr. Sin caché: cambia en cada escaneo.
+    """
+    rows = _get_json(_BINANCE_FUT_TICKER_24H)
+    out: Dict[str, float] = {}
+    for t in rows if isinstance(rows, list) else []:
+        try:
+            out[str(t["symbol"])] = float(t.get("quoteVolume") or 0.0)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return out
+
+
 # ───────────────────────── Compatibilidad (Spot) ─────────────────────────
 # Mantengo tu función original por si la usas en otra parte.
-try:
+# python-binance sólo para el hint: importarlo cuesta ~0.5 s en el arranque.
+if TYPE_CHECKING:
     from binance.client import Client  # type: ignore
-except Exception:
-    Client = object  # fallback para hints
 
 
 def obtener_top_usdt(client: Client, limit: int | None = None) -> list[str]:
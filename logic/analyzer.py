@@ -15,7 +15,7 @@ Próximo archivo según tu plan: notifier/sender.py
 
 from __future__ import annotations
 import logging
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, Iterable
 from types import SimpleNamespace
 from math import isfinite
 
@@ -25,10 +25,12 @@ import ta
 
 import config
 from logic.levels import compute_levels
+from logic.score_model import get_model
 from logic.scorer import inferir_bias  # mantenemos sólo el sesgo (score interno no se usa aquí)
-from utils.logger import get_audit_logger
+from utils import metrics
 
-audit_logger = get_audit_logger()
+# El handler a fichero (audit.log) lo instala main._init_runtime(), no el import
+audit_logger = logging.getLogger("audit")
 
 # Parámetros base
 ATR_PERIOD = 14
@@ -217,71 +219,134 @@ def _calc_rr(entry: float, sl: float, sp: float, side: str) -> float:
         return 0.0
 
 
+# Scorer v2 declarativo: factores, bandas y pesos en DEFAULT_MODELS["signal_v2"]
+# (logic.score_model; overrides en SCORING_MODELS de settings.json), compilado una vez (logic.score_model). Los componentes van
+# normalizados a 0..1 (o flags), así el backtest/sweep puede recombinarlos sin
+# recalcular.
+_V2_MODEL = get_model("signal_v2")
+SCORE_V2_WEIGHTS: Dict[str, float] = _V2_MODEL.weights
+
+# Componente → bloque de factores que se reporta
+_SCORE_V2_BLOCKS: Dict[str, str] = _V2_MODEL.blocks
+
+_TREND_CODE = {"Alcista": 1, "Bajista": -1}
+
+
+def _v2_refs(cfg) -> Dict[str, float]:
+    return {
+        "MAX_ATR_PCT": float(getattr(cfg, "MAX_ATR_PCT", 0.10) or 0.10),
+        "VOLUMEN_MINIMO_USDT": float(getattr(cfg, "VOLUMEN_MINIMO_USDT", 25_000_000) or 25_000_000),
+    }
+
+
 def _score_signal_v2(feat: dict, cfg) -> tuple[float, Dict[str, float], str]:
     """
-    Scorer v2 enfocado en calidad:
+    Scorer v2 enfocado en calidad (modelo "signal_v2"):
     - Pondera tendencia+ADX, R:R y liquidez
     - Penaliza volatilidad (ATR%) cerca del límite
     - Bonus leve si volumen ↑ 3d; penalización si consolidando
     Devuelve (score 0..100, factores_por_bloque, etiqueta)
     """
     side = str(feat.get("bias", "LONG")).upper()
-    rr   = _calc_rr(feat.get("entry"), feat.get("sl"), feat.get("sp"), side)
-
-    adx         = float(feat.get("adx", 0.0) or 0.0)
-    atr_pct     = float(feat.get("atr_pct", 0.0) or 0.0)
-    vol_usdt    = float(feat.get("vol_usdt_24h", feat.get("volume_usdt_24h", 0.0)) or 0.0)
-    vol3_up     = bool(feat.get("vol_3d_up", False))
-    tendencia   = feat.get("trend", "Lateral")  # 'Alcista' | 'Bajista' | 'Lateral'
-    consolidando = bool(feat.get("consolidando", False))
-    regime_align = bool(feat.get("regime_align", True))
-
-    # Ponderaciones
-    factors: Dict[str, float] = dict(trend=0.0, risk_reward=0.0, volatility=0.0, volume=0.0, momentum=0.0)
-
-    # (1) Alineación con BTC/ETH (momentum)
-    factors["momentum"] += (10.0 if regime_align else -8.0)
-
-    # (2) Tendencia base + ADX
-    if tendencia in ("Alcista", "Bajista"):
-        factors["trend"] += 20.0
-    elif tendencia == "Lateral":
-        factors["trend"] += 8.0
-
-    adx_norm = max(0.0, min(1.0, (adx - 12.0) / (32.0 - 12.0)))  # 12→0, 32→1
-    factors["trend"] += 15.0 * adx_norm
-
-    # (3) R:R (cap a 3R)
-    rr_c = max(0.0, min(rr, 3.0))
-    factors["risk_reward"] += (rr_c / 3.0) * 18.0
-
-    # (4) Volatilidad (penalización)
-    atr_cap = float(getattr(cfg, "MAX_ATR_PCT", 0.10) or 0.10)
-    if atr_cap > 0:
-        atr_ratio = min(1.0, atr_pct / atr_cap)  # 0..1
-        factors["volatility"] += -10.0 * (atr_ratio ** 1.5)
-
-    # (5) Liquidez
-    vmin = float(getattr(cfg, "VOLUMEN_MINIMO_USDT", 25_000_000) or 25_000_000)
-    if vol_usdt > 0 and vmin > 0:
-        v_ratio = max(0.0, min(2.0, vol_usdt / vmin))  # cap 2x
-        factors["volume"] += 12.0 * (v_ratio / 2.0)
-
-    # (6) Volumen creciente 3d (+3)
-    if vol3_up:
-        factors["volume"] += 3.0
-
-    # (7) Consolidación (-6) lo tratamos como "momentum"
-    if consolidando:
-        factors["momentum"] += -6.0
-
-    # Suma y clamp
-    score = sum(factors.values())
-    score = max(0.0, min(100.0, score))
+    features = {
+        "rr": _calc_rr(feat.get("entry"), feat.get("sl"), feat.get("sp"), side),
+        "adx": float(feat.get("adx", 0.0) or 0.0),
+        "atr_pct": float(feat.get("atr_pct", 0.0) or 0.0),
+        "vol_usdt": float(feat.get("vol_usdt_24h", feat.get("volume_usdt_24h", 0.0)) or 0.0),
+        "vol_3d_up": bool(feat.get("vol_3d_up", False)),
+        "trend": _TREND_CODE.get(feat.get("trend", "Lateral"), 0),  # 'Alcista' | 'Bajista' | 'Lateral'
+        "consolidando": bool(feat.get("consolidando", False)),
+        "regime_align": bool(feat.get("regime_align", True)),
+    }
+    score, factors = _V2_MODEL.evaluate_one(features, side, refs=_v2_refs(cfg))
     tag = f"{score:.4f}/100 | Bias: {side}"
     return score, factors, tag
 
 
+def _rr_arrays(side: np.ndarray, entry: np.ndarray, sl: np.ndarray, sp: np.ndarray) -> np.ndarray:
+    """R:R como _calc_rr sobre arrays (0 si no es finito o entry<=0)."""
+    is_long = np.asarray(side) >= 0
+    risk = np.where(is_long, np.maximum(entry - sl, 1e-12), np.maximum(sl - entry, 1e-12))
+    reward = np.where(is_long, np.maximum(sp - entry, 0.0), np.maximum(entry - sp, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rr = reward / risk
+    return np.where(np.isfinite(rr) & (rr > 0) & (entry > 0), rr, 0.0)
+
+
+def _score_v2_components(
+    side: np.ndarray,
+    entry: np.ndarray,
+    sl: np.ndarray,
+    sp: np.ndarray,
+    adx: np.ndarray,
+    atr_pct: np.ndarray,
+    vol_usdt: np.ndarray,
+    vol_3d_up: np.ndarray,
+    trend: np.ndarray,
+    consolidando: np.ndarray,
+    regime_align: np.ndarray,
+    atr_cap: float,
+    vmin: float,
+    only: Optional[Iterable[str]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Componentes normalizados del scorer v2 (claves de SCORE_V2_WEIGHTS).
+    - side: +1 LONG / -1 SHORT
+    - trend: +1 Alcista / -1 Bajista / 0 Lateral
+    - only: calcula sólo esos factores (el sweep reutiliza el resto)
+    """
+    entry = np.asarray(entry, dtype=float)
+    rr = _rr_arrays(side, entry, np.asarray(sl, dtype=float), np.asarray(sp, dtype=float))
+    features = {
+        "rr": rr,
+        "adx": np.asarray(adx, dtype=float),
+        "atr_pct": np.asarray(atr_pct, dtype=float),
+        "vol_usdt": np.asarray(vol_usdt, dtype=float),
+        "vol_3d_up": np.asarray(vol_3d_up, dtype=bool),
+        "trend": np.asarray(trend),
+        "consolidando": np.asarray(consolidando, dtype=bool),
+        "regime_align": np.asarray(regime_align, dtype=bool),
+    }
+    return _V2_MODEL.components(
+        features, side, refs={"MAX_ATR_PCT": atr_cap, "VOLUMEN_MINIMO_USDT": vmin}, only=only,
+    )
+
+
+def _score_v2_combine(
+    comp: Dict[str, np.ndarray],
+    weights: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Pondera los componentes → (score 0..100, factores_por_bloque)."""
+    return _V2_MODEL.combine(comp, weights)
+
+
+def _score_signal_v2_arrays(
+    side: np.ndarray,
+    entry: np.ndarray,
+    sl: np.ndarray,
+    sp: np.ndarray,
+    adx: np.ndarray,
+    atr_pct: np.ndarray,
+    vol_usdt: np.ndarray,
+    vol_3d_up: np.ndarray,
+    trend: np.ndarray,
+    consolidando: np.ndarray,
+    regime_align: np.ndarray,
+    cfg,
+    weights: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Mismo cálculo que _score_signal_v2 sobre arrays (una fila por señal).
+    Devuelve (score 0..100, factores_por_bloque) como arrays.
+    """
+    comp = _score_v2_components(
+        side, entry, sl, sp, adx, atr_pct, vol_usdt, vol_3d_up, trend, consolidando, regime_align,
+        atr_cap=float(getattr(cfg, "MAX_ATR_PCT", 0.10) or 0.10),
+        vmin=float(getattr(cfg, "VOLUMEN_MINIMO_USDT", 25_000_000) or 25_000_000),
+    )
+    return _score_v2_combine(comp, weights)
+
+
 # ------------------------ Macro (opcional) ------------------------ #
 
 def _get_macro_risk(cfg) -> Optional[Tuple[float, Dict[str, Any]]]:
@@ -313,10 +378,12 @@ def analizar_simbolo(
     klines_w,  # velas semanales (lista de listas o DF)
     btc_alcista: bool,
     eth_alcista: bool,
+    min_score: Optional[float] = None,  # None → MIN_SCORE_ALERTA
 ) -> Optional[Tuple[Any, float, dict, None]]:
     # 1) Dataframes + mínimos
-    df_d = _klines_to_df(klines_d)
-    df_w = _klines_to_df(klines_w)
+    with metrics.timer("analyzer.klines_to_df"):
+        df_d = _klines_to_df(klines_d)
+        df_w = _klines_to_df(klines_w)
     if df_d.empty or df_w.empty:
         audit_logger.info(f"{symbol} descartado: df vacío (D/W).")
         return None
@@ -330,41 +397,42 @@ def analizar_simbolo(
     close_w = df_w["close"]
 
     # 2) Indicadores base
-    try:
-        rsi_1d = ta.momentum.RSIIndicator(close_d, RSI_PERIOD).rsi().iloc[-1]
-        rsi_1w = ta.momentum.RSIIndicator(close_w, RSI_PERIOD).rsi().iloc[-1]
-
-        macd_obj = ta.trend.MACD(close_d)
-        macd_1d = macd_obj.macd().iloc[-1]
-        macd_signal_1d = macd_obj.macd_signal().iloc[-1]
-
-        ema20_d = ta.trend.EMAIndicator(close_d, EMA_FAST).ema_indicator().iloc[-1]
-        ema50_d = ta.trend.EMAIndicator(close_d, EMA_SLOW).ema_indicator().iloc[-1]
-        ema200_d = ta.trend.EMAIndicator(close_d, EMA_LONG).ema_indicator().iloc[-1]
-
-        ema20_w = ta.trend.EMAIndicator(close_w, EMA_FAST).ema_indicator().iloc[-1]
-        ema50_w = ta.trend.EMAIndicator(close_w, EMA_SLOW).ema_indicator().iloc[-1]
-
-        atr_series = ta.volatility.AverageTrueRange(
-            df_d["high"], df_d["low"], close_d, ATR_PERIOD
-        ).average_true_range()
-        atr = float(atr_series.iloc[-1])
-
-        mfi = ta.volume.MFIIndicator(
-            df_d["high"], df_d["low"], close_d, df_d["volume"], RSI_PERIOD
-        ).money_flow_index().iloc[-1]
-        obv = ta.volume.OnBalanceVolumeIndicator(
-            close_d, df_d["volume"]
-        ).on_balance_volume().iloc[-1]
-        adx = ta.trend.ADXIndicator(
-            df_d["high"], df_d["low"], close_d, RSI_PERIOD
-        ).adx().iloc[-1]
-        bb = ta.volatility.BollingerBands(close_d, window=BB_PERIOD, window_dev=2.0)
-        boll_upper = bb.bollinger_hband().iloc[-1]
-        boll_lower = bb.bollinger_lband().iloc[-1]
-    except Exception as e:
-        audit_logger.info(f"{symbol} descartado: error indicadores ({e}).")
-        return None
+    with metrics.timer("analyzer.indicators"):
+        try:
+            rsi_1d = ta.momentum.RSIIndicator(close_d, RSI_PERIOD).rsi().iloc[-1]
+            rsi_1w = ta.momentum.RSIIndicator(close_w, RSI_PERIOD).rsi().iloc[-1]
+
+            macd_obj = ta.trend.MACD(close_d)
+            macd_1d = macd_obj.macd().iloc[-1]
+            macd_signal_1d = macd_obj.macd_signal().iloc[-1]
+
+            ema20_d = ta.trend.EMAIndicator(close_d, EMA_FAST).ema_indicator().iloc[-1]
+            ema50_d = ta.trend.EMAIndicator(close_d, EMA_SLOW).ema_indicator().iloc[-1]
+            ema200_d = ta.trend.EMAIndicator(close_d, EMA_LONG).ema_indicator().iloc[-1]
+
+            ema20_w = ta.trend.EMAIndicator(close_w, EMA_FAST).ema_indicator().iloc[-1]
+            ema50_w = ta.trend.EMAIndicator(close_w, EMA_SLOW).ema_indicator().iloc[-1]
+
+            atr_series = ta.volatility.AverageTrueRange(
+                df_d["high"], df_d["low"], close_d, ATR_PERIOD
+            ).average_true_range()
+            atr = float(atr_series.iloc[-1])
+
+            mfi = ta.volume.MFIIndicator(
+                df_d["high"], df_d["low"], close_d, df_d["volume"], RSI_PERIOD
+            ).money_flow_index().iloc[-1]
+            obv = ta.volume.OnBalanceVolumeIndicator(
+                close_d, df_d["volume"]
+            ).on_balance_volume().iloc[-1]
+            adx = ta.trend.ADXIndicator(
+                df_d["high"], df_d["low"], close_d, RSI_PERIOD
+            ).adx().iloc[-1]
+            bb = ta.volatility.BollingerBands(close_d, window=BB_PERIOD, window_dev=2.0)
+            boll_upper = bb.bollinger_hband().iloc[-1]
+            boll_lower = bb.bollinger_lband().iloc[-1]
+        except Exception as e:
+            audit_logger.info(f"{symbol} descartado: error indicadores ({e}).")
+            return None
 
     # 3) Filtros rápidos
     precio = float(close_d.iloc[-1])
@@ -454,16 +522,17 @@ def analizar_simbolo(
         pass
     df_levels["ATR"] = atr_series
     try:
-        levels = compute_levels(
-            df=df_levels,
-            bias=bias,
-            atr_sl_mult=getattr(config, "ATR_SL_MULT", 1.8),
-            tp_r_mult=getattr(config, "TP_R_MULT", 2.0),
-            swing_lookback=getattr(config, "SWING_LOOKBACK", 14),
-            tick_size=None,
-            atr_period=ATR_PERIOD,
-            max_atr_pct=getattr(config, "MAX_ATR_PCT", None),
-        )
+        with metrics.timer("analyzer.levels"):
+            levels = compute_levels(
+                df=df_levels,
+                bias=bias,
+                atr_sl_mult=getattr(config, "ATR_SL_MULT", 1.8),
+                tp_r_mult=getattr(config, "TP_R_MULT", 2.0),
+                swing_lookback=getattr(config, "SWING_LOOKBACK", 14),
+                tick_size=None,
+                atr_period=ATR_PERIOD,
+                max_atr_pct=getattr(config, "MAX_ATR_PCT", None),
+            )
     except Exception as e:
         audit_logger.info(f"{symbol} descartado en compute_levels: {e}")
         return None
@@ -535,7 +604,8 @@ def analizar_simbolo(
         "consolidando": (consolidacion == "Consolidando"),
         "regime_align": (not contradiction),
     }
-    score, factors, _tag = _score_signal_v2(features_v2, config)
+    with metrics.timer("analyzer.scoring"):
+        score, factors, _tag = _score_signal_v2(features_v2, config)
 
     # 8.1) Penalización macro opcional (VIX/DXY)
     macro_note = ""
@@ -590,6 +660,8 @@ def analizar_simbolo(
         tec.volatility_score = float(factors.get("volatility", 0.0))
         tec.rr_score = float(factors.get("risk_reward", 0.0))
         tec.score = float(score)
+        tec.score_features = features_v2  # para el scorer por lotes (logic.batch_scorer)
+        tec.score_model = _V2_MODEL.tag
     except Exception:
         pass
 
@@ -619,13 +691,15 @@ def analizar_simbolo(
             "score": float(getattr(tec, "score", 0.0)),
             "rr": float(getattr(tec, "rr", 0.0)),
             "adx": float(getattr(tec, "adx", 0.0)),
+            "model": getattr(tec, "score_model", ""),
         }
     except Exception:
         pass
     # -------------------------------------------------------------------------
 
     # 10) Decisión por umbral
-    min_score = float(getattr(config, "MIN_SCORE_ALERTA", 55))
+    if min_score is None:
+        min_score = float(getattr(config, "MIN_SCORE_ALERTA", 55))
     if score >= min_score:
         audit_logger.info("[DECISIÓN] Activo candidato.")
         return tec, score, factors, None
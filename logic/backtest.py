@@ -0,0 +1,640 @@
+# logic/backtest.py
+# -*- coding: utf-8 -*-
+"""
+Backtest walk-forward vectorizado de las señales de analizar_simbolo.
+
+En lugar de re-ejecutar el analizador vela a vela (cada llamada recalcula
+todos los indicadores sobre el prefijo), aquí se calculan UNA vez por símbolo
+las series completas de indicadores; como todos son recursivos/causales
+(EMA, RSI Wilder, ATR, ADX), el valor en la vela t es el mismo que vería el
+analizador con los datos disponibles hasta t.
+
+Flujo:
+  compute_features()  → indicadores + sesgo (inferir_bias) por vela (no dependen de parámetros)
+  build_signals()     → filtros, niveles (compute_levels + saneo) y score v2 por vela
+  simulate_trades()   → recorrido hacia delante de cada señal hasta TP / SL / expiración
+  run_backtest()      → todo el universo desde klines guardados en disco + estadísticas
+
+Notas de fidelidad:
+- Cada vela diaria CERRADA hace de "momento de escaneo" (entry = close de esa vela).
+- La vela semanal en formación se emula con el close diario sobre las semanas
+  ya cerradas (igual que la última vela de get_klines(sym, "1w") en vivo).
+- La penalización macro (VIX/DXY) no se aplica: no hay histórico de MacroState.
+- Si TP y SL caen en la misma vela se asume SL (conservador).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import ta
+from numpy.lib.stride_tricks import sliding_window_view
+
+import config
+from logic.analyzer import (
+    ADX_MIN,
+    ATR_PERIOD,
+    EMA_FAST,
+    EMA_LONG,
+    EMA_SLOW,
+    MAX_ATR_PCT,
+    RSI_PERIOD,
+    _score_v2_combine,
+    _score_v2_components,
+)
+from logic.outcomes import DEFAULT_HORIZON, OUTCOME_EXPIRED, OUTCOME_OPEN, OUTCOME_SL, OUTCOME_TP
+from logic.score_model import get_model
+from logic.scorer import inferir_bias_arrays
+
+logger = logging.getLogger("backtest")
+
+KLINES_DIR = os.path.join("output", "klines")
+
+
+# ─────────────────────────────────────────────────────────
+# Parámetros
+# ─────────────────────────────────────────────────────────
+
+@dataclass
+class SignalParams:
+    """Parámetros que afectan a filtros, niveles y umbral (defaults = config)."""
+    atr_sl_mult: float = field(default_factory=lambda: float(getattr(config, "ATR_SL_MULT", 1.8)))
+    tp_r_mult: float = field(default_factory=lambda: float(getattr(config, "TP_R_MULT", 2.0)))
+    adx_min: Optional[float] = field(default_factory=lambda: ADX_MIN)
+    max_atr_pct: Optional[float] = field(default_factory=lambda: MAX_ATR_PCT)
+    min_score: float = field(default_factory=lambda: float(getattr(config, "MIN_SCORE_ALERTA", 55)))
+    vol_min: float = field(default_factory=lambda: float(getattr(config, "VOLUMEN_MINIMO_USDT", 0)))
+    weights: Dict[str, float] = field(default_factory=dict)  # overrides de SCORE_V2_WEIGHTS
+
+    @property
+    def atr_cap(self) -> float:
+        """Tope de ATR% que usa el scorer v2 para la penalización de volatilidad."""
+        return float(self.max_atr_pct or 0.10)
+
+    @property
+    def score_vmin(self) -> float:
+        """Volumen de referencia del scorer v2 (mismo default que _score_signal_v2)."""
+        return float(self.vol_min or 25_000_000)
+
+
+# ─────────────────────────────────────────────────────────
+# Klines en disco
+# ─────────────────────────────────────────────────────────
+
+def _klines_path(data_dir: str, symbol: str, interval: str) -> str:
+    return os.path.join(data_dir, f"{symbol.upper()}_{interval}.json")
+
+
+def load_klines(data_dir: str, symbol: str, interval: str) -> List[list]:
+    """Lee klines crudos (formato Binance) guardados como <SYMBOL>_<interval>.json."""
+    try:
+        with open(_klines_path(data_dir, symbol, interval), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except Exception:
+        return []
+
+
+def save_klines(data_dir: str, symbol: str, interval: str, klines: List[list]) -> None:
+    os.makedirs(data_dir, exist_ok=True)
+    with open(_klines_path(data_dir, symbol, interval), "w", encoding="utf-8") as f:
+        json.dump(klines, f, separators=(",", ":"))
+
+
+def list_symbols(data_dir: str) -> List[str]:
+    """Símbolos con histórico diario y semanal disponible en data_dir."""
+    try:
+        names = os.listdir(data_dir)
+    except FileNotFoundError:
+        return []
+    daily = {n[: -len("_1d.json")] for n in names if n.endswith("_1d.json")}
+    weekly = {n[: -len("_1w.json")] for n in names if n.endswith("_1w.json")}
+    return sorted(daily & weekly)
+
+
+def download_history(
+    symbols: Iterable[str],
+    data_dir: str = KLINES_DIR,
+    days: int = 1500,
+    weeks: int = 300,
+) -> int:
+    """Descarga y guarda el histórico 1d/1w de cada símbolo (usa utils.data_loader)."""
+    from utils.data_loader import get_klines
+
+    saved = 0
+    for sym in symbols:
+        kl_d = get_klines(sym, "1d", limit=days, cache_ttl=0)
+        kl_w = get_klines(sym, "1w", limit=weeks, cache_ttl=0)
+        if not kl_d or not kl_w:
+            logger.info(f"{sym}: sin histórico, se omite")
+            continue
+        save_klines(data_dir, sym, "1d", kl_d)
+        save_klines(data_dir, sym, "1w", kl_w)
+        saved += 1
+    return saved
+
+
+def _ohlcv(klines) -> Dict[str, np.ndarray]:
+    """open_time + OHLCV como arrays float (acepta lista de listas de Binance)."""
+    if klines is None or len(klines) == 0:
+        empty = np.empty(0)
+        return {"open_time": empty.astype(np.int64), "open": empty, "high": empty,
+                "low": empty, "close": empty, "volume": empty}
+    arr = np.asarray([row[:6] for row in klines], dtype=float)
+    return {
+        "open_time": arr[:, 0].astype(np.int64),
+        "open": arr[:, 1],
+        "high": arr[:, 2],
+        "low": arr[:, 3],
+        "close": arr[:, 4],
+        "volume": arr[:, 5],
+    }
+
+
+# ─────────────────────────────────────────────────────────
+# Indicadores vectorizados
+# ─────────────────────────────────────────────────────────
+
+def _ewm_raw(x: np.ndarray, alpha: float) -> np.ndarray:
+    """EWM adjust=False sin min_periods (la validez se aplica aparte)."""
+    return pd.Series(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def _forming_week_indicators(
+    w_close: np.ndarray,
+    j: np.ndarray,
+    close_d: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    EMA20/EMA50/RSI semanales vistos desde cada vela diaria.
+    j[t] = índice de la semana que contiene la vela t; las semanas < j están
+    cerradas y la semana j se emula con close = close_d[t] (vela en formación).
+    """
+    n = len(close_d)
+    ok = j >= 0
+    prev = np.clip(j - 1, 0, None)
+    has_prev = j >= 1
+
+    def _ema_forming(span: int) -> np.ndarray:
+        a = 2.0 / (span + 1.0)
+        raw = _ewm_raw(w_close, a) if len(w_close) else np.empty(0)
+        prev_val = raw[prev] if len(raw) else np.full(n, np.nan)
+        val = np.where(has_prev, (1.0 - a) * prev_val + a * close_d, close_d)
+        return np.where(ok & (j + 1 >= span), val, np.nan)
+
+    ema20 = _ema_forming(EMA_FAST)
+    ema50 = _ema_forming(EMA_SLOW)
+
+    # RSI Wilder como ta.momentum.RSIIndicator (up/down de la primera vela = 0)
+    alpha = 1.0 / RSI_PERIOD
+    diff = np.diff(w_close, prepend=np.nan) if len(w_close) else np.empty(0)
+    up = np.where(diff > 0, diff, 0.0)
+    dn = np.where(diff < 0, -diff, 0.0)
+    up_raw = _ewm_raw(up, alpha) if len(up) else np.empty(0)
+    dn_raw = _ewm_raw(dn, alpha) if len(dn) else np.empty(0)
+    if len(w_close):
+        d_f = close_d - w_close[prev]
+        up_f = np.where(has_prev & (d_f > 0), d_f, 0.0)
+        dn_f = np.where(has_prev & (d_f < 0), -d_f, 0.0)
+        emaup = np.where(has_prev, (1.0 - alpha) * up_raw[prev] + alpha * up_f, 0.0)
+        emadn = np.where(has_prev, (1.0 - alpha) * dn_raw[prev] + alpha * dn_f, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(emadn == 0, 100.0, 100.0 - 100.0 / (1.0 + emaup / emadn))
+        rsi = np.where(ok & (j + 1 >= RSI_PERIOD), rsi, np.nan)
+    else:
+        rsi = np.full(n, np.nan)
+    return ema20, ema50, rsi
+
+
+def _ema_up(close: np.ndarray) -> np.ndarray:
+    """Sesgo simple por vela (EMA20>EMA50), como main._ema_bias."""
+    s = pd.Series(close)
+    e20 = ta.trend.EMAIndicator(s, EMA_FAST).ema_indicator().to_numpy()
+    e50 = ta.trend.EMAIndicator(s, EMA_SLOW).ema_indicator().to_numpy()
+    return e20 > e50
+
+
+def market_regime(kl_btc, kl_eth) -> Dict[str, np.ndarray]:
+    """Régimen BTC/ETH por open_time diario: {"open_time", "btc_up", "eth_up"}."""
+    btc = _ohlcv(kl_btc)
+    eth = _ohlcv(kl_eth)
+    times = np.union1d(btc["open_time"], eth["open_time"])
+    out = {"open_time": times}
+    for name, d in (("btc_up", btc), ("eth_up", eth)):
+        flags = np.zeros(len(times), dtype=bool)
+        if len(d["close"]):
+            pos = np.searchsorted(times, d["open_time"])
+            flags[pos] = _ema_up(d["close"])
+        out[name] = flags
+    return out
+
+
+def _align_regime(open_time: np.ndarray, regime: Optional[Dict[str, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    n = len(open_time)
+    if not regime or not len(regime.get("open_time", [])):
+        return np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+    times = regime["open_time"]
+    pos = np.clip(np.searchsorted(times, open_time), 0, len(times) - 1)
+    hit = times[pos] == open_time
+    return regime["btc_up"][pos] & hit, regime["eth_up"][pos] & hit
+
+
+def compute_features(
+    klines_d,
+    klines_w,
+    regime: Optional[Dict[str, np.ndarray]] = None,
+    swing_lookback: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Indicadores, sesgo y filtros estructurales para TODAS las velas diarias.
+    No depende de ATR_SL_MULT / TP_R_MULT / ADX_MIN / MAX_ATR_PCT ni del umbral de score.
+    """
+    d = _ohlcv(klines_d)
+    w = _ohlcv(klines_w)
+    n = len(d["close"])
+    swing_lb = int(swing_lookback if swing_lookback is not None else getattr(config, "SWING_LOOKBACK", 14))
+
+    high, low, close, volume = d["high"], d["low"], d["close"], d["volume"]
+    hs, ls, cs = pd.Series(high), pd.Series(low), pd.Series(close)
+
+    # Diario (series completas; causales ⇒ idénticas a las del prefijo)
+    ema20_d = ta.trend.EMAIndicator(cs, EMA_FAST).ema_indicator().to_numpy()
+    ema50_d = ta.trend.EMAIndicator(cs, EMA_SLOW).ema_indicator().to_numpy()
+    ema200_d = ta.trend.EMAIndicator(cs, EMA_LONG).ema_indicator().to_numpy()
+    rsi_d = ta.momentum.RSIIndicator(cs, RSI_PERIOD).rsi().to_numpy()
+    atr = ta.volatility.AverageTrueRange(hs, ls, cs, ATR_PERIOD).average_true_range().to_numpy()
+    adx = ta.trend.ADXIndicator(hs, ls, cs, RSI_PERIOD).adx().to_numpy()
+
+    # Semanal (vela en formación emulada)
+    j = np.searchsorted(w["open_time"], d["open_time"], side="right") - 1
+    ema20_w, ema50_w, rsi_w = _forming_week_indicators(w["close"], j, close)
+
+    # Mínimo de velas como _check_min_bars
+    need_d = max(60, 3 * ATR_PERIOD, 3 * swing_lb)
+    need_w = max(10, min(14, ATR_PERIOD))
+    enough = (np.arange(n) + 1 >= need_d) & (j + 1 >= need_w)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atr_pct = np.where(close > 0, atr / close, np.nan)
+
+    vol_usdt = (high + low + close) / 3.0 * volume
+    vol_3d_up = np.zeros(n, dtype=bool)
+    if n >= 4:
+        vol_3d_up[3:] = (volume[3:] > volume[2:-1]) & (volume[2:-1] > volume[1:-2])
+
+    trend = np.where(
+        (ema20_d > ema50_d) & (ema50_d > ema200_d), 1,
+        np.where((ema20_d < ema50_d) & (ema50_d < ema200_d), -1, 0),
+    ).astype(np.int8)
+
+    rango_20 = (hs.rolling(20).max() - ls.rolling(20).min()).to_numpy()
+    with np.errstate(invalid="ignore"):
+        consolidando = (close > 0) & np.isfinite(rango_20) & (rango_20 / close < 0.05)
+
+    bias = inferir_bias_arrays(ema20_d, ema50_d, ema20_w, ema50_w, rsi_d, rsi_w, atr_pct)
+
+    # Coherencia BTC/ETH (USE_GLOBAL_TREND_FILTER / BIAS_MODE)
+    btc_up, eth_up = _align_regime(d["open_time"], regime)
+    contradiction = np.zeros(n, dtype=bool)
+    blocked = np.zeros(n, dtype=bool)
+    if bool(getattr(config, "USE_GLOBAL_TREND_FILTER", False)):
+        contradiction = ((bias == 1) & ~btc_up & ~eth_up) | ((bias == -1) & btc_up & eth_up)
+        if str(getattr(config, "BIAS_MODE", "relaxed")).lower() in ("strict", "strong", "hard"):
+            blocked = contradiction
+
+    return {
+        "open_time": d["open_time"],
+        "high": high,
+        "low": low,
+        "close": close,
+        "enough": enough,
+        "adx": adx,
+        "atr": atr,
+        "atr_pct": atr_pct,
+        "vol_usdt": vol_usdt,
+        "vol_3d_up": vol_3d_up,
+        "trend": trend,
+        "consolidando": consolidando,
+        "bias": bias,
+        "regime_align": ~contradiction,
+        "regime_blocked": blocked,
+        "swing_low": ls.rolling(swing_lb, min_periods=1).min().to_numpy(),
+        "swing_high": hs.rolling(swing_lb, min_periods=1).max().to_numpy(),
+    }
+
+
+# ─────────────────────────────────────────────────────────
+# Señales (filtros + niveles + score)
+# ─────────────────────────────────────────────────────────
+
+def base_mask(feat: Dict[str, np.ndarray], vol_min: float) -> np.ndarray:
+    """Filtros de analizar_simbolo que no dependen de parámetros barridos."""
+    close, atr = feat["close"], feat["atr"]
+    valid = feat["enough"] & np.isfinite(close) & (close > 0)
+    valid &= ~(feat["vol_usdt"] < vol_min)
+    valid &= (feat["bias"] != 0) & ~feat["regime_blocked"]
+    valid &= np.isfinite(atr) & (atr > 0)
+    return valid
+
+
+def levels_arrays(
+    close: np.ndarray,
+    atr: np.ndarray,
+    swing_low: np.ndarray,
+    swing_high: np.ndarray,
+    side: np.ndarray,
+    atr_sl_mult: float,
+    tp_r_mult: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """compute_levels + _sanitize_levels sobre arrays → (sl, tp); entry = close."""
+    # SL = swing ∓ k·ATR (el más lejano), TP = entry ± m·R
+    k, m = float(atr_sl_mult), float(tp_r_mult)
+    entry = close
+    sl = np.where(side > 0,
+                  np.minimum(swing_low, close - k * atr),
+                  np.maximum(swing_high, close + k * atr))
+    tp = entry + side * m * np.abs(entry - sl)
+
+    # _sanitize_levels (sólo puede actuar en SHORT con niveles de compute_levels)
+    tiny = 1e-12
+    fix_short = (side < 0) & (tp <= 0.0)
+    tp = np.where(fix_short, np.maximum(np.minimum.reduce([tp, entry - 1.5 * atr, swing_low]), tiny), tp)
+    max_drop = float(getattr(config, "MAX_TP_DROP_PCT_SHORT", 0.85))
+    atr_floor_mult = float(getattr(config, "MAX_TP_ATR_MULT_SHORT", 8.0))
+    tp_floor = np.maximum(entry * (1.0 - max_drop), entry - atr_floor_mult * atr)
+    tp = np.where((side < 0) & (tp < tp_floor), np.maximum(tp_floor, tiny), tp)
+    return sl, tp
+
+
+def build_signals(feat: Dict[str, np.ndarray], params: Optional[SignalParams] = None) -> Dict[str, np.ndarray]:
+    """
+    Aplica los filtros de analizar_simbolo, calcula niveles (compute_levels +
+    _sanitize_levels) y el score v2 para cada vela. Devuelve arrays por vela y
+    la máscara "signal" (vela que el analizador habría emitido como candidata).
+    """
+    p = params or SignalParams()
+    close = feat["close"]
+    atr_pct = feat["atr_pct"]
+    side = np.where(feat["bias"] >= 0, 1.0, -1.0)
+
+    valid = base_mask(feat, p.vol_min)
+    if p.adx_min:
+        valid &= ~(feat["adx"] < float(p.adx_min))
+    if p.max_atr_pct is not None:
+        valid &= ~(atr_pct > float(p.max_atr_pct))
+
+    sl, tp = levels_arrays(close, feat["atr"], feat["swing_low"], feat["swing_high"],
+                           side, p.atr_sl_mult, p.tp_r_mult)
+
+    comp = _score_v2_components(
+        side=side,
+        entry=close,
+        sl=sl,
+        sp=tp,
+        adx=feat["adx"],
+        atr_pct=atr_pct,
+        vol_usdt=feat["vol_usdt"],
+        vol_3d_up=feat["vol_3d_up"],
+        trend=feat["trend"],
+        consolidando=feat["consolidando"],
+        regime_align=feat["regime_align"],
+        atr_cap=p.atr_cap,
+        vmin=p.score_vmin,
+    )
+    score, factors = _score_v2_combine(comp, p.weights)
+    score = np.where(valid, score, np.nan)
+
+    return {
+        "valid": valid,
+        "signal": valid & (score >= float(p.min_score)),
+        "side": side,
+        "entry": close,
+        "sl": sl,
+        "tp": tp,
+        "score": score,
+        **{f"f_{name}": arr for name, arr in factors.items()},
+    }
+
+
+# ─────────────────────────────────────────────────────────
+# Simulación TP/SL
+# ─────────────────────────────────────────────────────────
+
+def simulate_trades(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    idx: np.ndarray,
+    side: np.ndarray,
+    entry: np.ndarray,
+    sl: np.ndarray,
+    tp: np.ndarray,
+    horizon: int = DEFAULT_HORIZON,
+    last_idx: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Para cada señal (entrada al close de la vela idx) recorre las siguientes
+    `horizon` velas y detecta el primer toque de TP o SL. Todo vectorizado con
+    una ventana (n_señales × horizon). Devuelve outcome, exit_idx, exit_price, r.
+
+    last_idx: última vela válida de cada señal (paneles con varios símbolos
+    concatenados y separados por NaN); por defecto, la última del array.
+    """
+    idx = np.asarray(idx, dtype=np.int64)
+    m = len(idx)
+    n = len(close)
+    H = max(1, int(horizon))
+    if m == 0:
+        return {"outcome": np.empty(0, dtype=object), "exit_idx": np.empty(0, dtype=np.int64),
+                "exit_price": np.empty(0), "r": np.empty(0), "bars": np.empty(0, dtype=np.int64)}
+
+    pad = np.full(H, np.nan)
+    win_hi = sliding_window_view(np.concatenate([high, pad])[1:], H)[idx]
+    win_lo = sliding_window_view(np.concatenate([low, pad])[1:], H)[idx]
+
+    is_long = (np.asarray(side) > 0)[:, None]
+    tp_c, sl_c = np.asarray(tp)[:, None], np.asarray(sl)[:, None]
+    with np.errstate(invalid="ignore"):
+        tp_hit = np.where(is_long, win_hi >= tp_c, win_lo <= tp_c)
+        sl_hit = np.where(is_long, win_lo <= sl_c, win_hi >= sl_c)
+    first_tp = np.where(tp_hit.any(axis=1), tp_hit.argmax(axis=1), H)
+    first_sl = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1), H)
+    last = (n - 1) if last_idx is None else np.asarray(last_idx, dtype=np.int64)
+    available = np.minimum(H, last - idx)
+
+    is_sl = (first_sl < H) & (first_sl <= first_tp)
+    is_tp = (first_tp < H) & ~is_sl
+    is_exp = ~is_sl & ~is_tp & (available >= H)
+
+    exit_idx = np.where(is_sl, idx + 1 + first_sl,
+               np.where(is_tp, idx + 1 + first_tp, idx + available))
+    exit_price = np.where(is_sl, sl, np.where(is_tp, tp, close[exit_idx]))
+    risk = np.abs(np.asarray(entry) - np.asarray(sl))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(risk > 0, np.asarray(side) * (exit_price - entry) / risk, 0.0)
+
+    outcome = np.where(is_sl, OUTCOME_SL, np.where(is_tp, OUTCOME_TP,
+              np.where(is_exp, OUTCOME_EXPIRED, OUTCOME_OPEN))).astype(object)
+    return {"outcome": outcome, "exit_idx": exit_idx, "exit_price": exit_price,
+            "r": r, "bars": exit_idx - idx}
+
+
+def _first_non_overlapping(idx: np.ndarray, exit_idx: np.ndarray) -> np.ndarray:
+    """Máscara de señales que no se abren mientras otra sigue viva (1 posición por símbolo)."""
+    keep = np.zeros(len(idx), dtype=bool)
+    busy_until = -1
+    for i, (s, e) in enumerate(zip(idx, exit_idx)):
+        if s > busy_until:
+            keep[i] = True
+            busy_until = e
+    return keep
+
+
+# ─────────────────────────────────────────────────────────
+# API de alto nivel
+# ─────────────────────────────────────────────────────────
+
+TRADE_COLUMNS = [
+    "symbol", "open_time", "bias", "score", "entry", "sl", "tp",
+    "outcome", "bars", "exit_time", "exit_price", "r",
+    "adx", "atr_pct", "trend_score", "rr_score", "volume_score", "momentum_score", "volatility_score",
+    "model",
+]
+
+
+def backtest_symbol(
+    symbol: str,
+    klines_d,
+    klines_w,
+    regime: Optional[Dict[str, np.ndarray]] = None,
+    params: Optional[SignalParams] = None,
+    horizon: int = DEFAULT_HORIZON,
+    one_position: bool = False,
+) -> pd.DataFrame:
+    """Operaciones simuladas de un símbolo (un registro por señal)."""
+    feat = compute_features(klines_d, klines_w, regime)
+    sig = build_signals(feat, params)
+    idx = np.flatnonzero(sig["signal"])
+    if len(idx) == 0:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+
+    sim = simulate_trades(feat["high"], feat["low"], feat["close"], idx,
+                          sig["side"][idx], sig["entry"][idx], sig["sl"][idx], sig["tp"][idx], horizon)
+    keep = _first_non_overlapping(idx, sim["exit_idx"]) if one_position else np.ones(len(idx), dtype=bool)
+
+    sel = idx[keep]
+    return pd.DataFrame({
+        "symbol": symbol,
+        "open_time": feat["open_time"][sel],
+        "bias": np.where(sig["side"][sel] > 0, "LONG", "SHORT"),
+        "score": sig["score"][sel],
+        "entry": sig["entry"][sel],
+        "sl": sig["sl"][sel],
+        "tp": sig["tp"][sel],
+        "outcome": sim["outcome"][keep],
+        "bars": sim["bars"][keep],
+        "exit_time": feat["open_time"][sim["exit_idx"][keep]],
+        "exit_price": sim["exit_price"][keep],
+        "r": sim["r"][keep],
+        "adx": feat["adx"][sel],
+        "atr_pct": feat["atr_pct"][sel],
+        "trend_score": sig["f_trend"][sel],
+        "rr_score": sig["f_risk_reward"][sel],
+        "volume_score": sig["f_volume"][sel],
+        "momentum_score": sig["f_momentum"][sel],
+        "volatility_score": sig["f_volatility"][sel],
+        "model": get_model("signal_v2").tag,
+    }, columns=TRADE_COLUMNS)
+
+
+def summarize(trades: pd.DataFrame) -> Dict[str, Any]:
+    """Estadísticas agregadas (en múltiplos de R) sobre las operaciones cerradas."""
+    def _stats(df: pd.DataFrame) -> Dict[str, Any]:
+        closed = df[df["outcome"] != OUTCOME_OPEN]
+        r = closed["r"].astype(float)
+        n_tp = int((closed["outcome"] == OUTCOME_TP).sum())
+        n_sl = int((closed["outcome"] == OUTCOME_SL).sum())
+        gains, losses = float(r[r > 0].sum()), float(-r[r < 0].sum())
+        equity = closed.sort_values("exit_time", kind="stable")["r"].astype(float).cumsum()
+        drawdown = float((equity.cummax().clip(lower=0.0) - equity).max()) if len(equity) else 0.0
+        return {
+            "signals": int(len(df)),
+            "closed": int(len(closed)),
+            "tp": n_tp,
+            "sl": n_sl,
+            "expired": int((closed["outcome"] == OUTCOME_EXPIRED).sum()),
+            "open": int(len(df) - len(closed)),
+            "hit_rate": (n_tp / (n_tp + n_sl)) if (n_tp + n_sl) else 0.0,
+            "avg_r": float(r.mean()) if len(r) else 0.0,
+            "total_r": float(r.sum()),
+            "profit_factor": (gains / losses) if losses > 0 else (float("inf") if gains > 0 else 0.0),
+            "max_drawdown_r": drawdown,
+            "avg_bars": float(closed["bars"].mean()) if len(closed) else 0.0,
+        }
+
+    out = _stats(trades)
+    out["by_bias"] = {b: _stats(g) for b, g in trades.groupby("bias")} if len(trades) else {}
+    return out
+
+
+def run_backtest(
+    data_dir: str = KLINES_DIR,
+    symbols: Optional[Iterable[str]] = None,
+    params: Optional[SignalParams] = None,
+    horizon: int = DEFAULT_HORIZON,
+    one_position: bool = False,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Backtest del universo desde klines locales (<SYMBOL>_1d.json / _1w.json).
+    El régimen BTC/ETH se toma de BTCUSDT/ETHUSDT si están en data_dir.
+    Devuelve (operaciones, estadísticas).
+    """
+    regime = market_regime(load_klines(data_dir, "BTCUSDT", "1d"), load_klines(data_dir, "ETHUSDT", "1d"))
+    exclude = set(getattr(config, "EXCLUDE_SYMBOLS", []))
+    universe = [s for s in (symbols or list_symbols(data_dir)) if s not in exclude]
+
+    frames: List[pd.DataFrame] = []
+    for sym in universe:
+        try:
+            df = backtest_symbol(sym, load_klines(data_dir, sym, "1d"), load_klines(data_dir, sym, "1w"),
+                                 regime, params, horizon, one_position)
+        except Exception as e:
+            logger.info(f"{sym} omitido en backtest: {e}")
+            continue
+        if len(df):
+            frames.append(df)
+
+    trades = (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=TRADE_COLUMNS))
+    trades = trades.sort_values(["open_time", "symbol"], ignore_index=True)
+    return trades, summarize(trades)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backtest vectorizado de analizar_simbolo.")
+    parser.add_argument("--dir", default=KLINES_DIR, help="Carpeta con <SYMBOL>_1d.json / _1w.json.")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help="Velas máximas por operación.")
+    parser.add_argument("--one-position", action="store_true", help="Una sola operación viva por símbolo.")
+    parser.add_argument("--download", action="store_true", help="Descarga antes el histórico del universo.")
+    parser.add_argument("--out", default="", help="CSV de salida con las operaciones.")
+    args = parser.parse_args()
+
+    if args.download:
+        from data.symbols import get_usdt_futures_universe
+        n = download_history(get_usdt_futures_universe(), args.dir)
+        print(f"Histórico guardado para {n} símbolos en {args.dir}")
+
+    trades, stats = run_backtest(args.dir, horizon=args.horizon, one_position=args.one_position)
+    if args.out:
+        trades.to_csv(args.out, index=False)
+    print(json.dumps(stats, indent=2, ensure_ascii=False, default=float))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# logic/batch_scorer.py
+# -*- coding: utf-8 -*-
+"""
+Scorer v2 por lotes (corte transversal del escaneo).
+
+Recibe las features de TODOS los símbolos analizados como un array estructurado
+(FEATURE_DTYPE, una fila por símbolo) y calcula el score v2 vectorizado con los
+mismos componentes que logic.analyzer._score_signal_v2. Sin términos
+transversales el resultado coincide con el score por símbolo.
+
+Términos transversales opcionales (CROSS_SECTIONAL_WEIGHTS en settings, puntos
+máximos por término; 0 = desactivado), calculados sobre el lote completo:
+- adx_rank:        percentil del ADX dentro del lote (0..1).
+- liquidity_rank:  percentil del volumen 24h en USDT (0..1).
+- rel_strength:    percentil de la fuerza relativa frente a BTC (retorno de
+                   CROSS_SECTIONAL_RS_BARS velas menos el de BTC), con signo
+                   según el lado: para un SHORT puntúa la debilidad relativa.
+Se añaden al bloque "cross_section" de los factores y el score final vuelve a
+acotarse a 0..100.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from logic.analyzer import _score_v2_combine, _score_v2_components
+
+FEATURE_DTYPE = np.dtype([
+    ("symbol", "U32"),
+    ("side", "i1"),          # +1 LONG | -1 SHORT
+    ("entry", "f8"),
+    ("sl", "f8"),
+    ("sp", "f8"),
+    ("adx", "f8"),
+    ("atr_pct", "f8"),
+    ("vol_usdt", "f8"),
+    ("vol_3d_up", "?"),
+    ("trend", "i1"),         # +1 Alcista | -1 Bajista | 0 Lateral
+    ("consolidando", "?"),
+    ("regime_align", "?"),
+    ("ret", "f8"),           # retorno de N velas (fuerza relativa); NaN si no hay
+])
+
+CROSS_TERMS = ("adx_rank", "liquidity_rank", "rel_strength")
+DEFAULT_RS_BARS = 20
+
+_TREND_CODE = {"Alcista": 1, "Bajista": -1}
+
+
+def features_row(symbol: str, feat: Mapping, ret: float = float("nan")) -> tuple:
+    """Convierte el dict features_v2 del analizador en una fila de FEATURE_DTYPE."""
+    side = str(feat.get("bias", "LONG")).upper()
+    return (
+        symbol,
+        -1 if side == "SHORT" else 1,
+        float(feat.get("entry") or 0.0),
+        float(feat.get("sl") or 0.0),
+        float(feat.get("sp") or 0.0),
+        float(feat.get("adx", 0.0) or 0.0),
+        float(feat.get("atr_pct", 0.0) or 0.0),
+        float(feat.get("vol_usdt_24h", feat.get("volume_usdt_24h", 0.0)) or 0.0),
+        bool(feat.get("vol_3d_up", False)),
+        _TREND_CODE.get(feat.get("trend", "Lateral"), 0),
+        bool(feat.get("consolidando", False)),
+        bool(feat.get("regime_align", True)),
+        float(ret),
+    )
+
+
+def build_feature_array(rows: Iterable[tuple]) -> np.ndarray:
+    """Lista de filas (features_row) → array estructurado."""
+    return np.array(list(rows), dtype=FEATURE_DTYPE)
+
+
+def klines_return(klines: Optional[Sequence], bars: int = DEFAULT_RS_BARS) -> float:
+    """Retorno close[-1]/close[-1-bars] - 1 de klines Binance (lista de listas); NaN si no hay datos."""
+    try:
+        if not klines or len(klines) <= bars:
+            return float("nan")
+        last, base = float(klines[-1][4]), float(klines[-1 - bars][4])
+        return last / base - 1.0 if base > 0 else float("nan")
+    except (TypeError, ValueError, IndexError):
+        return float("nan")
+
+
+def percentile_rank(x: np.ndarray) -> np.ndarray:
+    """
+    Rango percentil 0..1 (empates → rango medio). Los NaN quedan en NaN.
+    Con un único valor válido devuelve 0.5.
+    """
+    x = np.asarray(x, dtype=float)
+    out = np.full(x.shape, np.nan)
+    ok = np.isfinite(x)
+    n = int(ok.sum())
+    if n == 0:
+        return out
+    if n == 1:
+        out[ok] = 0.5
+        return out
+    _, inv, counts = np.unique(x[ok], return_inverse=True, return_counts=True)
+    avg_rank = np.cumsum(counts) - (counts - 1) / 2.0 - 1.0  # rango medio 0-based
+    out[ok] = avg_rank[inv] / (n - 1)
+    return out
+
+
+def cross_weights(cfg) -> Dict[str, float]:
+    """Pesos transversales activos (≠0) según CROSS_SECTIONAL_WEIGHTS."""
+    raw = getattr(cfg, "CROSS_SECTIONAL_WEIGHTS", None) or {}
+    return {k: float(raw[k]) for k in CROSS_TERMS if float(raw.get(k, 0) or 0) != 0}
+
+
+def cross_components(arr: np.ndarray, benchmark_ret: float = float("nan")) -> Dict[str, np.ndarray]:
+    """Componentes transversales 0..1 (NaN → 0) sobre el lote completo."""
+    bench = benchmark_ret if np.isfinite(benchmark_ret) else 0.0
+    rel = (arr["ret"] - bench) * arr["side"]
+    comp = {
+        "adx_rank": percentile_rank(arr["adx"]),
+        "liquidity_rank": percentile_rank(arr["vol_usdt"]),
+        "rel_strength": percentile_rank(rel),
+    }
+    return {k: np.nan_to_num(v, nan=0.0) for k, v in comp.items()}
+
+
+def score_batch(
+    arr: np.ndarray,
+    cfg,
+    cross: Optional[Mapping[str, float]] = None,
+    benchmark_ret: float = float("nan"),
+    weights: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Score v2 del lote → (score 0..100, factores_por_bloque) como arrays.
+    `cross` = pesos transversales ({} / None → sólo v2, idéntico al score por símbolo).
+    """
+    if len(arr) == 0:
+        return np.zeros(0), {}
+    comp = _score_v2_components(
+        arr["side"], arr["entry"], arr["sl"], arr["sp"], arr["adx"], arr["atr_pct"],
+        arr["vol_usdt"], arr["vol_3d_up"], arr["trend"], arr["consolidando"], arr["regime_align"],
+        atr_cap=float(getattr(cfg, "MAX_ATR_PCT", 0.10) or 0.10),
+        vmin=float(getattr(cfg, "VOLUMEN_MINIMO_USDT", 25_000_000) or 25_000_000),
+    )
+    score, factors = _score_v2_combine(comp, weights)
+
+    cross = {k: float(w) for k, w in (cross or {}).items() if w}
+    if cross:
+        xc = cross_components(arr, benchmark_ret)
+        factors["cross_section"] = sum(w * xc[k] for k, w in cross.items())
+        score = np.clip(sum(factors.values()), 0.0, 100.0)
+    return score, factors
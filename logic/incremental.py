@@ -0,0 +1,95 @@
+# logic/incremental.py
+# -*- coding: utf-8 -*-
+"""
+Reescaneo incremental: sólo se vuelve a ejecutar analizar_simbolo en los
+símbolos cuyas entradas cambiaron desde el escaneo anterior.
+
+Huella de un símbolo = última vela diaria (open_time, close, volume). Entre
+dos escaneos intradía sólo se mueve la vela en formación; si el cierre no se
+desplazó más de `close_tol_pct` ni el volumen más de `volume_tol_pct`, se
+sirve el resultado anterior (incluido "sin señal") sin pedir la vela semanal
+ni recalcular indicadores.
+
+Se invalida todo:
+- en cada cierre de vela (open_time distinto → símbolo cambiado; el daemon
+  además pide reescaneo completo en los despertares de cierre);
+- si cambia el contexto del análisis (sesgo BTC/ETH, scorer transversal,
+  umbral efectivo de score de analizar_simbolo).
+
+La caché vive en memoria del proceso: tiene sentido en modo daemon, donde se
+mantiene caliente entre ciclos (main.run_daemon).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+MISS = object()
+
+
+@dataclass(frozen=True)
+class KlineFingerprint:
+    open_time: int
+    close: float
+    volume: float
+
+    @classmethod
+    def from_klines(cls, klines: list) -> Optional["KlineFingerprint"]:
+        if not klines:
+            return None
+        k = klines[-1]
+        try:
+            return cls(int(k[0]), float(k[4]), float(k[5]))
+        except (IndexError, TypeError, ValueError):
+            return None
+
+
+def _moved(prev: float, cur: float, tol_pct: float) -> bool:
+    if prev == cur:
+        return False
+    if prev == 0:
+        return True
+    return abs(cur / prev - 1.0) * 100.0 > tol_pct
+
+
+class AnalysisCache:
+    def __init__(self, close_tol_pct: float = 0.1, volume_tol_pct: float = 5.0):
+        self.close_tol_pct = float(close_tol_pct)
+        self.volume_tol_pct = float(volume_tol_pct)
+        self._entries: Dict[str, Tuple[KlineFingerprint, Any]] = {}
+        self._context: Optional[Hashable] = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def begin_scan(self, context: Hashable, full: bool = False) -> None:
+        """Arranca un escaneo; con `full` o contexto distinto se invalida todo."""
+        if full or context != self._context:
+            self._entries.clear()
+        self._context = context
+        self.hits = self.misses = 0
+
+    def changed(self, prev: KlineFingerprint, cur: KlineFingerprint) -> bool:
+        return (
+            prev.open_time != cur.open_time
+            or _moved(prev.close, cur.close, self.close_tol_pct)
+            or _moved(prev.volume, cur.volume, self.volume_tol_pct)
+        )
+
+    def lookup(self, symbol: str, fp: Optional[KlineFingerprint]) -> Any:
+        """Resultado anterior si la huella no cambió; MISS en otro caso."""
+        entry = self._entries.get(symbol)
+        if fp is None or entry is None or self.changed(entry[0], fp):
+            self.misses += 1
+            return MISS
+        self.hits += 1
+        return entry[1]
+
+    def store(self, symbol: str, fp: Optional[KlineFingerprint], result: Any) -> None:
+        # La huella guardada es la del análisis: la tolerancia se mide siempre
+        # contra la vela realmente analizada, no se arrastra escaneo a escaneo
+        if fp is not None:
+            self._entries[symbol] = (fp, result)
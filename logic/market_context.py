@@ -10,9 +10,10 @@ operar en **largo** o en **corto**.  Cada dirección obtiene un puntaje de
 from dataclasses import dataclass
 import logging
 from datetime import datetime
+from typing import Optional
 import pandas as pd
 import ta
-import yfinance as yf
+from utils import yf_cache
 from logic.reporter import registrar_contexto_csv
 try:  # Permite ejecutar este módulo directamente desde la carpeta logic
     import config
@@ -37,8 +38,22 @@ class ContextoMercado:
     apto_short: bool = False
 
 
+# Tickers que se descargan juntos (una petición yfinance por intervalo)
+LOTE_PERIODO = "400d"
+
+
+LOTE_CRIPTO = ["BTC-USD", "ETH-USD"]
+
+
+def _lote(interval: str, ticker: str) -> list[str]:
+    """Grupo con el que se refresca `ticker`: cripto (sólo si no llegan klines) o macro."""
+    if ticker in LOTE_CRIPTO or interval != "1d":
+        return LOTE_CRIPTO
+    return ["UUP", getattr(config, "DXY_ALT_SYMBOL", "DX-Y.NYB"), "^VIX"]
+
+
 def _descargar_datos(ticker: str, interval: str, period: str = "400d") -> pd.DataFrame:
-    """Descarga precios históricos usando :mod:`yfinance`.
+    """Precios históricos de :mod:`yfinance` vía la caché por lotes (:mod:`utils.yf_cache`).
 
     Parameters
     ----------
@@ -48,18 +63,34 @@ def _descargar_datos(ticker: str, interval: str, period: str = "400d") -> pd.Dat
         Intervalo de las velas (``"1d"``, ``"1wk"``...).
     period: str, default ``"400d"``
         Rango de datos a obtener.
+
+    Si hay que descargar, se refrescan a la vez todos los tickers del lote del
+    intervalo, de modo que el resto de llamadas de la evaluación salen de caché.
     """
 
-    df = yf.download(
+    return yf_cache.get_frame(
         ticker,
-        interval=interval,
-        period=period,
-        progress=False,
-        auto_adjust=False,
+        interval,
+        period,
+        group=_lote(interval, ticker),
+        fetch_period=LOTE_PERIODO,
     )
-    if df.empty:
+
+
+def _klines_a_df(klines: list) -> pd.DataFrame:
+    """Klines crudos de Binance (``utils.data_loader.get_klines``) → OHLCV como yfinance."""
+    if not klines:
         return pd.DataFrame()
-    return df
+    df = pd.DataFrame([k[:6] for k in klines], columns=["t", "Open", "High", "Low", "Close", "Volume"])
+    df.index = pd.to_datetime(df.pop("t").astype("int64"), unit="ms")
+    return df.astype(float)
+
+
+def _serie_cripto(klines: Optional[list], ticker: str, interval: str) -> pd.DataFrame:
+    """Usa las klines del escaneo si llegan; si no, cae a yfinance."""
+    if klines:
+        return _klines_a_df(klines)
+    return _descargar_seguro(ticker, interval)
 
 
 def _descargar_seguro(ticker: str, interval: str, period: str = "400d") -> pd.DataFrame:
@@ -128,22 +159,32 @@ def calcular_score_contexto(
     return score
 
 
-def obtener_contexto_mercado() -> ContextoMercado:
+def obtener_contexto_mercado(
+    btc_d_klines: Optional[list] = None,
+    btc_w_klines: Optional[list] = None,
+    eth_d_klines: Optional[list] = None,
+    eth_w_klines: Optional[list] = None,
+) -> ContextoMercado:
     """Obtiene el contexto general del mercado.
 
-    Descarga precios de BTC, ETH, DXY y VIX para calcular distintas
+    Usa precios de BTC, ETH, DXY y VIX para calcular distintas
     señales de tendencia y volatilidad.  Con esta información se
     asignan dos puntajes (``score_long`` y ``score_short``) que indican la
     conveniencia de operar en cada dirección.
+
+    BTC/ETH pueden llegar como klines de Binance ya descargadas por el escaneo
+    (``BTCUSDT``/``ETHUSDT`` en 1d y 1w); en ese caso no se pide nada a red para
+    ellos y yfinance sólo se usa para DXY/VIX.  Las que falten se descargan de
+    yfinance (``BTC-USD``/``ETH-USD``).
     """
-    btc_d = _descargar_seguro("BTC-USD", "1d")
-    _log_df_info("BTC-USD 1d", btc_d)
-    btc_w = _descargar_seguro("BTC-USD", "1wk")
-    _log_df_info("BTC-USD 1wk", btc_w)
-    eth_d = _descargar_seguro("ETH-USD", "1d")
-    _log_df_info("ETH-USD 1d", eth_d)
-    eth_w = _descargar_seguro("ETH-USD", "1wk")
-    _log_df_info("ETH-USD 1wk", eth_w)
+    btc_d = _serie_cripto(btc_d_klines, "BTC-USD", "1d")
+    _log_df_info("BTC 1d", btc_d)
+    btc_w = _serie_cripto(btc_w_klines, "BTC-USD", "1wk")
+    _log_df_info("BTC 1wk", btc_w)
+    eth_d = _serie_cripto(eth_d_klines, "ETH-USD", "1d")
+    _log_df_info("ETH 1d", eth_d)
+    eth_w = _serie_cripto(eth_w_klines, "ETH-USD", "1wk")
+    _log_df_info("ETH 1wk", eth_w)
 
     # Usamos el ETF UUP como proxy de DXY por la inestabilidad de ^DXY en yfinance
     dxy_d = _descargar_seguro("UUP", "1d")
@@ -317,7 +358,7 @@ def obtener_contexto_mercado() -> ContextoMercado:
             )
         )
     else:
-    log_long.append("DXY sin datos - Score: 0/25")
+        log_long.append("DXY sin datos - Score: 0/25")
     score_long = score_long_btc + score_long_rsi + score_long_eth + score_long_dxy
     log_long.append(f"Score parcial BTC: {score_long_btc}/25")
     log_long.append(f"Score parcial RSI/Vol: {score_long_rsi}/25")
@@ -394,8 +435,8 @@ def obtener_contexto_mercado() -> ContextoMercado:
     log_short.append(f"Score parcial ETH: {score_short_eth}/25")
     log_short.append(f"Score parcial DXY-VIX: {score_short_dxy}/25")
 
-    apto_long = score_long >= config.SCORE_THRESHOLD_LONG
-    apto_short = score_short >= config.SCORE_THRESHOLD_SHORT
+    apto_long = score_long >= getattr(config, "SCORE_THRESHOLD_LONG", 65)
+    apto_short = score_short >= getattr(config, "SCORE_THRESHOLD_SHORT", 65)
     
     for line in log_long:
         logging.info(line)
@@ -0,0 +1,11 @@
+# logic/outcomes.py
+# -*- coding: utf-8 -*-
+"""
+Convenciones compartidas por el backtest (logic.backtest) y el seguimiento en
+vivo (logic.tracker). Viven aparte para que el tracker no arrastre
+pandas/ta/analyzer al importarse.
+"""
+
+DEFAULT_HORIZON = 60  # velas diarias máximas por operación antes de expirar
+
+OUTCOME_TP, OUTCOME_SL, OUTCOME_EXPIRED, OUTCOME_OPEN = "TP", "SL", "EXPIRED", "OPEN"
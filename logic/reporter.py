@@ -0,0 +1,25 @@
+# logic/reporter.py
+# -*- coding: utf-8 -*-
+"""Registro en CSV de los resultados de evaluación (contexto de mercado)."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from utils.file_manager import append_csv
+
+CONTEXTO_CSV = os.path.join("output", "logs", "contexto_mercado.csv")
+
+
+def registrar_contexto_csv(datos: Dict[str, str], archivo: Optional[Union[str, Path]] = None) -> str:
+    """Añade una fila con `datos` al CSV de contexto (cabecera si el fichero es nuevo).
+
+    Devuelve la ruta del fichero escrito.
+    """
+    ruta = Path(archivo or CONTEXTO_CSV)
+    if not ruta.exists() or ruta.stat().st_size == 0:
+        append_csv(datos.keys(), ruta)
+    append_csv((str(v) for v in datos.values()), ruta)
+    return str(ruta)
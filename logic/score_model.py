@@ -0,0 +1,442 @@
+# logic/score_model.py
+# -*- coding: utf-8 -*-
+"""
+Modelos de scoring declarativos.
+
+La especificación completa vive aquí (DEFAULT_MODELS); SCORING_MODELS en
+settings.json sólo lleva overrides, que se fusionan por modelo y por factor:
+
+    "SCORING_MODELS": {"signal_v2": {"factors": {"rr": {"points": [[0, 0], [6, 1]]}}}}
+
+cambia sólo los puntos del factor rr (el resto del factor y del modelo queda
+igual). Un modelo que no está en DEFAULT_MODELS se toma tal cual.
+
+Cada modelo es una lista de factores; cada factor lee una feature, la
+normaliza con una transformación y la pondera en un bloque de factores:
+
+    "adx": {"feature": "adx", "transform": "piecewise",
+            "points": [[12, 0], [32, 1]], "weight": 15, "block": "trend"}
+
+Transformaciones (el valor normalizado suele ir 0..1; NaN → 0):
+- flag:       bool(x) o x == "equals"; "negate" lo invierte.
+- piecewise:  interpolación lineal entre "points" (constante fuera del rango).
+              "scale" divide antes x por una referencia (p. ej.
+              "VOLUMEN_MINIMO_USDT"; referencia <= 0 → 0) y "power" eleva el
+              resultado.
+- band:       0 fuera de (lo, hi), 1 en [lo_ideal, hi_ideal] y rampas lineales.
+              Vértices con "points": [lo, lo_ideal, hi_ideal, hi] o, desde
+              referencias, "range": [ref_lo, ref_hi] + "ideal": [f_lo, f_hi]
+              (ideal = punto medio × f).
+- steps:      valor del mayor umbral alcanzado en "thresholds" [[x, v], ...].
+Cualquier factor admite "by_side": {"LONG": {...}, "SHORT": {...}} con los
+parámetros por lado; los lados sin entrada puntúan 0.
+
+Opciones del modelo: "version", "refs" (referencias a claves de config con su
+default; se resuelven al compilar y se pueden sobreescribir al evaluar),
+"clip" [lo, hi] del total, "round" (decimales de cada bloque) y "round_total".
+
+get_model() compila cada modelo una sola vez y devuelve un ScoringModel que
+evalúa arrays de features (una fila por señal); el scorer v2 del analizador,
+el backtest/sweep y calcular_score comparten así el mismo modelo compilado.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+Transform = Callable[[np.ndarray, Mapping[str, float]], np.ndarray]
+
+SIDES = {"LONG": 1, "SHORT": -1}
+
+DEFAULT_MODELS: Dict[str, Dict[str, Any]] = {
+    # Scorer v2 (logic.analyzer): componentes 0..1 y pesos en puntos
+    "signal_v2": {
+        "version": "2.0",
+        "refs": {"MAX_ATR_PCT": 0.10, "VOLUMEN_MINIMO_USDT": 25_000_000},
+        "clip": [0, 100],
+        "factors": {
+            "regime_align": {"feature": "regime_align", "transform": "flag", "weight": 10, "block": "momentum"},
+            "regime_contra": {"feature": "regime_align", "transform": "flag", "negate": True,
+                              "weight": -8, "block": "momentum"},
+            "trend_strong": {"feature": "trend", "transform": "flag", "equals": 0, "negate": True,
+                             "weight": 20, "block": "trend"},
+            "trend_lateral": {"feature": "trend", "transform": "flag", "equals": 0, "weight": 8, "block": "trend"},
+            "adx": {"feature": "adx", "transform": "piecewise", "points": [[12, 0], [32, 1]],
+                    "weight": 15, "block": "trend"},
+            "rr": {"feature": "rr", "transform": "piecewise", "points": [[0, 0], [3, 1]],
+                   "weight": 18, "block": "risk_reward"},
+            "volatility": {"feature": "atr_pct", "transform": "piecewise", "scale": "MAX_ATR_PCT",
+                           "points": [[0, 0], [1, 1]], "power": 1.5, "weight": -10, "block": "volatility"},
+            "volume": {"feature": "vol_usdt", "transform": "piecewise", "scale": "VOLUMEN_MINIMO_USDT",
+                       "points": [[0, 0], [2, 1]], "weight": 12, "block": "volume"},
+            "vol_3d_up": {"feature": "vol_3d_up", "transform": "flag", "weight": 3, "block": "volume"},
+            "consolidando": {"feature": "consolidando", "transform": "flag", "weight": -6, "block": "momentum"},
+        },
+    },
+    # Scorer clásico (logic.scorer.calcular_score)
+    "scorer_v1": {
+        "version": "1.0",
+        "refs": {"ATR_PCT_MIN": 0.005, "ATR_PCT_MAX": 0.30},
+        "round": 4,
+        "round_total": 6,
+        "factors": {
+            "trend": {"feature": "ema_stack", "transform": "steps",
+                      "thresholds": [[1, 0.3], [2, 0.6], [3, 1.0]], "weight": 30, "block": "trend"},
+            "rsi_1d": {"feature": "rsi_1d", "transform": "band", "weight": 12, "block": "momentum",
+                       "by_side": {"LONG": {"points": [35, 45, 60, 75]},
+                                   "SHORT": {"points": [25, 40, 55, 65]}}},
+            "rsi_1w": {"feature": "rsi_1w", "transform": "band", "weight": 8, "block": "momentum",
+                       "by_side": {"LONG": {"points": [35, 45, 60, 75]},
+                                   "SHORT": {"points": [25, 40, 55, 65]}}},
+            "atr_pct": {"feature": "atr_pct", "transform": "band", "range": ["ATR_PCT_MIN", "ATR_PCT_MAX"],
+                        "ideal": [0.8, 1.2], "weight": 15, "block": "volatility"},
+            "volume": {"feature": "vitalidad", "transform": "piecewise",
+                       "points": [[0.5, 0], [1.0, 0.7], [1.2, 1.0]], "weight": 10, "block": "volume"},
+            "rr": {"feature": "rr", "transform": "steps",
+                   "thresholds": [[1.2, 0.3], [1.5, 0.6], [2.0, 0.9], [2.5, 1.0]],
+                   "weight": 25, "block": "risk_reward"},
+        },
+    },
+}
+
+
+class ScoringModelError(ValueError):
+    pass
+
+
+# ─────────────────────────────────────────────────────────
+# Transformaciones
+# ─────────────────────────────────────────────────────────
+
+def _ref(refs: Mapping[str, float], value: Any) -> float:
+    return float(refs[value]) if isinstance(value, str) else float(value)
+
+
+def _flag(spec: Mapping[str, Any]) -> Transform:
+    equals = spec.get("equals")
+    negate = bool(spec.get("negate", False))
+
+    def fn(x: np.ndarray, refs: Mapping[str, float]) -> np.ndarray:
+        v = (x == equals) if equals is not None else x.astype(bool)
+        return (~v if negate else v).astype(float)
+    return fn
+
+
+def _piecewise(spec: Mapping[str, Any]) -> Transform:
+    pts = np.asarray(spec["points"], dtype=float)
+    xp, fp = pts[:, 0], pts[:, 1]
+    scale = spec.get("scale")
+    power = spec.get("power")
+
+    def fn(x: np.ndarray, refs: Mapping[str, float]) -> np.ndarray:
+        if scale is not None:
+            s = _ref(refs, scale)
+            if s <= 0:
+                return np.zeros(x.shape)
+            x = x / s
+        out = np.interp(x, xp, fp)
+        return out ** float(power) if power is not None else out
+    return fn
+
+
+def _band(spec: Mapping[str, Any]) -> Transform:
+    points = spec.get("points")
+    rng = spec.get("range")
+    ideal = spec.get("ideal", [1.0, 1.0])
+    if points is None and rng is None:
+        raise ScoringModelError("band requiere 'points' o 'range'")
+
+    def fn(x: np.ndarray, refs: Mapping[str, float]) -> np.ndarray:
+        if points is not None:
+            lo, lo_i, hi_i, hi = (_ref(refs, p) for p in points)
+        else:
+            lo, hi = _ref(refs, rng[0]), _ref(refs, rng[1])
+            mid = 0.5 * (lo + hi)
+            lo_i, hi_i = float(ideal[0]) * mid, float(ideal[1]) * mid
+        out = np.interp(x, [lo, lo_i, hi_i, hi], [0.0, 1.0, 1.0, 0.0])
+        return np.where((x <= lo) | (x >= hi), 0.0, out)
+    return fn
+
+
+def _steps(spec: Mapping[str, Any]) -> Transform:
+    th = np.asarray(sorted(spec["thresholds"]), dtype=float)
+    xs, vals = th[:, 0], np.concatenate([[0.0], th[:, 1]])
+
+    def fn(x: np.ndarray, refs: Mapping[str, float]) -> np.ndarray:
+        return vals[np.searchsorted(xs, x, side="right")]
+    return fn
+
+
+def _bounds(spec: Mapping[str, Any]) -> Tuple[float, float]:
+    """Rango (min, max) del valor normalizado de una transformación."""
+    kind = spec.get("transform")
+    if kind == "piecewise":
+        fp = [float(p[1]) for p in spec["points"]]
+        lo, hi = min(fp), max(fp)
+        if spec.get("scale") is not None:
+            lo = min(lo, 0.0)  # referencia <= 0 → 0
+        if spec.get("power") is not None:
+            lo, hi = sorted((max(lo, 0.0) ** float(spec["power"]), max(hi, 0.0) ** float(spec["power"])))
+        return lo, hi
+    if kind == "steps":
+        vals = [0.0] + [float(t[1]) for t in spec["thresholds"]]
+        return min(vals), max(vals)
+    return 0.0, 1.0
+
+
+def _ref_names(spec: Mapping[str, Any]) -> FrozenSet[str]:
+    """Referencias (claves de refs) que usa una transformación."""
+    values = [spec.get("scale"), *(spec.get("range") or [])]
+    if spec.get("transform") == "band":
+        values += list(spec.get("points") or [])
+    return frozenset(v for v in values if isinstance(v, str))
+
+
+_TRANSFORMS: Dict[str, Callable[[Mapping[str, Any]], Transform]] = {
+    "flag": _flag,
+    "piecewise": _piecewise,
+    "band": _band,
+    "steps": _steps,
+}
+
+
+def _compile_transform(spec: Mapping[str, Any]) -> Transform:
+    kind = spec.get("transform")
+    if kind not in _TRANSFORMS:
+        raise ScoringModelError(f"transformación desconocida: {kind!r}")
+    return _TRANSFORMS[kind](spec)
+
+
+# ─────────────────────────────────────────────────────────
+# Modelo compilado
+# ─────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class _Factor:
+    name: str
+    feature: str
+    weight: float
+    block: str
+    fn: Optional[Transform]                     # None → por lado
+    by_side: Dict[int, Transform] = field(default_factory=dict)
+    bounds: Tuple[float, float] = (0.0, 1.0)    # rango del valor normalizado
+    refs: FrozenSet[str] = frozenset()          # referencias de las que depende
+
+    def evaluate(self, x: np.ndarray, side: Optional[np.ndarray], refs: Mapping[str, float]) -> np.ndarray:
+        finite = np.isfinite(x) if x.dtype.kind == "f" else np.ones(x.shape, dtype=bool)
+        x0 = np.where(finite, x, 0) if x.dtype.kind == "f" else x
+        if self.fn is not None:
+            out = self.fn(x0, refs)
+        else:
+            out = np.zeros(x.shape)
+            if side is None:
+                raise ScoringModelError(f"el factor {self.name!r} necesita el lado de la señal")
+            for s, fn in self.by_side.items():
+                mask = side == s
+                if mask.any():
+                    out = np.where(mask, fn(x0, refs), out)
+        return np.where(finite, out, 0.0)
+
+
+@dataclass(frozen=True)
+class ScoringModel:
+    name: str
+    version: str
+    factors: Tuple[_Factor, ...]
+    refs: Dict[str, float]
+    clip: Optional[Tuple[float, float]] = None
+    round: Optional[int] = None
+    round_total: Optional[int] = None
+
+    @property
+    def tag(self) -> str:
+        """Etiqueta de versión que se guarda con cada señal (p. ej. "signal_v2@2.0")."""
+        return f"{self.name}@{self.version}"
+
+    @property
+    def weights(self) -> Dict[str, float]:
+        return {f.name: f.weight for f in self.factors}
+
+    @property
+    def blocks(self) -> Dict[str, str]:
+        return {f.name: f.block for f in self.factors}
+
+    def components(
+        self,
+        features: Mapping[str, Any],
+        side: Optional[np.ndarray] = None,
+        refs: Optional[Mapping[str, float]] = None,
+        only: Optional[Iterable[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """Componentes normalizados por factor (arrays, una fila por señal); `only` limita los factores."""
+        r = {**self.refs, **(refs or {})}
+        side = None if side is None else np.asarray(side)
+        names = None if only is None else set(only)
+        out: Dict[str, np.ndarray] = {}
+        for f in self.factors:
+            if names is not None and f.name not in names:
+                continue
+            try:
+                x = np.atleast_1d(np.asarray(features[f.feature]))
+            except KeyError:
+                raise ScoringModelError(f"{self.name}: falta la feature {f.feature!r}") from None
+            out[f.name] = f.evaluate(x, side, r)
+        return out
+
+    def combine(
+        self,
+        comp: Mapping[str, np.ndarray],
+        weights: Optional[Mapping[str, float]] = None,
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Pondera los componentes → (score, factores_por_bloque)."""
+        w = {**self.weights, **(weights or {})}
+        n = len(next(iter(comp.values())))
+        factors: Dict[str, np.ndarray] = {}
+        for f in self.factors:
+            factors[f.block] = factors.get(f.block, np.zeros(n)) + w[f.name] * comp[f.name]
+        if self.round is not None:
+            factors = {k: np.round(v, self.round) for k, v in factors.items()}
+        score = sum(factors.values())
+        if self.round_total is not None:
+            score = np.round(score, self.round_total)
+        if self.clip is not None:
+            score = np.clip(score, self.clip[0], self.clip[1])
+        return score, factors
+
+    def evaluate(
+        self,
+        features: Mapping[str, Any],
+        side: Optional[np.ndarray] = None,
+        refs: Optional[Mapping[str, float]] = None,
+        weights: Optional[Mapping[str, float]] = None,
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        return self.combine(self.components(features, side, refs), weights)
+
+    def upper_bound(
+        self,
+        known: Optional[Mapping[str, Any]] = None,
+        side: Optional[str] = None,
+        refs: Optional[Mapping[str, float]] = None,
+    ) -> float:
+        """
+        Cota superior del score con sólo algunas features conocidas (`known`):
+        los factores sin feature conocida aportan su máximo posible. Sirve para
+        descartar un símbolo antes de analizarlo (logic.selector).
+        """
+        known = known or {}
+        r = {**self.refs, **(refs or {})}
+        side_arr = None if side is None else np.array([SIDES.get(str(side).upper(), 0)])
+        total = 0.0
+        for f in self.factors:
+            if f.feature in known and (f.fn is not None or side_arr is not None):
+                total += f.weight * float(f.evaluate(np.atleast_1d(np.asarray(known[f.feature])), side_arr, r)[0])
+            else:
+                total += max(f.weight * f.bounds[0], f.weight * f.bounds[1])
+        if self.clip is not None:
+            total = min(max(total, self.clip[0]), self.clip[1])
+        return total
+
+    def evaluate_one(
+        self,
+        features: Mapping[str, Any],
+        side: Optional[str] = None,
+        refs: Optional[Mapping[str, float]] = None,
+    ) -> Tuple[float, Dict[str, float]]:
+        """Atajo escalar: features escalares y lado "LONG"/"SHORT" → (score, factores)."""
+        side_arr = None if side is None else np.array([SIDES.get(str(side).upper(), 0)])
+        score, factors = self.evaluate(features, side_arr, refs)
+        return float(score[0]), {k: float(v[0]) for k, v in factors.items()}
+
+
+def compile_model(name: str, spec: Mapping[str, Any], cfg: Any = None) -> ScoringModel:
+    """Valida y compila la especificación de un modelo."""
+    if not spec.get("factors"):
+        raise ScoringModelError(f"{name}: el modelo no define factores")
+    factors = []
+    for fname, fspec in spec["factors"].items():
+        try:
+            by_side = fspec.get("by_side")
+            if by_side:
+                fn = None
+                sides = {
+                    SIDES[s.upper()]: _compile_transform({**fspec, **params})
+                    for s, params in by_side.items()
+                }
+            else:
+                fn, sides = _compile_transform(fspec), {}
+            variants = [{**fspec, **params} for params in by_side.values()] if by_side else [fspec]
+            lo = min(_bounds(v)[0] for v in variants)
+            hi = max(_bounds(v)[1] for v in variants)
+            if by_side:
+                lo = min(lo, 0.0)  # lados sin entrada puntúan 0
+            used = frozenset().union(*(_ref_names(v) for v in variants))
+            factors.append(_Factor(fname, str(fspec["feature"]), float(fspec["weight"]),
+                                   str(fspec.get("block", fname)), fn, sides, (lo, hi), used))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ScoringModelError(f"{name}.{fname}: especificación inválida ({e})") from e
+
+    refs = {}
+    for key, default in (spec.get("refs") or {}).items():
+        refs[key] = float(getattr(cfg, key, default) or default) if cfg is not None else float(default)
+    clip = spec.get("clip")
+    return ScoringModel(
+        name=name,
+        version=str(spec.get("version", "0")),
+        factors=tuple(factors),
+        refs=refs,
+        clip=(float(clip[0]), float(clip[1])) if clip else None,
+        round=spec.get("round"),
+        round_total=spec.get("round_total"),
+    )
+
+
+# ─────────────────────────────────────────────────────────
+# Registro (compilación única por proceso)
+# ─────────────────────────────────────────────────────────
+
+_MODELS: Dict[str, ScoringModel] = {}
+_LOCK = threading.Lock()
+
+
+def merge_spec(base: Mapping[str, Any], override: Mapping[str, Any]) -> Dict[str, Any]:
+    """Aplica un override de settings sobre una especificación (por factor y por referencia)."""
+    out = {**base, **override}
+    out["refs"] = {**(base.get("refs") or {}), **(override.get("refs") or {})}
+    factors = {name: dict(f) for name, f in (base.get("factors") or {}).items()}
+    for name, f in (override.get("factors") or {}).items():
+        factors[name] = {**factors.get(name, {}), **f}
+    out["factors"] = factors
+    return out
+
+
+def _specs(cfg: Any) -> Dict[str, Mapping[str, Any]]:
+    specs: Dict[str, Mapping[str, Any]] = dict(DEFAULT_MODELS)
+    for name, override in (getattr(cfg, "SCORING_MODELS", None) or {}).items():
+        specs[name] = merge_spec(specs[name], override) if name in specs else override
+    return specs
+
+
+def get_model(name: str) -> ScoringModel:
+    """Modelo compilado `name` (se compila en el primer uso con la config actual)."""
+    model = _MODELS.get(name)
+    if model is not None:
+        return model
+    import config
+
+    with _LOCK:
+        if name not in _MODELS:
+            specs = _specs(config)
+            if name not in specs:
+                raise ScoringModelError(f"modelo de scoring desconocido: {name!r}")
+            _MODELS[name] = compile_model(name, specs[name], config)
+        return _MODELS[name]
+
+
+def reload_models() -> None:
+    """Descarta los modelos compilados (se recompilan en el siguiente get_model)."""
+    with _LOCK:
+        _MODELS.clear()
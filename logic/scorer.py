@@ -2,7 +2,10 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, Tuple, Optional
-import math
+
+import numpy as np
+
+from logic.score_model import get_model
 
 # Importa config si existe; usa defaults si no.
 try:
@@ -18,31 +21,6 @@ except Exception:
     config = _Cfg()  # type: ignore
 
 
-# ───────────────────────── helpers ─────────────────────────
-def _clamp(x: float, lo: float, hi: float) -> float:
-    return max(lo, min(hi, x))
-
-def _lin(x: float, x0: float, x1: float) -> float:
-    """Interpolación lineal 0..1 entre x0..x1."""
-    if x1 == x0:
-        return 0.0
-    return _clamp((x - x0) / (x1 - x0), 0.0, 1.0)
-
-def _score_band(x: Optional[float], lo: float, lo_ideal: float, hi_ideal: float, hi: float) -> float:
-    """
-    0 si x<=lo o x>=hi; 1 si x en [lo_ideal, hi_ideal]; rampas lineales en los bordes.
-    """
-    if x is None or math.isnan(x):
-        return 0.0
-    if x <= lo or x >= hi:
-        return 0.0
-    if lo_ideal <= x <= hi_ideal:
-        return 1.0
-    if x < lo_ideal:
-        return _lin(x, lo, lo_ideal)
-    return 1.0 - _lin(x, hi_ideal, hi)
-
-
 # ───────────────────────── inferir sesgo ─────────────────────────
 def inferir_bias(ctx: Dict) -> str:
     """
@@ -97,6 +75,52 @@ def inferir_bias(ctx: Dict) -> str:
     return "NONE"
 
 
+def inferir_bias_arrays(
+    ema_fast_d: np.ndarray,
+    ema_slow_d: np.ndarray,
+    ema_fast_w: np.ndarray,
+    ema_slow_w: np.ndarray,
+    rsi_d: np.ndarray,
+    rsi_w: np.ndarray,
+    atr_pct: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Versión vectorizada de :func:`inferir_bias` (mismas reglas y BIAS_MODE).
+    Devuelve un array int8: +1 LONG, -1 SHORT, 0 NONE.
+    Un NaN en un RSI equivale a "no disponible" (como el None del escalar).
+    """
+    e20d = np.asarray(ema_fast_d, dtype=float)
+    e50d = np.asarray(ema_slow_d, dtype=float)
+    e20w = np.asarray(ema_fast_w, dtype=float)
+    e50w = np.asarray(ema_slow_w, dtype=float)
+    rd = np.asarray(rsi_d, dtype=float)
+    rw = np.asarray(rsi_w, dtype=float)
+
+    mode = str(getattr(config, "BIAS_MODE", "relaxed")).lower()
+
+    up_d, down_d = e20d > e50d, e20d < e50d
+    up_w, down_w = e20w > e50w, e20w < e50w
+    rd_na, rw_na = np.isnan(rd), np.isnan(rw)
+
+    if mode in ("position", "weekly_strict"):
+        long_ = up_w & (rw_na | (rw >= 50)) & ~down_d & (rd_na | (rd >= 45))
+        short = down_w & (rw_na | (rw <= 50)) & ~up_d & (rd_na | (rd <= 55))
+    elif mode == "strict":
+        long_ = up_d & up_w & (rd_na | (rd >= 45)) & (rw_na | (rw >= 45))
+        short = down_d & down_w & (rd_na | (rd <= 55)) & (rw_na | (rw <= 55))
+    else:
+        long_ = up_d & ~down_w
+        short = down_d & ~up_w
+
+    out = np.where(long_, 1, np.where(short, -1, 0)).astype(np.int8)
+
+    atr_max = getattr(config, "ATR_PCT_MAX", None)
+    if atr_max is not None and isinstance(atr_max, (int, float)) and atr_pct is not None:
+        atrp = np.asarray(atr_pct, dtype=float)
+        out[atrp > float(atr_max) * 1.05] = 0
+    return out
+
+
 # ───────────────────────── modelo esperado ─────────────────────────
 @dataclass
 class _TecView:
@@ -118,9 +142,9 @@ class _TecView:
 def calcular_score(tec, bias: Optional[str] = None) -> Tuple[float, Dict[str, float]]:
     """
     Devuelve (score_total, factores) donde factores = {trend, volume, momentum, volatility, risk_reward}.
-    0..100. Ponderaciones:
+    0..100. Modelo "scorer_v1" de logic.score_model; ponderaciones por defecto:
       - Trend      30
-      - Momentum   20
+      - Momentum   20 (RSI 1d 12 + RSI 1w 8)
       - Volatility 15
       - Volume     10
       - R/R        25
@@ -140,91 +164,49 @@ def calcular_score(tec, bias: Optional[str] = None) -> Tuple[float, Dict[str, fl
         sl=_asfloat(getattr(tec, "sl", getattr(tec, "stop_loss", None))),
     )
 
-    # Ponderaciones
-    W_TREND, W_MOM, W_VOLAT, W_VOL, W_RR = 30.0, 20.0, 15.0, 10.0, 25.0
-
-    # 1) Trend
-    trend_s = 0.0
+    # Features del modelo "scorer_v1" (bandas y pesos en logic.score_model)
     if tv.tipo == "LONG":
         if _gt(tv.ema20, tv.ema50) and _gt(tv.ema50, tv.ema200):
-            trend_s = 1.0
+            ema_stack = 3
         elif _gt(tv.ema20, tv.ema50):
-            trend_s = 0.6
+            ema_stack = 2
         elif tv.ema200 is not None and tv.precio > tv.ema200:
-            trend_s = 0.3
+            ema_stack = 1
+        else:
+            ema_stack = 0
     elif tv.tipo == "SHORT":
         if _lt(tv.ema20, tv.ema50) and _lt(tv.ema50, tv.ema200):
-            trend_s = 1.0
+            ema_stack = 3
         elif _lt(tv.ema20, tv.ema50):
-            trend_s = 0.6
+            ema_stack = 2
         elif tv.ema200 is not None and tv.precio < tv.ema200:
-            trend_s = 0.3
-
-    # 2) Momentum (RSI)
-    if tv.tipo == "LONG":
-        mom_d = _score_band(tv.rsi_1d, 35, 45, 60, 75)
-        mom_w = _score_band(tv.rsi_1w, 35, 45, 60, 75)
-    elif tv.tipo == "SHORT":
-        mom_d = _score_band(tv.rsi_1d, 25, 40, 55, 65)
-        mom_w = _score_band(tv.rsi_1w, 25, 40, 55, 65)
-    else:
-        mom_d = mom_w = 0.0
-    momentum_s = 0.6 * mom_d + 0.4 * mom_w
-
-    # 3) Volatility (ATR%)
-    atr_pct = None
-    if tv.atr is not None and tv.precio > 0:
-        atr_pct = tv.atr / tv.precio
-    atr_min = float(getattr(config, "ATR_PCT_MIN", 0.005))  # 0.5%
-    atr_max = float(getattr(config, "ATR_PCT_MAX", 0.30))   # 30%
-    if atr_pct is None:
-        volat_s = 0.0
+            ema_stack = 1
+        else:
+            ema_stack = 0
     else:
-        mid = 0.5 * (atr_min + atr_max)
-        lo_i, hi_i = 0.8 * mid, 1.2 * mid
-        volat_s = _score_band(atr_pct, atr_min, lo_i, hi_i, atr_max)
+        ema_stack = 0
+
+    atr_pct = tv.atr / tv.precio if tv.atr is not None and tv.precio > 0 else None
 
-    # 4) Volume (vitalidad = vol_act / vol_avg)
     vitalidad = None
     if tv.volumen_actual and tv.volumen_promedio and tv.volumen_promedio > 0:
         vitalidad = tv.volumen_actual / tv.volumen_promedio
-    if vitalidad is None:
-        vol_s = 0.0
-    else:
-        if vitalidad >= 1.2:
-            vol_s = 1.0
-        elif vitalidad >= 1.0:
-            vol_s = 0.7 + 0.3 * _lin(vitalidad, 1.0, 1.2)
-        else:
-            vol_s = 0.7 * _lin(vitalidad, 0.5, 1.0)
 
-    # 5) Risk/Reward
     entry = _asfloat(getattr(tec, "entry", None)) or tv.precio
-    rr_s = 0.0
+    rr = None
     if tv.tp is not None and tv.sl is not None and entry is not None:
         r = abs(entry - tv.sl)
-        R = (abs(tv.tp - entry) / r) if r > 0 else 0.0
-        if R >= 2.5:
-            rr_s = 1.0
-        elif R >= 2.0:
-            rr_s = 0.9
-        elif R >= 1.5:
-            rr_s = 0.6
-        elif R >= 1.2:
-            rr_s = 0.3
-        else:
-            rr_s = 0.0
-    else:
-        rr_s = 0.0
-
-    factors = {
-        "trend": round(W_TREND * trend_s, 4),
-        "momentum": round(W_MOM * momentum_s, 4),
-        "volatility": round(W_VOLAT * volat_s, 4),
-        "volume": round(W_VOL * vol_s, 4),
-        "risk_reward": round(W_RR * rr_s, 4),
+        rr = (abs(tv.tp - entry) / r) if r > 0 else 0.0
+
+    features = {
+        "ema_stack": ema_stack,
+        "rsi_1d": _nan(tv.rsi_1d),
+        "rsi_1w": _nan(tv.rsi_1w),
+        "atr_pct": _nan(atr_pct),
+        "vitalidad": _nan(vitalidad),
+        "rr": _nan(rr),
     }
-    total = round(sum(factors.values()), 6)
+    total, factors = get_model("scorer_v1").evaluate_one(features, tv.tipo)
     return total, factors
 
 
@@ -240,6 +222,9 @@ def _asfloat(x) -> Optional[float]:
     except Exception:
         return None
 
+def _nan(x: Optional[float]) -> float:
+    return float("nan") if x is None else float(x)
+
 def _gt(a: Optional[float], b: Optional[float]) -> bool:
     return (a is not None) and (b is not None) and (a > b)
 
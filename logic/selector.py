@@ -0,0 +1,88 @@
+# logic/selector.py
+# -*- coding: utf-8 -*-
+"""
+Selección en streaming de los K mejores candidatos del escaneo.
+
+En lugar de acumular todos los resultados, ordenarlos y recortar SEND_TOP_N
+para luego descartar por cooldown/cupo, TopKSelector mantiene un min-heap
+acotado con los candidatos ELEGIBLES a medida que llega cada resultado de
+analizar_simbolo:
+- K = min(SEND_TOP_N, cupo diario restante): nunca se guarda lo que no se
+  podrá enviar.
+- `eligible(symbol)` (cooldown por símbolo) se comprueba antes de admitir.
+- `can_enter(cota)` permite al escaneo saltarse un símbolo cuya mejor
+  puntuación alcanzable (ScoringModel.upper_bound) no supera el peor del heap.
+
+Empates: gana el que llegó antes (como el sort estable del flujo anterior).
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class TopKSelector:
+    def __init__(self, k: int, eligible: Optional[Callable[[str], bool]] = None):
+        self.k = max(0, int(k))
+        self.eligible = eligible
+        self._heap: List[Tuple[float, int, str, Any]] = []   # (score, -orden, símbolo, item)
+        self._seq = itertools.count()
+        self.offered = 0
+        self.ineligible = 0
+        self.pruned = 0      # símbolos descartados por cota antes de analizarlos
+
+    # ---------- estado ----------
+    @property
+    def full(self) -> bool:
+        return len(self._heap) >= self.k
+
+    @property
+    def threshold(self) -> float:
+        """Score mínimo para entrar (−inf mientras haya hueco; +inf si K=0)."""
+        if self.k == 0:
+            return float("inf")
+        return self._heap[0][0] if self.full else float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    # ---------- API ----------
+    def is_eligible(self, symbol: str) -> bool:
+        return self.eligible is None or bool(self.eligible(symbol))
+
+    def can_enter(self, upper_bound: float) -> bool:
+        """¿Puede un candidato con score <= upper_bound entrar en el top K?"""
+        return upper_bound > self.threshold
+
+    def prune(self, symbol: str, upper_bound: float) -> bool:
+        """True si el símbolo se puede omitir sin analizar (no elegible o cota insuficiente)."""
+        if not self.is_eligible(symbol):
+            self.ineligible += 1
+            return True
+        if not self.can_enter(upper_bound):
+            self.pruned += 1
+            return True
+        return False
+
+    def offer(self, symbol: str, score: float, item: Any) -> bool:
+        """Propone un candidato; devuelve True si queda (por ahora) en el top K."""
+        self.offered += 1
+        if self.k == 0:
+            return False
+        if not self.is_eligible(symbol):
+            self.ineligible += 1
+            return False
+        entry = (float(score), -next(self._seq), symbol, item)
+        if not self.full:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] <= self._heap[0][:2]:
+            return False
+        heapq.heapreplace(self._heap, entry)
+        return True
+
+    def items(self) -> List[Any]:
+        """Candidatos seleccionados, de mayor a menor score."""
+        return [e[3] for e in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
@@ -0,0 +1,344 @@
+# logic/sweep.py
+# -*- coding: utf-8 -*-
+"""
+Barrido paralelo de parámetros sobre el backtest vectorizado.
+
+- Carga UNA vez los klines del universo y calcula con logic.backtest todo lo
+  que no depende de los parámetros barridos (indicadores, sesgo, filtros
+  estructurales y los componentes del score v2 cuyos factores no leen el R:R
+  ni el tope de ATR%; la lista sale del modelo compilado).
+- Lo empaqueta en un panel (campos × velas, símbolos concatenados y separados
+  por `horizon` velas NaN) dentro de memoria compartida.
+- Un pool de procesos se adjunta al panel sin copiarlo y evalúa cada
+  combinación: filtros ADX/ATR%, niveles, R:R, el resto de componentes (con el
+  mismo modelo que el backtest, _score_v2_components), score, umbral y TP/SL.
+- Devuelve una tabla compacta (una fila por combinación) ordenada por métricas.
+
+Parámetros barribles: atr_sl_mult, tp_r_mult, adx_min, max_atr_pct, min_score
+y cualquier peso del scorer v2 con prefijo "w_" (p. ej. "w_rr", "w_volume").
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+import logic.analyzer as an
+from logic.analyzer import SCORE_V2_WEIGHTS, _score_v2_combine, _score_v2_components
+from logic.backtest import (
+    DEFAULT_HORIZON,
+    KLINES_DIR,
+    OUTCOME_OPEN,
+    OUTCOME_SL,
+    OUTCOME_TP,
+    SignalParams,
+    base_mask,
+    compute_features,
+    levels_arrays,
+    list_symbols,
+    load_klines,
+    market_regime,
+    simulate_trades,
+)
+
+logger = logging.getLogger("sweep")
+
+PARAM_KEYS = ("atr_sl_mult", "tp_r_mult", "adx_min", "max_atr_pct", "min_score")
+WEIGHT_PREFIX = "w_"
+
+# Features y referencias del score v2 que dependen de parámetros barridos: el
+# R:R (niveles: atr_sl_mult, tp_r_mult) y el tope de ATR% (max_atr_pct)
+_SWEPT_FEATURES = frozenset({"rr"})
+_SWEPT_REFS = frozenset({"MAX_ATR_PCT"})
+
+# Entradas de _score_v2_components que se guardan crudas en el panel
+_SCORE_INPUTS = ("adx", "atr_pct", "vol_usdt", "vol_3d_up", "trend", "consolidando", "regime_align")
+_BASE_FIELDS = (
+    "open_time", "high", "low", "close", "last_idx", "base_ok", "side",
+    "atr", "swing_low", "swing_high",
+) + _SCORE_INPUTS
+
+DEFAULT_SORT = ("total_r", "profit_factor")
+
+
+# ─────────────────────────────────────────────────────────
+# Panel (se calcula una vez)
+# ─────────────────────────────────────────────────────────
+
+def fixed_components() -> Tuple[str, ...]:
+    """Factores del modelo v2 que no dependen de ningún parámetro barrido (se precalculan)."""
+    return tuple(
+        f.name for f in an._V2_MODEL.factors
+        if f.feature not in _SWEPT_FEATURES and not f.refs & _SWEPT_REFS
+    )
+
+
+def panel_fields() -> Tuple[str, ...]:
+    return _BASE_FIELDS + tuple(f"c_{c}" for c in fixed_components())
+
+def build_panel(
+    data_dir: str = KLINES_DIR,
+    symbols: Optional[Iterable[str]] = None,
+    horizon: int = DEFAULT_HORIZON,
+) -> Tuple[np.ndarray, List[str]]:
+    """
+    Panel float64 (len(panel_fields()) × N) con todos los símbolos concatenados.
+    Entre símbolos se insertan `horizon` velas NaN para que las ventanas de
+    simulación nunca crucen de un símbolo al siguiente.
+    """
+    base = SignalParams()
+    fields = panel_fields()
+    fixed = fixed_components()
+    regime = market_regime(load_klines(data_dir, "BTCUSDT", "1d"), load_klines(data_dir, "ETHUSDT", "1d"))
+    exclude = set(getattr(config, "EXCLUDE_SYMBOLS", []))
+    universe = [s for s in (symbols or list_symbols(data_dir)) if s not in exclude]
+
+    blocks: List[np.ndarray] = []
+    used: List[str] = []
+    offset = 0
+    pad = max(1, int(horizon))
+    for sym in universe:
+        try:
+            feat = compute_features(load_klines(data_dir, sym, "1d"), load_klines(data_dir, sym, "1w"), regime)
+        except Exception as e:
+            logger.info(f"{sym} omitido en panel: {e}")
+            continue
+        n = len(feat["close"])
+        if n == 0:
+            continue
+
+        side = np.where(feat["bias"] >= 0, 1.0, -1.0)
+        comp = _score_v2_components(
+            side, feat["close"], feat["close"], feat["close"], *(feat[k] for k in _SCORE_INPUTS),
+            atr_cap=base.atr_cap, vmin=base.score_vmin, only=fixed,
+        )
+        cols = {
+            "open_time": feat["open_time"].astype(float),
+            "high": feat["high"],
+            "low": feat["low"],
+            "close": feat["close"],
+            "last_idx": np.full(n, offset + n - 1, dtype=float),
+            "base_ok": base_mask(feat, base.vol_min).astype(float),
+            "side": side,
+            "atr": feat["atr"],
+            "swing_low": feat["swing_low"],
+            "swing_high": feat["swing_high"],
+            **{k: np.asarray(feat[k], dtype=float) for k in _SCORE_INPUTS},
+            **{f"c_{c}": comp[c] for c in fixed},
+        }
+        block = np.full((len(fields), n + pad), np.nan)
+        for i, name in enumerate(fields):
+            block[i, :n] = cols[name]
+        block[fields.index("base_ok"), n:] = 0.0
+        blocks.append(block)
+        used.append(sym)
+        offset += n + pad
+
+    if not blocks:
+        return np.empty((len(fields), 0)), []
+    return np.concatenate(blocks, axis=1), used
+
+
+class SharedPanel:
+    """Copia el panel a memoria compartida; los workers lo abren por nombre."""
+
+    def __init__(self, panel: np.ndarray) -> None:
+        self.shape = panel.shape
+        self.dtype = panel.dtype.str
+        self.shm = SharedMemory(create=True, size=max(1, panel.nbytes))
+        np.ndarray(self.shape, dtype=panel.dtype, buffer=self.shm.buf)[:] = panel
+
+    @property
+    def spec(self) -> Tuple[str, Tuple[int, ...], str]:
+        return self.shm.name, self.shape, self.dtype
+
+    def close(self) -> None:
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "SharedPanel":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# Estado por proceso worker
+_PANEL: Optional[np.ndarray] = None
+_SHM: Optional[SharedMemory] = None
+_HORIZON: int = DEFAULT_HORIZON
+
+
+def _attach(name: str, shape: Tuple[int, ...], dtype: str, horizon: int) -> None:
+    """Initializer del pool: vista numpy sobre el bloque compartido (sin copia)."""
+    global _PANEL, _SHM, _HORIZON
+    # Los hijos comparten el resource_tracker del padre: el registro es único y
+    # lo libera SharedPanel.close() en el padre (unlink).
+    _SHM = SharedMemory(name=name)
+    _PANEL = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_SHM.buf)
+    _HORIZON = int(horizon)
+
+
+def _evaluate_worker(combo: Dict[str, Any]) -> Dict[str, Any]:
+    assert _PANEL is not None, "panel no adjunto"
+    return evaluate_params(_PANEL, combo, _HORIZON)
+
+
+# ─────────────────────────────────────────────────────────
+# Evaluación de una combinación
+# ─────────────────────────────────────────────────────────
+
+def _split_combo(combo: Dict[str, Any]) -> Tuple[SignalParams, Dict[str, float]]:
+    kwargs = {k: combo[k] for k in PARAM_KEYS if k in combo}
+    weights = {k[len(WEIGHT_PREFIX):]: float(v) for k, v in combo.items() if k.startswith(WEIGHT_PREFIX)}
+    return SignalParams(**kwargs), weights
+
+
+def _metrics(r: np.ndarray, outcome: np.ndarray, exit_time: np.ndarray,
+             entry_time: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    closed = outcome != OUTCOME_OPEN
+    rc = r[closed]
+    n_tp = int((outcome == OUTCOME_TP).sum())
+    n_sl = int((outcome == OUTCOME_SL).sum())
+    gains, losses = float(rc[rc > 0].sum()), float(-rc[rc < 0].sum())
+    # Mismo orden que summarize(): exit_time, open_time y símbolo (orden del panel)
+    keys = (exit_time[closed],) if entry_time is None else (entry_time[closed], exit_time[closed])
+    equity = np.cumsum(rc[np.lexsort(keys)])
+    drawdown = float((np.maximum.accumulate(np.maximum(equity, 0.0)) - equity).max()) if len(equity) else 0.0
+    return {
+        "signals": int(len(r)),
+        "tp": n_tp,
+        "sl": n_sl,
+        "hit_rate": (n_tp / (n_tp + n_sl)) if (n_tp + n_sl) else 0.0,
+        "avg_r": float(rc.mean()) if len(rc) else 0.0,
+        "total_r": float(rc.sum()),
+        "profit_factor": (gains / losses) if losses > 0 else (float("inf") if gains > 0 else 0.0),
+        "max_drawdown_r": drawdown,
+    }
+
+
+def evaluate_params(panel: np.ndarray, combo: Dict[str, Any], horizon: int = DEFAULT_HORIZON) -> Dict[str, Any]:
+    """Métricas de una combinación sobre el panel (sólo se recalcula lo que depende de ella)."""
+    p, weights = _split_combo(combo)
+    fields = {name: i for i, name in enumerate(panel_fields())}
+    fixed = fixed_components()
+    row = lambda name: panel[fields[name]]  # noqa: E731
+
+    close, atr, atr_pct, side = row("close"), row("atr"), row("atr_pct"), row("side")
+    valid = row("base_ok") > 0
+    with np.errstate(invalid="ignore"):
+        if p.adx_min:
+            valid &= ~(row("adx") < float(p.adx_min))
+        if p.max_atr_pct is not None:
+            valid &= ~(atr_pct > float(p.max_atr_pct))
+    idx = np.flatnonzero(valid)
+
+    c, a, s = close[idx], atr[idx], side[idx]
+    sl, tp = levels_arrays(c, a, row("swing_low")[idx], row("swing_high")[idx], s, p.atr_sl_mult, p.tp_r_mult)
+
+    # Precalculados + los que dependen de la combinación, por el mismo modelo que el backtest
+    comp = {name: row(f"c_{name}")[idx] for name in fixed}
+    comp.update(_score_v2_components(
+        s, c, sl, tp, *(row(k)[idx] for k in _SCORE_INPUTS),
+        atr_cap=p.atr_cap, vmin=p.score_vmin,
+        only=[f.name for f in an._V2_MODEL.factors if f.name not in comp],
+    ))
+    score, _ = _score_v2_combine(comp, weights)
+
+    hit = score >= float(p.min_score)
+    idx, s, c, sl, tp = idx[hit], s[hit], c[hit], sl[hit], tp[hit]
+    sim = simulate_trades(row("high"), row("low"), close, idx, s, c, sl, tp, horizon,
+                          last_idx=row("last_idx")[idx].astype(np.int64))
+    exit_time = row("open_time")[sim["exit_idx"]] if len(idx) else np.empty(0)
+    return {**combo, **_metrics(sim["r"], sim["outcome"], exit_time, row("open_time")[idx])}
+
+
+# ─────────────────────────────────────────────────────────
+# Barrido
+# ─────────────────────────────────────────────────────────
+
+def expand_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Producto cartesiano de la rejilla {param: [valores]} → lista de combinaciones."""
+    for key in grid:
+        if key not in PARAM_KEYS and not (key.startswith(WEIGHT_PREFIX) and key[len(WEIGHT_PREFIX):] in SCORE_V2_WEIGHTS):
+            raise ValueError(f"Parámetro no barrible: {key}")
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def run_sweep(
+    grid: Dict[str, Sequence[Any]],
+    data_dir: str = KLINES_DIR,
+    symbols: Optional[Iterable[str]] = None,
+    horizon: int = DEFAULT_HORIZON,
+    workers: Optional[int] = None,
+    sort_by: Sequence[str] = DEFAULT_SORT,
+    panel: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """
+    Evalúa todas las combinaciones de `grid` y devuelve la tabla ordenada por
+    `sort_by` (descendente; max_drawdown_r ascendente). workers<=1 → en proceso.
+    """
+    combos = expand_grid(grid)
+    if panel is None:
+        panel, used = build_panel(data_dir, symbols, horizon)
+        logger.info(f"Panel: {len(used)} símbolos, {panel.shape[1]} velas, {panel.nbytes / 1e6:.1f} MB")
+
+    workers = int(workers if workers is not None else (os.cpu_count() or 1))
+    if workers <= 1 or len(combos) <= 1:
+        rows = [evaluate_params(panel, c, horizon) for c in combos]
+    else:
+        with SharedPanel(panel) as shared:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(combos)),
+                initializer=_attach,
+                initargs=(*shared.spec, horizon),
+            ) as pool:
+                chunk = max(1, len(combos) // (workers * 4))
+                rows = list(pool.map(_evaluate_worker, combos, chunksize=chunk))
+
+    table = pd.DataFrame(rows)
+    if len(table) and sort_by:
+        keys = [k for k in sort_by if k in table.columns]
+        table = table.sort_values(keys, ascending=[k == "max_drawdown_r" for k in keys], ignore_index=True)
+    return table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Barrido paralelo de parámetros del analizador.")
+    parser.add_argument("--grid", required=True,
+                        help='JSON (o ruta a .json) con {param: [valores]}, p. ej. {"tp_r_mult": [2, 3]}.')
+    parser.add_argument("--dir", default=KLINES_DIR, help="Carpeta con <SYMBOL>_1d.json / _1w.json.")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help="Velas máximas por operación.")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (default: nº de CPUs).")
+    parser.add_argument("--sort", default=",".join(DEFAULT_SORT), help="Métricas de orden, separadas por coma.")
+    parser.add_argument("--top", type=int, default=20, help="Filas a mostrar.")
+    parser.add_argument("--out", default="", help="CSV de salida con la tabla completa.")
+    args = parser.parse_args()
+
+    raw = args.grid
+    if os.path.exists(raw):
+        with open(raw, "r", encoding="utf-8") as f:
+            raw = f.read()
+    table = run_sweep(json.loads(raw), args.dir, horizon=args.horizon, workers=args.workers,
+                      sort_by=[s.strip() for s in args.sort.split(",") if s.strip()])
+    if args.out:
+        table.to_csv(args.out, index=False)
+    print(table.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# logic/tracker.py
+# -*- coding: utf-8 -*-
+"""
+Seguimiento incremental del resultado de las señales enviadas.
+
+Cada señal enviada se guarda como "abierta" en un JSON compacto. En cada
+escaneo se avanza SÓLO con las velas nuevas que ya están en memoria
+(las klines diarias que run_once descarga para analizar el símbolo), sin
+volver a pedir histórico:
+
+  - velas con open_time <= última vela procesada se ignoran;
+  - la vela en formación sólo puede cerrar la señal por toque de TP/SL
+    (no cuenta para la expiración);
+  - cada vela cerrada suma 1 al contador; al llegar a `horizon` → EXPIRED
+    al close de esa vela.
+
+Mismas convenciones que logic/backtest.simulate_trades: se empieza en la
+vela siguiente a la de la señal, y si TP y SL caen en la misma vela se
+asume SL. El resultado se expresa en múltiplos de R (riesgo = |entry - SL|).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Iterable, List, Optional
+
+import config
+from logic.outcomes import DEFAULT_HORIZON, OUTCOME_EXPIRED, OUTCOME_OPEN, OUTCOME_SL, OUTCOME_TP
+
+logger = logging.getLogger("tracker")
+
+TRACKER_PATH = os.path.join("output", "logs", ".signal_tracker.json")
+MAX_CLOSED = 5000          # histórico de señales cerradas que se conserva
+SCORE_BUCKET_WIDTH = 10    # tramos de score para las tasas de acierto
+
+_LONG = {"LONG", "BUY", "ALCISTA"}
+
+
+# ─────────────────────────────────────────────────────────
+# Señal seguida
+# ─────────────────────────────────────────────────────────
+
+@dataclass
+class TrackedSignal:
+    id: str
+    symbol: str
+    bias: str
+    score: float
+    entry: float
+    sl: float
+    tp: float
+    opened_at: int                      # epoch ms del envío
+    horizon: int = DEFAULT_HORIZON      # velas cerradas hasta expirar
+    last_bar: int = 0                   # open_time de la última vela cerrada procesada
+    bars: int = 0
+    outcome: str = OUTCOME_OPEN
+    exit_price: Optional[float] = None
+    closed_at: Optional[int] = None
+    r: Optional[float] = None
+    model: str = ""                     # versión del modelo de scoring (p. ej. "signal_v2@2.0")
+
+    @property
+    def side(self) -> int:
+        return 1 if self.bias.upper() in _LONG else -1
+
+    @property
+    def is_open(self) -> bool:
+        return self.outcome == OUTCOME_OPEN
+
+    def _close(self, outcome: str, price: float, ts: int) -> None:
+        risk = abs(self.entry - self.sl)
+        self.outcome = outcome
+        self.exit_price = float(price)
+        self.closed_at = int(ts)
+        self.r = round((price - self.entry) * self.side / risk, 4) if risk > 0 else 0.0
+
+    def advance(self, klines: List[list], now_ms: Optional[int] = None) -> bool:
+        """
+        Avanza la señal con las velas de `klines` posteriores a lo ya procesado.
+        Devuelve True si la señal se cierra en esta llamada.
+        """
+        if not self.is_open or not klines:
+            return False
+        now_ms = int(time.time() * 1000) if now_ms is None else int(now_ms)
+        start = max(int(self.last_bar), int(self.opened_at))
+
+        # Sólo la cola nueva: se recorre desde el final hasta lo ya visto
+        new: List[list] = []
+        for k in reversed(klines):
+            if int(k[0]) <= start:
+                break
+            new.append(k)
+
+        for k in reversed(new):
+            ot, hi, lo, cl = int(k[0]), float(k[2]), float(k[3]), float(k[4])
+            ct = int(k[6]) if len(k) > 6 else ot
+            if self.side > 0:
+                hit_sl, hit_tp = lo <= self.sl, hi >= self.tp
+            else:
+                hit_sl, hit_tp = hi >= self.sl, lo <= self.tp
+            if hit_sl:
+                self._close(OUTCOME_SL, self.sl, ct)
+                return True
+            if hit_tp:
+                self._close(OUTCOME_TP, self.tp, ct)
+                return True
+            if ct >= now_ms:
+                break  # vela en formación: sólo cuenta el toque
+            self.bars += 1
+            self.last_bar = ot
+            if self.bars >= self.horizon:
+                self._close(OUTCOME_EXPIRED, cl, ct)
+                return True
+        return False
+
+
+# ─────────────────────────────────────────────────────────
+# Almacén
+# ─────────────────────────────────────────────────────────
+
+def score_bucket(score: float, width: int = SCORE_BUCKET_WIDTH) -> str:
+    lo = int(float(score) // width * width)
+    return f"{lo}-{lo + width}"
+
+
+def _rate_stats(items: Iterable[TrackedSignal]) -> Dict[str, Any]:
+    items = list(items)
+    n_tp = sum(1 for s in items if s.outcome == OUTCOME_TP)
+    n_sl = sum(1 for s in items if s.outcome == OUTCOME_SL)
+    rs = [float(s.r or 0.0) for s in items]
+    return {
+        "closed": len(items),
+        "tp": n_tp,
+        "sl": n_sl,
+        "expired": sum(1 for s in items if s.outcome == OUTCOME_EXPIRED),
+        "hit_rate": (n_tp / (n_tp + n_sl)) if (n_tp + n_sl) else 0.0,
+        "avg_r": (sum(rs) / len(rs)) if rs else 0.0,
+        "total_r": sum(rs),
+    }
+
+
+class SignalTracker:
+    """Señales abiertas/cerradas persistidas en JSON (escritura atómica)."""
+
+    def __init__(self, path: Optional[str] = None, max_closed: Optional[int] = None) -> None:
+        self.path = path or TRACKER_PATH
+        self.max_closed = int(max_closed or getattr(config, "TRACKER_MAX_CLOSED", MAX_CLOSED))
+        self.open: Dict[str, TrackedSignal] = {}
+        self.closed: List[TrackedSignal] = []
+        self._by_symbol: Dict[str, List[str]] = {}
+        self._load()
+
+    # ---------- persistencia ----------
+    @staticmethod
+    def _from_dict(d: Dict[str, Any]) -> TrackedSignal:
+        names = {f.name for f in fields(TrackedSignal)}
+        return TrackedSignal(**{k: v for k, v in d.items() if k in names})
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            for d in raw.get("open", []):
+                self._index(self._from_dict(d))
+            self.closed = [self._from_dict(d) for d in raw.get("closed", [])]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Estado del tracker ilegible ({self.path}): {e}; se reinicia")
+            self.open, self.closed, self._by_symbol = {}, [], {}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = {
+            "open": [asdict(s) for s in self.open.values()],
+            "closed": [asdict(s) for s in self.closed[-self.max_closed:]],
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def _index(self, sig: TrackedSignal) -> None:
+        self.open[sig.id] = sig
+        self._by_symbol.setdefault(sig.symbol, []).append(sig.id)
+
+    # ---------- API ----------
+    def add(
+        self,
+        symbol: str,
+        bias: str,
+        score: float,
+        entry: float,
+        sl: float,
+        tp: float,
+        sig_id: Optional[str] = None,
+        ts: Optional[float] = None,
+        horizon: Optional[int] = None,
+        model: str = "",
+    ) -> TrackedSignal:
+        """Registra una señal enviada (idempotente por `sig_id`)."""
+        sig_id = sig_id or f"{symbol}|{bias}|{entry:.8f}|{sl:.8f}|{tp:.8f}"
+        if sig_id in self.open:
+            return self.open[sig_id]
+        sig = TrackedSignal(
+            id=sig_id,
+            symbol=symbol,
+            bias=(bias or "").upper(),
+            score=float(score),
+            entry=float(entry),
+            sl=float(sl),
+            tp=float(tp),
+            opened_at=int((time.time() if ts is None else ts) * 1000),
+            horizon=int(horizon or getattr(config, "TRACKER_HORIZON_BARS", DEFAULT_HORIZON)),
+            model=model,
+        )
+        self._index(sig)
+        return sig
+
+    def has_open(self, symbol: str) -> bool:
+        return bool(self._by_symbol.get(symbol))
+
+    def update(self, symbol: str, klines: List[list], now_ms: Optional[int] = None) -> List[TrackedSignal]:
+        """Avanza las señales abiertas de `symbol`; devuelve las que se cierran."""
+        ids = self._by_symbol.get(symbol)
+        if not ids or not klines:
+            return []
+        done: List[TrackedSignal] = []
+        for sig_id in list(ids):
+            sig = self.open[sig_id]
+            if sig.advance(klines, now_ms):
+                done.append(sig)
+                ids.remove(sig_id)
+                del self.open[sig_id]
+                self.closed.append(sig)
+        if not ids:
+            self._by_symbol.pop(symbol, None)
+        if len(self.closed) > self.max_closed:
+            self.closed = self.closed[-self.max_closed:]
+        return done
+
+    def stats(self, bucket_width: int = SCORE_BUCKET_WIDTH) -> Dict[str, Any]:
+        """Tasas de acierto y R realizado: global, por sesgo y por tramo de score."""
+        by_bias: Dict[str, List[TrackedSignal]] = {}
+        by_score: Dict[str, List[TrackedSignal]] = {}
+        for s in self.closed:
+            by_bias.setdefault(s.bias, []).append(s)
+            by_score.setdefault(score_bucket(s.score, bucket_width), []).append(s)
+        return {
+            "open": len(self.open),
+            **_rate_stats(self.closed),
+            "by_bias": {k: _rate_stats(v) for k, v in sorted(by_bias.items())},
+            "by_score": {k: _rate_stats(v) for k, v in sorted(by_score.items(), key=lambda kv: int(kv[0].split("-")[0]))},
+        }
+
+
+# ─────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resultados de las señales enviadas (tracker).")
+    parser.add_argument("--path", default=TRACKER_PATH, help="Fichero de estado del tracker.")
+    parser.add_argument("--bucket", type=int, default=SCORE_BUCKET_WIDTH, help="Ancho del tramo de score.")
+    args = parser.parse_args()
+
+    print(json.dumps(SignalTracker(args.path).stats(args.bucket), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,64 @@
 # main.py
-from utils.tp_nxatr import Levels, Side, enforce_tp_nxatr
 from __future__ import annotations
 
 import hashlib
 import json
+import logging
 import os
 import time
-from datetime import datetime, timedelta, timezone
-from typing import List, Tuple
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
 
 import config
+from utils import metrics
 from utils.logger import setup_logging, get_audit_logger
-from notifier.telegram import formatear_senal, enviar_telegram
-from logic.analyzer import analizar_simbolo
+from utils.telegram import formatear_senal
+from logic.incremental import MISS, AnalysisCache, KlineFingerprint
+from logic.selector import TopKSelector
+from logic.tracker import SignalTracker
+from notifier.outbox import OUTBOX_PATH, Outbox, OutboxItem, default_worker
 
 # Datos/mercado
 from utils.data_loader import get_klines  # get_klines(symbol, interval, limit) -> list[list]
 from data.symbols import get_usdt_futures_universe  # universo de símbolos USDT perps
 
 # Macro (VIX/DXY) – opcional, con caché interna
-from utils.macro import get_macro_state, macro_kill_reason, macro_multiplier
+from utils.macro import MacroState, get_macro_state, macro_kill_reason, macro_multiplier
+from utils.bootstrap import BootTask, BootstrapError, run_bootstrap
+from utils.shards import (
+    SHARD_DIR, default_scan_id, load_shards, parse_spec, partition, purge_scan,
+    read_open_symbols, read_priorities, write_open_symbols, write_priorities, write_shard,
+)
+
+# Lo pesado (pandas/ta/numpy: logic.analyzer, logic.batch_scorer,
+# logic.score_model) se importa al primer uso: un arranque que termina pronto
+# (universo caído, top sin cambios) no lo paga. Presupuesto en tests/test_startup.py.
 
 # ─────────────────────────────────────────────────────────
 
 MODE = os.getenv("APP_MODE", "production")
-setup_logging(MODE)
-audit = get_audit_logger()
+# Los handlers a fichero (output/logs) y las métricas se configuran en _init_runtime(), no al importar
+audit = logging.getLogger("audit")
 
 LOG_DIR = os.path.join("output", "logs")
+# Estado JSON anterior al StateStore (state.sqlite3): sólo se lee una vez para migrarlo
 LAST_TOP_PATH = os.path.join(LOG_DIR, ".last_top.json")
 SYMBOL_LOCK_PATH = os.path.join(LOG_DIR, ".symbol_last.json")
 DAY_COUNT_PATH = os.path.join(LOG_DIR, ".day_count.json")
 
+# Timeouts (s) de la fase de arranque; overridables con BOOTSTRAP_TIMEOUTS en settings
+BOOT_TIMEOUTS = {"macro": 8.0, "market": 20.0, "universe": 20.0, "volumes": 10.0}
+
+# Orden del escaneo: score del escaneo anterior (en el StateStore, con TTL) y volumen 24h
+PRIORITY_NS = "scan_prio"
+PRIORITY_TTL = 3 * 86400
 
-def _ensure_dir(path: str) -> None:
-    os.makedirs(path, exist_ok=True)
+# Modo daemon (DAEMON en settings): ticks intradía y margen tras el cierre de vela
+DAEMON_DEFAULTS = {"tick_minutes": 60, "close_delay_s": 30, "run_on_start": True}
+
+_OUTBOXES: Dict[str, Outbox] = {}
+_ANALYSIS_CACHE: Optional[AnalysisCache] = None
 
 
 def _load_json(path: str) -> dict:
@@ -45,10 +69,31 @@ def _load_json(path: str) -> dict:
         return {}
 
 
-def _save_json(path: str, data: dict) -> None:
-    _ensure_dir(os.path.dirname(path))
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def _init_runtime() -> None:
+    setup_logging(MODE)
+    get_audit_logger()
+    metrics.configure_from(config)
+
+
+def _flush_metrics() -> None:
+    """Cierra la ventana de métricas por etapa (JSON + textfile Prometheus)."""
+    opts = metrics.configure_from(config)
+    try:
+        data = metrics.flush(opts["json_path"], opts["prom_path"])
+    except OSError as e:
+        audit.error(f"No se pudieron escribir las métricas: {e}")
+        return
+    if data:
+        total = data["stages"].get("scan.total", {}).get("total_s")
+        audit.info(f"Métricas → {len(data['stages'])} etapas"
+                   + ("" if total is None else f", escaneo {total:.1f}s") + f" ({opts['json_path']})")
+
+
+def analizar_simbolo(*args, **kwargs):
+    """logic.analyzer.analizar_simbolo con import diferido (pandas/ta)."""
+    from logic.analyzer import analizar_simbolo as _analizar
+
+    return _analizar(*args, **kwargs)
 
 
 def _hash_signal(symbol: str, tipo: str, entry: float, sl: float, tp: float) -> str:
@@ -70,49 +115,311 @@ def _ema_bias(klines: list) -> bool:
     return bool(ema20 > ema50)
 
 
-def _get_market_bias() -> Tuple[bool, bool]:
-    """BTC/ETH alcistas (True/False) usando EMA20>EMA50 en diario."""
+def _get_market_bias(btc_d: Optional[list] = None, eth_d: Optional[list] = None) -> Tuple[bool, bool]:
+    """BTC/ETH alcistas (True/False) usando EMA20>EMA50 en diario (últimas 200 velas)."""
     try:
-        btc_d = get_klines("BTCUSDT", "1d", limit=200)
-        eth_d = get_klines("ETHUSDT", "1d", limit=200)
-        return _ema_bias(btc_d), _ema_bias(eth_d)
+        if btc_d is None:
+            btc_d = get_klines("BTCUSDT", "1d", limit=200)
+        if eth_d is None:
+            eth_d = get_klines("ETHUSDT", "1d", limit=200)
+        return _ema_bias(btc_d[-200:]), _ema_bias(eth_d[-200:])
     except Exception:
         return False, False
 
 
-def run_once() -> None:
-    audit.info("Inicio de escaneo…")
+def _fetch_market_klines() -> Dict[str, Dict[str, list]]:
+    """
+    Klines de BTC/ETH descargadas UNA vez por escaneo: sirven para el sesgo de
+    mercado, el contexto (si USE_MARKET_CONTEXT) y el propio análisis del símbolo.
+    """
+    lookback = getattr(config, "LOOKBACK", 400)
+    weekly = bool(getattr(config, "USE_MARKET_CONTEXT", False))
+    out: Dict[str, Dict[str, list]] = {}
+    for sym in ("BTCUSDT", "ETHUSDT"):
+        out[sym] = {"1d": get_klines(sym, "1d", limit=lookback)}
+        if weekly:
+            # El contexto exige >=200 velas semanales (EMA200)
+            out[sym]["1w"] = get_klines(sym, "1w", limit=300)
+    return out
+
+
+def _last_vol_usdt(klines: list) -> Optional[float]:
+    """Volumen USDT de la última vela (typical_price * volume, como el analizador)."""
+    try:
+        k = klines[-1]
+        return (float(k[2]) + float(k[3]) + float(k[4])) / 3.0 * float(k[5])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _score_cross_section(batch: List[tuple], cross: Dict[str, float], btc_ret: float) -> List[tuple]:
+    """
+    Re-puntúa por lotes (logic.batch_scorer) los símbolos analizados con los
+    términos transversales activos y aplica MIN_SCORE_ALERTA al resultado.
+    batch = [(tec, mult_macro, context, retorno_N)].
+    """
+    from logic.batch_scorer import build_feature_array, features_row, score_batch
+
+    arr = build_feature_array(
+        features_row(tec.symbol, tec.score_features, ret) for tec, _, _, ret in batch
+    )
+    scores, factors = score_batch(arr, config, cross=cross, benchmark_ret=btc_ret)
+    min_score = float(getattr(config, "MIN_SCORE_ALERTA", 55))
+    out: List[tuple] = []
+    for i, (tec, mult, context, _) in enumerate(batch):
+        score = max(0.0, float(scores[i]) - float(getattr(tec, "macro_penalty", 0.0) or 0.0))
+        tec.score = score
+        tec.cross_score = float(factors["cross_section"][i])
+        if score < min_score:
+            audit.info(f"{tec.symbol} descartado: score transversal {score:.2f} < {min_score:.2f}")
+            continue
+        out.append((tec, round(score * mult, 2), context))
+    audit.info(f"Scorer transversal: {len(out)}/{len(batch)} sobre el umbral")
+    return out
+
+
+def _open_outbox() -> Outbox:
+    """
+    Outbox + estado (cooldowns, cupo, último top); la primera vez migra los JSON.
+    Se reutiliza por ruta dentro del proceso: en modo daemon cada ciclo usa la
+    misma conexión SQLite (y la entrega en curso del ciclo anterior sigue viva).
+    """
+    outbox = _OUTBOXES.get(OUTBOX_PATH)
+    if outbox is None:
+        outbox = Outbox(OUTBOX_PATH, cooldown_s=float(getattr(config, "SYMBOL_COOLDOWN_HOURS", 24)) * 3600)
+        _OUTBOXES[OUTBOX_PATH] = outbox
+        if _migrate_json_state(outbox, time.time()):
+            audit.info("Estado JSON (.symbol_last/.day_count/.last_top) migrado a state.sqlite3.")
+    return outbox
+
+
+def _migrate_json_state(outbox: Outbox, now_ts: float) -> bool:
+    """
+    Importa una sola vez los JSON anteriores. Sólo se traen las claves aún
+    vigentes (cooldowns sin caducar, cupo de hoy, top dentro del cooldown),
+    con el TTL que les queda.
+    """
+    st = outbox.state
+    if st.get("meta", "json_imported") is not None:
+        return False
+    with st.transaction():
+        for sym, ts in _load_json(SYMBOL_LOCK_PATH).items():
+            left = float(ts) + outbox.cooldown_s - now_ts
+            if left > 0:
+                st.set(Outbox.COOLDOWN_NS, sym, float(ts), ttl=left, now=now_ts)
+        today_key = datetime.fromtimestamp(now_ts, timezone.utc).strftime("%Y-%m-%d")
+        n_today = int(_load_json(DAY_COUNT_PATH).get(today_key, 0) or 0)
+        if n_today:
+            st.set(Outbox.DAY_NS, today_key, n_today, ttl=Outbox.DAY_TTL, now=now_ts)
+        last_top = _load_json(LAST_TOP_PATH)
+        try:
+            age = now_ts - datetime.fromisoformat(last_top["ts"]).timestamp()
+            left = float(getattr(config, "COOLDOWN_MINUTES", 15)) * 60 - age
+            if left > 0:
+                st.set("scan", "last_top", last_top["hash"], ttl=left, now=now_ts)
+        except (KeyError, TypeError, ValueError):
+            pass
+        st.set("meta", "json_imported", now_ts, now=now_ts)
+    return True
+
+
+def _start_delivery(outbox: Outbox) -> None:
+    """
+    Entrega en segundo plano lo pendiente del outbox (incluido lo que quedara de
+    una ejecución anterior). Con OUTBOX["inline_delivery"]=false la entrega la
+    hace un proceso aparte: `python -m notifier.outbox drain --loop 30`.
+    """
+    if not (getattr(config, "OUTBOX", None) or {}).get("inline_delivery", True):
+        return
+    worker = default_worker(outbox)
+    if worker is not None:
+        worker.submit_due()
+
+
+def _analysis_cache() -> Optional[AnalysisCache]:
+    """Caché de resultados de analizar_simbolo (INCREMENTAL_SCAN en settings)."""
+    global _ANALYSIS_CACHE
+    opts = getattr(config, "INCREMENTAL_SCAN", None) or {}
+    if not opts.get("enabled", True):
+        return None
+    if _ANALYSIS_CACHE is None:
+        _ANALYSIS_CACHE = AnalysisCache(
+            close_tol_pct=float(opts.get("close_tol_pct", 0.1)),
+            volume_tol_pct=float(opts.get("volume_tol_pct", 5.0)),
+        )
+    return _ANALYSIS_CACHE
+
+
+@dataclass
+class ScanContext:
+    """Entradas comunes del escaneo (arranque + régimen de mercado + universo)."""
+    ms: MacroState
+    market_kl: Dict[str, Dict[str, list]]
+    btc_up: bool
+    eth_up: bool
+    symbols: List[str]
+    volumes: Dict[str, float] = field(default_factory=dict)   # quoteVolume 24h
+
+
+@dataclass
+class AnalysisRun:
+    """Resultado del paso 3: lote transversal, scores y cobertura del escaneo."""
+    total: int
+    batch: List[tuple] = field(default_factory=list)
+    scores: Dict[str, float] = field(default_factory=dict)  # prioridad del próximo escaneo
+    visited: int = 0
+    elapsed_s: float = 0.0
+    deadline_hit: bool = False
+
+    @property
+    def coverage(self) -> float:
+        return self.visited / self.total if self.total else 1.0
 
-    # 0) Macro (VIX/DXY): se consulta una vez, con caché
-    ms = get_macro_state()
+    def report(self) -> dict:
+        return {"total": self.total, "visited": self.visited, "coverage": round(self.coverage, 4),
+                "elapsed_s": round(self.elapsed_s, 2), "deadline_hit": self.deadline_hit}
+
+
+def _quote_volumes() -> Dict[str, float]:
+    from data.symbols import get_quote_volumes
+
+    return get_quote_volumes()
+
+
+def _prioritize(symbols: List[str], prior: Dict[str, float], volumes: Dict[str, float]) -> List[str]:
+    """
+    Más prometedores primero: score del escaneo anterior y, a igualdad (o sin
+    score), volumen 24h. Con deadline, lo que quede sin analizar es la cola.
+    """
+    return sorted(symbols, key=lambda s: (-float(prior.get(s) or 0.0), -float(volumes.get(s) or 0.0), s))
+
+
+def _scan_deadline(t0: float) -> Optional[float]:
+    budget = float(getattr(config, "SCAN_DEADLINE_S", 0) or 0)
+    return t0 + budget if budget > 0 else None
+
+
+def _prepare_scan() -> Optional[ScanContext]:
+    """Pasos 0-2: arranque, régimen de mercado, contexto opcional y universo."""
+    # 0) Arranque concurrente: macro (VIX/DXY), klines BTC/ETH y universo, con
+    #    timeout por tarea y modo degradado (macro neutra / sesgo bajista)
+    timeouts = {**BOOT_TIMEOUTS, **(getattr(config, "BOOTSTRAP_TIMEOUTS", None) or {})}
+    try:
+        boot = run_bootstrap([
+            BootTask("macro", get_macro_state, timeouts["macro"],
+                     fallback=lambda: MacroState(None, None, None, None, ts=time.time())),
+            BootTask("market", _fetch_market_klines, timeouts["market"],
+                     fallback=lambda: {s: {"1d": []} for s in ("BTCUSDT", "ETHUSDT")}),
+            BootTask("universe", get_usdt_futures_universe, timeouts["universe"], required=True),
+            BootTask("volumes", _quote_volumes, timeouts["volumes"], fallback=dict),
+        ], audit)
+    except BootstrapError as e:
+        audit.error(f"No se pudo obtener el universo USDT Futures: {e}")
+        return None
+
+    ms = boot["macro"].value
     vix_txt = "—" if ms.vix_last is None else f"{ms.vix_last:.1f}"
     dxy_txt = "—" if ms.dxy_last is None else f"{ms.dxy_last:.2f}"
     vix_pc5_txt = "—" if ms.vix_pc5 is None else f"{ms.vix_pc5:+.2f}%"
     dxy_pc5_txt = "—" if ms.dxy_pc5 is None else f"{ms.dxy_pc5:+.2f}%"
     audit.info(f"Macro → VIX {vix_txt} ({vix_pc5_txt}/5d) | DXY {dxy_txt} ({dxy_pc5_txt}/5d)")
 
-    # 1) Régimen de mercado (BTC/ETH)
-    btc_up, eth_up = _get_market_bias()
+    # 1) Régimen de mercado (BTC/ETH) con klines reutilizables en el resto del escaneo
+    market_kl = boot["market"].value
+    btc_up, eth_up = _get_market_bias(market_kl["BTCUSDT"]["1d"], market_kl["ETHUSDT"]["1d"])
+
+    # 1.b) Contexto de mercado (opcional): BTC/ETH desde Binance, yfinance sólo DXY/VIX
+    if getattr(config, "USE_MARKET_CONTEXT", False):
+        from logic.market_context import obtener_contexto_mercado
+
+        try:
+            ctx = obtener_contexto_mercado(
+                btc_d_klines=market_kl["BTCUSDT"]["1d"],
+                btc_w_klines=market_kl["BTCUSDT"].get("1w"),
+                eth_d_klines=market_kl["ETHUSDT"]["1d"],
+                eth_w_klines=market_kl["ETHUSDT"].get("1w"),
+            )
+            audit.info(f"Contexto → LONG {ctx.score_long:.0f} | SHORT {ctx.score_short:.0f}")
+            if not ctx.mercado_favorable:
+                audit.info("Contexto de mercado desfavorable. Escaneo detenido.")
+                return None
+        except Exception as e:
+            audit.error(f"No se pudo evaluar el contexto de mercado: {e}")
 
     # 2) Universo USDT Perpetuos (Futures)
-    try:
-        symbols: List[str] = get_usdt_futures_universe()
-    except Exception as e:
-        audit.error(f"No se pudo obtener el universo USDT Futures: {e}")
-        return
+    symbols: List[str] = boot["universe"].value
 
     exclude = set(getattr(config, "EXCLUDE_SYMBOLS", []))
     symbols = [s for s in symbols if s not in exclude]
     audit.info(f"Universo USDT Futures: {len(symbols)} símbolos")
-
-    resultados: List[tuple] = []
+    return ScanContext(ms, market_kl, btc_up, eth_up, symbols, boot["volumes"].value or {})
+
+
+def _analyze(ctx: ScanContext, symbols: List[str], selector: TopKSelector, tracker,
+             full_rescan: bool = True, deadline: Optional[float] = None) -> AnalysisRun:
+    """
+    Paso 3: klines y analizar_simbolo por símbolo, en el orden dado. Los
+    candidatos van al `selector`; con scorer transversal el lote a re-puntuar
+    va en el resultado. Al llegar a `deadline` (time.monotonic) se deja de
+    analizar y el escaneo se cierra con lo que haya.
+    """
+    from logic.batch_scorer import cross_weights, klines_return
+    from logic.score_model import get_model
+
+    ms = ctx.ms
+    market_kl = ctx.market_kl
+
+    # Cota superior del score antes de analizar (sólo con la liquidez conocida)
+    min_score = float(getattr(config, "MIN_SCORE_ALERTA", 55))
+    mult_max = max(macro_multiplier("LONG", ms)[0], macro_multiplier("SHORT", ms)[0])
+    v2_model = get_model("signal_v2")
+
+    # Scorer transversal (opcional): se analizan todos los símbolos sin umbral y
+    # el score final se calcula por lotes tras el bucle (sin poda por cota)
+    cross = cross_weights(config)
+    analysis_min = 0.0 if cross else min_score      # umbral efectivo de analizar_simbolo
+    rs_bars = int(getattr(config, "CROSS_SECTIONAL_RS_BARS", 20))
+    run = AnalysisRun(total=len(symbols))
+    batch = run.batch
+    t0 = time.monotonic()
+
+    # Caché incremental: cualquier cambio de contexto del análisis la invalida
+    cache = _analysis_cache()
+    if cache is not None:
+        cache.begin_scan((ctx.btc_up, ctx.eth_up, bool(cross), analysis_min), full=full_rescan)
 
     # 3) Descargar klines y analizar símbolo a símbolo (1d/1w)
     for sym in symbols:
+        if deadline is not None and time.monotonic() >= deadline:
+            run.deadline_hit = True
+            break
+        run.visited += 1
         try:
-            kl_d = get_klines(sym, "1d", limit=getattr(config, "LOOKBACK", 400))
-            kl_w = get_klines(sym, "1w", limit=200)
-            out = analizar_simbolo(sym, kl_d, kl_w, btc_up, eth_up)
+            kl_d = market_kl.get(sym, {}).get("1d") or get_klines(sym, "1d", limit=getattr(config, "LOOKBACK", 400))
+            if tracker.has_open(sym):
+                for sig in tracker.update(sym, kl_d):
+                    audit.info(f"{sym} señal {sig.bias} cerrada: {sig.outcome} ({sig.r:+.2f}R en {sig.bars} velas)")
+
+            # 3.0) Poda: cooldown, cupo o cota por debajo del peor del top
+            if cross:
+                if selector.k == 0:
+                    continue
+            else:
+                vol = _last_vol_usdt(kl_d)
+                ub = v2_model.upper_bound({} if vol is None else {"vol_usdt": vol})
+                if ub < min_score or selector.prune(sym, ub * mult_max):
+                    continue
+
+            fp = KlineFingerprint.from_klines(kl_d) if cache is not None else None
+            out = cache.lookup(sym, fp) if cache is not None else MISS
+            if out is MISS:
+                kl_w = (market_kl.get(sym, {}).get("1w") or [])[-200:] or get_klines(sym, "1w", limit=200)
+                with metrics.timer("scan.analizar_simbolo"):
+                    out = analizar_simbolo(sym, kl_d, kl_w, ctx.btc_up, ctx.eth_up, min_score=analysis_min)
+                if cache is not None:
+                    cache.store(sym, fp, out)
+            else:
+                metrics.incr("scan.cache_hit")
             if out is None:
                 continue
             tec, score, factors, _ = out
@@ -129,30 +436,99 @@ def run_once() -> None:
             # 3.b) Ajuste suave del score (cap ±15%)
             mult, notes = macro_multiplier(bias, ms)
             adj_score = round(float(score) * mult, 2)
+            run.scores[sym] = adj_score
 
             context = []
             if notes:
                 context.append(" | ".join(notes))
 
-            resultados.append((tec, adj_score, context))
+            if cross:
+                batch.append((tec, mult, context, klines_return(kl_d, rs_bars)))
+                continue
+            selector.offer(sym, adj_score, (tec, adj_score, context))
 
         except Exception as e:
             audit.info(f"{sym} descartado por excepción: {e}")
 
-    audit.info(f"Candidatos tras análisis: {len(resultados)}")
-    if not resultados:
-        audit.info("Sin candidatos después del análisis.")
-        return
+    if cache is not None and not full_rescan:
+        audit.info(f"Incremental → reanalizados {cache.misses} | desde caché {cache.hits}")
+
+    run.elapsed_s = time.monotonic() - t0
+    _log_coverage(run)
+    return run
 
-    # 4) Ordenar por score ajustado y seleccionar top N
-    resultados.sort(key=lambda x: x[1], reverse=True)
+
+def _log_coverage(run: AnalysisRun) -> None:
+    msg = f"Cobertura → {run.visited}/{run.total} símbolos ({run.coverage:.0%}) en {run.elapsed_s:.1f}s"
+    if run.deadline_hit:
+        audit.warning(f"{msg}; deadline alcanzado: se finaliza con lo analizado "
+                      f"({run.total - run.visited} sin analizar).")
+    else:
+        audit.info(msg)
+
+
+def _save_priorities(outbox: Outbox, scores: Dict[str, float]) -> None:
+    with outbox.state.transaction():
+        for sym, score in scores.items():
+            outbox.state.set(PRIORITY_NS, sym, score, ttl=PRIORITY_TTL)
+
+
+def _btc_ret(market_kl: Dict[str, Dict[str, list]]) -> float:
+    from logic.batch_scorer import klines_return
+
+    return klines_return(market_kl["BTCUSDT"]["1d"], int(getattr(config, "CROSS_SECTIONAL_RS_BARS", 20)))
+
+
+def _offer_cross_section(selector: TopKSelector, batch: List[tuple], btc_ret: float) -> None:
+    from logic.batch_scorer import cross_weights
+
+    for item in _score_cross_section(batch, cross_weights(config), btc_ret):
+        selector.offer(item[0].symbol, item[1], item)
+
+
+def _selection(outbox: Outbox) -> Tuple[TopKSelector, str, int, float]:
+    """Cupo diario + cooldown por símbolo (en el outbox): definen el top K elegible."""
+    last_sent = outbox.last_sent()  # {symbol: ts_epoch}
+    today_key = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    sent_today = outbox.sent_today(today_key)
+    cap = getattr(config, "DAILY_SEND_CAP", 15)
+    cool_h = getattr(config, "SYMBOL_COOLDOWN_HOURS", 24)
     top_n = getattr(config, "SEND_TOP_N", 10)
-    candidatos = resultados[:top_n]
+    now_ts = time.time()
+
+    def _eligible(sym: str) -> bool:
+        return now_ts - float(last_sent.get(sym, 0)) >= cool_h * 3600
+
+    selector = TopKSelector(min(top_n, cap - sent_today), _eligible)
+    if selector.k == 0:
+        audit.info(f"Cupo diario agotado ({sent_today}/{cap}): sólo se actualiza el seguimiento.")
+    return selector, today_key, sent_today, now_ts
+
+
+def _finalize(outbox: Outbox, selector: TopKSelector, tracker: SignalTracker,
+              today_key: str, sent_today: int, now_ts: float) -> None:
+    """Pasos 4-7: top K, anti-spam y encolado en el outbox."""
+    cap = getattr(config, "DAILY_SEND_CAP", 15)
+
+    tracker.save()
+    st = tracker.stats()
+    audit.info(
+        f"Tracker → abiertas {st['open']} | cerradas {st['closed']} | "
+        f"hit {st['hit_rate']:.0%} | R total {st['total_r']:+.2f}"
+    )
+
+    audit.info(
+        f"Candidatos tras análisis: {selector.offered} | top elegible {len(selector)}/{selector.k} | "
+        f"omitidos por cooldown {selector.ineligible}, por cota {selector.pruned}"
+    )
+
+    # 4) Top K elegible, de mayor a menor score ajustado
+    candidatos = selector.items()
+    if not candidatos:
+        audit.info("Sin candidatos elegibles (cooldown por símbolo / cupo diario) después del análisis.")
+        return
 
-    # 5) Anti-spam (hash del top) + cooldown global
-    last_top = _load_json(LAST_TOP_PATH)
-    last_hash = last_top.get("hash")
-    last_ts = last_top.get("ts")
+    # 5) Anti-spam (hash del top) + cooldown global: la clave caduca sola (TTL)
     cooldown_min = getattr(config, "COOLDOWN_MINUTES", 15)
 
     # Construir hash del top actual (basado en niveles, no en score)
@@ -168,76 +544,310 @@ def run_once() -> None:
     top_firma = "|".join(_sig_tuple(tec) for tec, _, _ in candidatos)
     top_hash = hashlib.sha256(top_firma.encode("utf-8")).hexdigest()
 
-    now = datetime.now(timezone.utc)
-    if last_hash == top_hash and last_ts:
-        try:
-            last_dt = datetime.fromisoformat(last_ts)
-            if now - last_dt < timedelta(minutes=cooldown_min):
-                audit.info("Top sin cambios dentro del cooldown. No se envía Telegram.")
-                return
-        except Exception:
-            pass
-
-    # 6) Cupo diario + cooldown por símbolo
-    last_sent = _load_json(SYMBOL_LOCK_PATH)  # {symbol: ts_epoch}
-    day_count = _load_json(DAY_COUNT_PATH)    # {YYYY-MM-DD: count}
-    today_key = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    sent_today = int(day_count.get(today_key, 0))
-    cap = getattr(config, "DAILY_SEND_CAP", 15)
-    cool_h = getattr(config, "SYMBOL_COOLDOWN_HOURS", 24)
-
-    final: List[tuple] = []
-    now_ts = time.time()
+    if outbox.state.get("scan", "last_top") == top_hash:
+        audit.info("Top sin cambios dentro del cooldown. No se envía Telegram.")
+        return
 
+    # 6) Outbox: cada señal se encola junto con su cooldown y el cupo del día
+    #    en UNA transacción; la entrega a Telegram va aparte (_start_delivery)
+    chat_id = str(getattr(config, "TELEGRAM_CHAT_ID", "") or "")
+    items: List[OutboxItem] = []
     for tec, adj_score, context in candidatos:
-        if sent_today >= cap:
-            break
-        sym = tec.symbol
-        last_ts_sym = float(last_sent.get(sym, 0))
-        if now_ts - last_ts_sym < cool_h * 3600:
+        with metrics.timer("telegram.format"):
+            msg = formatear_senal({
+                "symbol": tec.symbol,
+                "bias": getattr(tec, "bias", tec.tipo),
+                "entry": float(getattr(tec, "entry", tec.precio)),
+                "stop_loss": float(getattr(tec, "stop_loss", tec.sl)),
+                "stop_profit": float(getattr(tec, "take_profit", tec.tp)),
+                "score": adj_score,
+                "timeframe": "1d/1w",
+                "context": context,
+            })
+        items.append(OutboxItem(key=_sig_tuple(tec), symbol=tec.symbol, chat_id=chat_id, text=msg))
+    with metrics.timer("outbox.enqueue"):
+        nuevas = set(outbox.enqueue(items, today_key, now_ts))
+
+    encoladas = 0
+    for tec, adj_score, _ in candidatos:
+        sig_id = _sig_tuple(tec)
+        if sig_id not in nuevas:
+            audit.info(f"{tec.symbol}: señal ya registrada en el outbox; no se repite.")
             continue
-        final.append((tec, adj_score, context))
-        last_sent[sym] = now_ts
-        sent_today += 1
-
-    if not final:
-        audit.info("No hay candidatos que pasen cooldown por símbolo o cupo diario.")
-        # Aun así guardamos el hash para evitar spam
-        _save_json(LAST_TOP_PATH, {"hash": top_hash, "ts": now.isoformat()})
+        encoladas += 1
+        tracker.add(
+            tec.symbol,
+            getattr(tec, "bias", tec.tipo),
+            adj_score,
+            float(getattr(tec, "entry", tec.precio)),
+            float(getattr(tec, "stop_loss", tec.sl)),
+            float(getattr(tec, "take_profit", tec.tp)),
+            sig_id=sig_id,
+            model=getattr(tec, "score_model", ""),
+        )
+
+    audit.info(f"Encoladas {encoladas} señales en el outbox ({sent_today + encoladas}/{cap} hoy).")
+
+    # 7) Guardar estados (hash top y seguimiento); la entrega la arranca quien
+    #    llama, haya o no algo nuevo que encolar
+    outbox.state.set("scan", "last_top", top_hash, ttl=cooldown_min * 60)
+    tracker.save()
+
+
+def run_once(full_rescan: bool = True) -> None:
+    """
+    Un escaneo completo del universo. Con full_rescan=False (ticks intradía del
+    daemon) sólo se reanalizan los símbolos cuya última vela cambió más allá de
+    la tolerancia; el resto sale de la caché del escaneo anterior.
+    """
+    _init_runtime()
+    audit.info("Inicio de escaneo…")
+    t0 = time.perf_counter()
+    try:
+        _scan(full_rescan, _scan_deadline(time.monotonic()))   # SCAN_DEADLINE_S cuenta desde aquí
+    finally:
+        metrics.observe("scan.total", time.perf_counter() - t0)
+
+
+def _scan(full_rescan: bool, deadline: Optional[float]) -> None:
+    outbox = _open_outbox()
+    try:
+        _scan_into(outbox, full_rescan, deadline)
+    finally:
+        # Siempre, aunque el escaneo no encole nada o falle: así salen también
+        # los pendientes de ejecuciones anteriores y los reintentos ya vencidos
+        _start_delivery(outbox)
+
+
+def _scan_into(outbox: Outbox, full_rescan: bool, deadline: Optional[float]) -> None:
+    with metrics.timer("scan.prepare"):
+        ctx = _prepare_scan()
+    if ctx is None:
         return
 
-    # 7) Enviar a Telegram
-    enviados = 0
-    for tec, adj_score, context in final:
-        msg = formatear_senal({
-            "symbol": tec.symbol,
-            "bias": getattr(tec, "bias", tec.tipo),
-            "entry": float(getattr(tec, "entry", tec.precio)),
-            "stop_loss": float(getattr(tec, "stop_loss", tec.sl)),
-            "stop_profit": float(getattr(tec, "take_profit", tec.tp)),
-            "score": adj_score,
-            "timeframe": "1d/1w",
-            "context": context,
-        })
-        enviar_telegram(msg)
-        enviados += 1
-
-    audit.info(f"Enviados {enviados} candidatos a Telegram.")
-
-    # 8) Guardar estados (hash top, locks y conteo diario)
-    _save_json(LAST_TOP_PATH, {"hash": top_hash, "ts": now.isoformat()})
-    _save_json(SYMBOL_LOCK_PATH, last_sent)
-    day_count[today_key] = sent_today
-    _save_json(DAY_COUNT_PATH, day_count)
+    selector, today_key, sent_today, now_ts = _selection(outbox)
+
+    # Seguimiento de señales ya enviadas (se avanza con las klines de este escaneo)
+    tracker = SignalTracker()
+
+    symbols = _prioritize(ctx.symbols, outbox.state.items(PRIORITY_NS), ctx.volumes)
+    with metrics.timer("scan.analyze"):
+        run = _analyze(ctx, symbols, selector, tracker, full_rescan, deadline)
+    if run.batch:
+        _offer_cross_section(selector, run.batch, _btc_ret(ctx.market_kl))
+    _save_priorities(outbox, run.scores)
+    outbox.state.set("scan", "coverage", run.report())
+
+    with metrics.timer("scan.finalize"):
+        _finalize(outbox, selector, tracker, today_key, sent_today, now_ts)
+
+
+class _OpenSignalKlines:
+    """
+    Tracker de sólo lectura para los workers de shard: el seguimiento lo avanza
+    el coordinador, aquí sólo se guardan las klines de los símbolos abiertos
+    (los que publicó el coordinador en el directorio compartido).
+    """
+
+    def __init__(self, open_symbols: Set[str]):
+        self.open_symbols = open_symbols
+        self.klines: Dict[str, list] = {}
+
+    def has_open(self, symbol: str) -> bool:
+        return symbol in self.open_symbols
+
+    def update(self, symbol: str, klines: list) -> list:
+        self.klines[symbol] = klines
+        return []
+
+
+def _shard_opts() -> dict:
+    return {"dir": SHARD_DIR, "merge_wait_s": 600, **(getattr(config, "SHARDING", None) or {})}
+
+
+def run_shard(index: int, count: int, scan_id: Optional[str] = None, shard_dir: Optional[str] = None) -> Optional[str]:
+    """
+    Worker i/N: analiza su partición del universo y escribe el shard. No toca
+    outbox, cooldowns ni tracker; eso lo hace run_merge una sola vez.
+    """
+    _init_runtime()
+    opts = _shard_opts()
+    shard_dir = shard_dir or opts["dir"]
+    scan_id = scan_id or default_scan_id()
+    audit.info(f"Inicio de shard {index}/{count} (scan {scan_id})…")
+    deadline = _scan_deadline(time.monotonic())
+    ctx = _prepare_scan()
+    if ctx is None:
+        # Shard vacío igualmente: el coordinador no espera en balde
+        return write_shard(shard_dir, scan_id, index, count, {"ok": False, "symbols": 0})
+
+    # Prioridades que dejó el coordinador en el directorio compartido
+    symbols = _prioritize(partition(ctx.symbols, index, count), read_priorities(shard_dir), ctx.volumes)
+    # Sin cooldown ni K: un candidato en cooldown no debe desplazar a otro
+    # elegible antes de que el coordinador vea el universo completo
+    collector = TopKSelector(max(1, len(symbols)))
+    open_kl = _OpenSignalKlines(read_open_symbols(shard_dir))
+    run = _analyze(ctx, symbols, collector, open_kl, deadline=deadline)
+    path = write_shard(shard_dir, scan_id, index, count, {
+        "ok": True,
+        "symbols": len(symbols),
+        "candidates": collector.items(),
+        "batch": run.batch,
+        "btc_ret": _btc_ret(ctx.market_kl) if run.batch else 0.0,
+        "tracked": open_kl.klines,
+        "pruned": collector.pruned,
+        "scores": run.scores,
+        "coverage": run.report(),
+    })
+    audit.info(f"Shard {index}/{count}: {len(symbols)} símbolos, {collector.offered} candidatos → {path}")
+    return path
+
+
+def run_merge(count: int, scan_id: Optional[str] = None, shard_dir: Optional[str] = None,
+              wait_s: Optional[float] = None) -> None:
+    """Coordinador: fusiona los N shards y aplica top N, cooldown, cupo y entrega."""
+    _init_runtime()
+    opts = _shard_opts()
+    shard_dir = shard_dir or opts["dir"]
+    scan_id = scan_id or default_scan_id()
+    wait_s = float(opts["merge_wait_s"] if wait_s is None else wait_s)
+    outbox = _open_outbox()
+    try:
+        _merge_into(outbox, count, scan_id, shard_dir, wait_s)
+    finally:
+        # Como en _scan: lo pendiente se entrega aunque esta ronda no aporte nada
+        _start_delivery(outbox)
+
+
+def _merge_into(outbox: Outbox, count: int, scan_id: str, shard_dir: str, wait_s: float) -> None:
+    shards, missing = load_shards(shard_dir, scan_id, count, wait_s=wait_s)
+    if missing:
+        audit.warning(f"Scan {scan_id}: faltan shards {missing} tras {wait_s:.0f}s; se fusiona lo disponible.")
+    shards = [sh for sh in shards if sh.get("ok")]
+    if not shards:
+        audit.error(f"Scan {scan_id}: ningún shard válido; no se envía nada.")
+        return
+    audit.info(f"Fusión de {len(shards)}/{count} shards ({sum(sh['symbols'] for sh in shards)} símbolos)")
+
+    selector, today_key, sent_today, now_ts = _selection(outbox)
+
+    tracker = SignalTracker()
+    for sh in shards:
+        for sym, kl_d in sh["tracked"].items():
+            for sig in tracker.update(sym, kl_d):
+                audit.info(f"{sym} señal {sig.bias} cerrada: {sig.outcome} ({sig.r:+.2f}R en {sig.bars} velas)")
+        for item in sh["candidates"]:
+            selector.offer(item[0].symbol, item[1], item)
+        selector.pruned += sh.get("pruned", 0)
+
+    # El scorer transversal necesita el universo completo: se puntúa aquí
+    batch = [item for sh in shards for item in sh["batch"]]
+    if batch:
+        _offer_cross_section(selector, batch, next(sh["btc_ret"] for sh in shards if sh["batch"]))
+
+    # Cobertura agregada; las prioridades van al estado y al directorio compartido
+    run = AnalysisRun(total=sum(sh["coverage"]["total"] for sh in shards))
+    run.visited = sum(sh["coverage"]["visited"] for sh in shards)
+    run.elapsed_s = max(sh["coverage"]["elapsed_s"] for sh in shards)
+    run.deadline_hit = any(sh["coverage"]["deadline_hit"] for sh in shards)
+    for sh in shards:
+        run.scores.update(sh["scores"])
+    _log_coverage(run)
+    _save_priorities(outbox, run.scores)
+    outbox.state.set("scan", "coverage", {**run.report(), "missing_shards": missing})
+    write_priorities(shard_dir, {**read_priorities(shard_dir), **run.scores})
+
+    _finalize(outbox, selector, tracker, today_key, sent_today, now_ts)
+    # Tras _finalize, que añade las señales nuevas: los workers del siguiente
+    # scan envían las klines de todo lo abierto
+    write_open_symbols(shard_dir, {sig.symbol for sig in tracker.open.values()})
+    if not missing:
+        purge_scan(shard_dir, scan_id)
 
 
 def run_bot() -> None:
-    """Ejecución única. Para servicio, llama run_once() en intervalos."""
+    """Ejecución única. Para servicio, usa run_daemon() (`python main.py --daemon`)."""
+    _init_runtime()
     try:
         run_once()
     except Exception as e:
         audit.error(f"Fallo en ejecución: {e}")
+    finally:
+        # El escaneo ya terminó; aquí sólo se espera la entrega de lo encolado
+        from notifier.dispatcher import shutdown
+
+        shutdown()
+        _flush_metrics()
+
+
+def run_daemon(max_runs: Optional[int] = None) -> None:
+    """
+    Proceso de larga duración: un escaneo justo después de cada cierre de vela
+    diaria/semanal (UTC) y en los ticks intradía de DAEMON["tick_minutes"].
+    Sesión HTTP, cachés (exchangeInfo, klines, macro), outbox/estado y
+    dispatcher de Telegram se mantienen calientes entre ciclos.
+    SIGTERM/SIGINT: termina el ciclo en curso, espera la entrega y sale.
+    """
+    import signal
+
+    from utils.scheduler import Scheduler, Wakeup
+
+    _init_runtime()
+    opts = {**DAEMON_DEFAULTS, **(getattr(config, "DAEMON", None) or {})}
+    sched = Scheduler(tick_minutes=int(opts["tick_minutes"]), close_delay_s=float(opts["close_delay_s"]))
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, sched.stop)
+
+    def _cycle(wakeup: Wakeup) -> None:
+        t0 = time.time()
+        audit.info(f"Ciclo daemon ({wakeup.kind})")
+        # Cierres (y arranque): reescaneo completo; ticks: sólo lo que cambió.
+        # Cada despertar drena además el outbox (reintentos con backoff vencidos)
+        run_once(full_rescan=wakeup.kind != "tick")
+        audit.info(f"Ciclo daemon ({wakeup.kind}) terminado en {time.time() - t0:.1f}s")
+        _flush_metrics()
+
+    audit.info(f"Modo daemon: ticks cada {opts['tick_minutes']} min, cierre +{opts['close_delay_s']}s")
+    try:
+        sched.run(_cycle, run_now=bool(opts["run_on_start"]), max_runs=max_runs)
+    finally:
+        from notifier.dispatcher import shutdown
+
+        shutdown()
+        for outbox in _OUTBOXES.values():
+            outbox.close()
+        _OUTBOXES.clear()
+        audit.info("Daemon detenido.")
 
 
 if __name__ == "__main__":
-    run_bot()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Escáner de señales Binance Futures.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Proceso continuo alineado a los cierres de vela (ver DAEMON en settings).")
+    parser.add_argument("--shard", default=None, metavar="i/N",
+                        help="Worker: analiza la partición i de N y escribe su shard.")
+    parser.add_argument("--merge", type=int, default=None, metavar="N",
+                        help="Coordinador: fusiona N shards, aplica top/cooldown/cupo y entrega.")
+    parser.add_argument("--scan-id", default=None, help="Ronda común a workers y coordinador (def.: hora UTC).")
+    parser.add_argument("--shard-dir", default=None, help="Directorio compartido de shards (SHARDING.dir).")
+    parser.add_argument("--wait", type=float, default=None, help="Espera máxima del coordinador (s).")
+    args = parser.parse_args()
+    if args.shard:
+        try:
+            run_shard(*parse_spec(args.shard), scan_id=args.scan_id, shard_dir=args.shard_dir)
+        finally:
+            _flush_metrics()
+    elif args.merge:
+        try:
+            run_merge(args.merge, scan_id=args.scan_id, shard_dir=args.shard_dir, wait_s=args.wait)
+        finally:
+            from notifier.dispatcher import shutdown
+
+            shutdown()
+            _flush_metrics()
+    elif args.daemon:
+        run_daemon()
+    else:
+        run_bot()
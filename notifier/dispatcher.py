@@ -0,0 +1,382 @@
+# notifier/dispatcher.py
+# -*- coding: utf-8 -*-
+"""
+Despachador asíncrono de mensajes a Telegram.
+
+El escaneo entrega los mensajes con submit() y sigue sin esperar la entrega:
+- Cola con prioridad por instante de envío (los reintentos se reprograman).
+- N hilos trabajadores envían en paralelo respetando dos token buckets:
+  uno global (Telegram: ~30 msg/s por bot) y uno por chat (~1 msg/s).
+- 429 Too Many Requests: se respeta `parameters.retry_after` (o la cabecera
+  Retry-After) bloqueando el bucket de ese chat y reprogramando el mensaje.
+- 5xx / errores de red: reintento con backoff exponencial hasta max_attempts.
+  Otros 4xx (p. ej. Markdown inválido) no se reintentan.
+Cada submit() devuelve un Future con un DeliveryResult.
+
+get_dispatcher() crea un despachador compartido desde config
+(TELEGRAM_DISPATCH; base de la API en TELEGRAM_API_BASE) y registra un flush al salir del proceso, de modo que una
+ejecución única termina el escaneo y espera la entrega sólo al cerrar.
+"""
+
+from __future__ import annotations
+
+import atexit
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from utils import metrics
+
+logger = logging.getLogger("telegram.dispatcher")
+
+API_BASE = "https://api.telegram.org"
+
+DEFAULTS: Dict[str, Any] = {
+    "workers": 4,
+    "global_rate": 30.0,     # mensajes/s por bot
+    "chat_rate": 1.0,        # mensajes/s por chat
+    "chat_burst": 3,         # ráfaga permitida por chat
+    "max_attempts": 5,
+    "backoff_base": 1.0,     # s; se duplica en cada reintento (tope 30 s)
+    "timeout": 10,           # s por petición HTTP
+    "flush_timeout": 60,     # s que se espera al salir del proceso
+}
+
+
+class TokenBucket:
+    """
+    Token bucket con reserva: reserve() descuenta un token (el saldo puede
+    quedar negativo) y devuelve cuánto esperar hasta poder usarlo. Así los
+    trabajadores se reparten los huecos sin sondear.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.ts = clock()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens -= 1.0
+            wait_tokens = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait_tokens, self.blocked_until - now, 0.0)
+
+    def block(self, seconds: float) -> None:
+        """Bloquea el bucket `seconds` (retry_after) y vacía la ráfaga."""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.blocked_until = max(self.blocked_until, now + float(seconds))
+            self.tokens = min(self.tokens, 0.0)
+
+
+@dataclass
+class OutboundMessage:
+    chat_id: str
+    text: str
+    parse_mode: Optional[str] = "Markdown"
+    disable_notification: bool = False
+    thread_id: Optional[int] = None
+    reply_markup: Optional[Dict[str, Any]] = None
+    disable_web_page_preview: bool = True
+    key: Optional[str] = None           # clave de idempotencia (informativa en el log)
+
+    def payload(self) -> Dict[str, Any]:
+        p: Dict[str, Any] = {
+            "chat_id": str(self.chat_id),
+            "text": self.text,
+            "disable_notification": self.disable_notification,
+            "disable_web_page_preview": self.disable_web_page_preview,
+        }
+        if self.parse_mode:
+            p["parse_mode"] = self.parse_mode
+        if self.thread_id is not None:
+            p["message_thread_id"] = self.thread_id
+        if self.reply_markup:
+            p["reply_markup"] = self.reply_markup
+        return p
+
+
+@dataclass
+class DeliveryResult:
+    ok: bool
+    attempts: int
+    status: Optional[int] = None
+    message_id: Optional[int] = None
+    error: Optional[str] = None
+    key: Optional[str] = None
+
+
+@dataclass(order=True)
+class _Job:
+    due: float
+    seq: int
+    msg: OutboundMessage = field(compare=False)
+    future: Future = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+    max_attempts: int = field(default=1, compare=False)
+
+
+def _retry_after(resp: requests.Response) -> float:
+    try:
+        return float(resp.json().get("parameters", {}).get("retry_after"))
+    except Exception:
+        pass
+    try:
+        return float(resp.headers.get("Retry-After", 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class TelegramDispatcher:
+    def __init__(
+        self,
+        token: str,
+        *,
+        api_base: str = API_BASE,
+        workers: int = DEFAULTS["workers"],
+        global_rate: float = DEFAULTS["global_rate"],
+        chat_rate: float = DEFAULTS["chat_rate"],
+        chat_burst: float = DEFAULTS["chat_burst"],
+        max_attempts: int = DEFAULTS["max_attempts"],
+        backoff_base: float = DEFAULTS["backoff_base"],
+        timeout: float = DEFAULTS["timeout"],
+        session: Optional[requests.Session] = None,
+    ):
+        self.url = f"{api_base.rstrip('/')}/bot{token}/sendMessage"
+        self.n_workers = max(1, int(workers))
+        self.chat_rate = float(chat_rate)
+        self.chat_burst = float(chat_burst)
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_base = float(backoff_base)
+        self.timeout = float(timeout)
+        self.session = session or requests.Session()
+
+        self.global_bucket = TokenBucket(global_rate, burst=global_rate)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+
+        self._heap: List[_Job] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._closing = False
+        self._threads: List[threading.Thread] = []
+        self.stats = {"sent": 0, "failed": 0, "retried": 0, "throttled": 0}
+
+    # ---------- API ----------
+    def submit(self, msg: OutboundMessage, max_attempts: Optional[int] = None) -> Future:
+        """Encola el mensaje y vuelve de inmediato; el Future se resuelve con DeliveryResult."""
+        fut: Future = Future()
+        attempts = max(1, int(max_attempts or self.max_attempts))
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("dispatcher cerrado")
+            self._start_workers()
+            self._pending += 1
+            heapq.heappush(self._heap, _Job(time.monotonic(), next(self._seq), msg, fut, max_attempts=attempts))
+            self._cond.notify()
+        return fut
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que no quede nada pendiente; False si vence el timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Flush + parada de los trabajadores. Devuelve si se entregó todo a tiempo."""
+        done = self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if not done:
+            logger.warning(f"Cierre con {self._pending} mensajes de Telegram sin entregar")
+        return done
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    # ---------- internos ----------
+    def _start_workers(self) -> None:
+        if self._threads:
+            return
+        for i in range(self.n_workers):
+            t = threading.Thread(target=self._worker, name=f"tg-dispatch-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        with self._cond:
+            b = self._chat_buckets.get(chat_id)
+            if b is None:
+                b = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, burst=self.chat_burst)
+            return b
+
+    def _next(self) -> Optional[_Job]:
+        with self._cond:
+            while True:
+                if self._heap:
+                    wait = self._heap[0].due - time.monotonic()
+                    if wait <= 0:
+                        return heapq.heappop(self._heap)
+                    self._cond.wait(wait)
+                elif self._closing:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _requeue(self, job: _Job, delay: float) -> None:
+        with self._cond:
+            job.due = time.monotonic() + delay
+            job.seq = next(self._seq)
+            heapq.heappush(self._heap, job)
+            self._cond.notify()
+
+    def _finish(self, job: _Job, result: DeliveryResult) -> None:
+        self.stats["sent" if result.ok else "failed"] += 1
+        if not result.ok:
+            logger.error(f"Telegram: entrega fallida ({result.status}) tras {result.attempts} intentos: {result.error}")
+        job.future.set_result(result)
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify_all()
+
+    def _worker(self) -> None:
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            bucket = self._chat_bucket(str(job.msg.chat_id))
+            wait = max(bucket.reserve(), self.global_bucket.reserve())
+            if wait > 0:
+                time.sleep(wait)
+            self._deliver(job, bucket)
+
+    def _deliver(self, job: _Job, bucket: TokenBucket) -> None:
+        job.attempts += 1
+        status: Optional[int] = None
+        try:
+            with metrics.timer("telegram.send"):
+                resp = self.session.post(self.url, json=job.msg.payload(), timeout=self.timeout)
+            status = resp.status_code
+            metrics.incr(f"telegram.status_{status}")
+            if resp.ok:
+                try:
+                    message_id = resp.json().get("result", {}).get("message_id")
+                except Exception:
+                    message_id = None
+                self._finish(job, DeliveryResult(True, job.attempts, status, message_id, key=job.msg.key))
+                return
+            if status == 429:
+                delay = _retry_after(resp)
+                bucket.block(delay)
+                self.stats["throttled"] += 1
+                error = f"429 retry_after={delay:g}s"
+            elif status >= 500:
+                delay = min(30.0, self.backoff_base * 2 ** (job.attempts - 1))
+                error = f"HTTP {status}"
+            else:
+                self._finish(job, DeliveryResult(False, job.attempts, status, error=resp.text[:200], key=job.msg.key))
+                return
+        except requests.RequestException as e:
+            delay = min(30.0, self.backoff_base * 2 ** (job.attempts - 1))
+            error = str(e)
+
+        if job.attempts >= job.max_attempts:
+            self._finish(job, DeliveryResult(False, job.attempts, status, error=error, key=job.msg.key))
+            return
+        self.stats["retried"] += 1
+        logger.warning(f"Telegram: reintento {job.attempts}/{job.max_attempts} en {delay:.1f}s ({error})")
+        self._requeue(job, delay)
+
+
+# ─────────────────────────────────────────────────────────
+# Despachador compartido (desde config)
+# ─────────────────────────────────────────────────────────
+
+_SHARED: Dict[Tuple[str, str], TelegramDispatcher] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def dispatch_settings() -> Dict[str, Any]:
+    try:
+        import config
+
+        return {**DEFAULTS, **(getattr(config, "TELEGRAM_DISPATCH", None) or {})}
+    except Exception:
+        return dict(DEFAULTS)
+
+
+def resolve_api_base() -> str:
+    """Base de la Bot API: TELEGRAM_API_BASE (settings/.env) o la oficial."""
+    try:
+        import config
+
+        return str(getattr(config, "TELEGRAM_API_BASE", "") or API_BASE).rstrip("/")
+    except Exception:
+        return API_BASE
+
+
+def api_url(token: str, method: str) -> str:
+    """URL de un método de la Bot API (sendMessage, answerCallbackQuery…)."""
+    return f"{resolve_api_base()}/bot{token}/{method}"
+
+
+def get_dispatcher(token: str, api_base: Optional[str] = None) -> TelegramDispatcher:
+    """Despachador compartido por (api_base, token); se vacía al salir del proceso."""
+    api_base = (api_base or resolve_api_base()).rstrip("/")
+    with _SHARED_LOCK:
+        d = _SHARED.get((api_base, token))
+        if d is None:
+            s = dispatch_settings()
+            d = TelegramDispatcher(
+                token,
+                api_base=api_base,
+                workers=s["workers"],
+                global_rate=s["global_rate"],
+                chat_rate=s["chat_rate"],
+                chat_burst=s["chat_burst"],
+                max_attempts=s["max_attempts"],
+                backoff_base=s["backoff_base"],
+                timeout=s["timeout"],
+            )
+            _SHARED[(api_base, token)] = d
+            if len(_SHARED) == 1:
+                atexit.register(shutdown)
+        return d
+
+
+def shutdown(timeout: Optional[float] = None) -> None:
+    """Vacía y cierra los despachadores compartidos (llamado también en atexit)."""
+    if timeout is None:
+        timeout = float(dispatch_settings()["flush_timeout"])
+    with _SHARED_LOCK:
+        dispatchers = list(_SHARED.values())
+        _SHARED.clear()
+    for d in dispatchers:
+        if d.pending:
+            logger.info(f"Esperando entrega de {d.pending} mensajes de Telegram…")
+        d.close(timeout)
@@ -0,0 +1,188 @@
+# notifier/journal.py
+# -*- coding: utf-8 -*-
+"""
+Diario de operaciones append-only (CSV) como registro principal.
+
+Antes cada decisión del usuario abría el .xlsx completo, añadía una fila y
+lo guardaba entero: coste lineal con el histórico y un fallo a mitad de
+wb.save dejaba el libro corrupto. Ahora:
+- append(): una línea CSV (open "a" + flush + fsync), O(1) sea cual sea el
+  tamaño del diario. Si el proceso cae a mitad de escribir, como mucho queda
+  una última línea incompleta que la lectura descarta.
+- export_excel(): genera el .xlsx con las MISMAS columnas de siempre, bajo
+  demanda o programado (cron), escribiendo a un temporal + os.replace.
+
+Uso (CLI):
+  python -m notifier.journal export [--out operaciones.xlsx] [--if-stale]
+  python -m notifier.journal import-excel   # migración única del .xlsx anterior
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.path import JOURNAL_PATH, XLSX_PATH
+
+logger = logging.getLogger("journal")
+
+COLUMNS = [
+    "Fecha", "Criptomoneda", "Tipo", "Entrada", "TP", "SL", "RSI",
+    "MACD", "Vitalidad", "Grids", "Score", "Decisión",
+]
+_NUMERIC = {"Entrada", "TP", "SL", "RSI", "MACD", "Vitalidad", "Grids", "Score"}
+
+_LOCK = threading.Lock()
+
+
+def journal_row(op: Dict[str, Any], decision: str, fecha: Optional[datetime] = None) -> List[Any]:
+    """Fila del diario desde la operación en memoria (claves del formateador de señales)."""
+    return [
+        (fecha or datetime.now()).strftime("%Y-%m-%d %H:%M:%S"),
+        op.get("Criptomoneda"),
+        op.get("Señal"),
+        op.get("Precio"),
+        op.get("TP"),
+        op.get("SL"),
+        op.get("RSI"),
+        op.get("MACD"),
+        op.get("Vitalidad"),
+        op.get("Grids"),
+        op.get("Score"),
+        decision,
+    ]
+
+
+class Journal:
+    def __init__(self, path: str = str(JOURNAL_PATH)):
+        self.path = str(path)
+
+    # ---------- escritura ----------
+    def append(self, row: List[Any]) -> None:
+        if len(row) != len(COLUMNS):
+            raise ValueError(f"Fila con {len(row)} columnas; se esperaban {len(COLUMNS)}")
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        with _LOCK:
+            new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            if new:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                writer.writerow(COLUMNS)
+            elif not _ends_with_newline(self.path):
+                buf.write("\n")   # cola truncada por un fallo: la nueva fila va en su línea
+            writer.writerow(["" if v is None else v for v in row])
+            # Una sola escritura por fila: o entra entera o queda truncada al final
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                f.write(buf.getvalue())
+                f.flush()
+                os.fsync(f.fileno())
+
+    # ---------- lectura ----------
+    def rows(self) -> Iterator[List[str]]:
+        """Filas completas del diario (sin cabecera); descarta líneas truncadas."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            for i, row in enumerate(reader):
+                if i == 0 and row == COLUMNS:
+                    continue
+                if len(row) != len(COLUMNS):
+                    logger.warning(f"Diario: línea {i + 1} incompleta descartada")
+                    continue
+                yield row
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.rows())
+
+    # ---------- Excel ----------
+    def export_excel(self, out_path: str = str(XLSX_PATH)) -> int:
+        """Escribe el .xlsx completo (mismas columnas) de forma atómica. Devuelve nº de filas."""
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(COLUMNS)
+        n = 0
+        for row in self.rows():
+            ws.append([_cell(col, v) for col, v in zip(COLUMNS, row)])
+            n += 1
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        tmp_path = out_path + ".tmp"
+        wb.save(tmp_path)
+        os.replace(tmp_path, out_path)
+        logger.info(f"Diario exportado a {out_path} ({n} operaciones)")
+        return n
+
+    def is_export_stale(self, out_path: str = str(XLSX_PATH)) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        return not os.path.exists(out_path) or os.path.getmtime(out_path) < os.path.getmtime(self.path)
+
+    def import_excel(self, xlsx_path: str = str(XLSX_PATH)) -> int:
+        """Migración única: vuelca un .xlsx anterior a un diario vacío. Devuelve nº de filas."""
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            return 0
+        if not os.path.exists(xlsx_path):
+            return 0
+        from openpyxl import load_workbook
+
+        wb = load_workbook(xlsx_path, read_only=True)
+        n = 0
+        for i, values in enumerate(wb.active.iter_rows(values_only=True)):
+            if i == 0 and list(values[: len(COLUMNS)]) == COLUMNS:
+                continue
+            row = list(values[: len(COLUMNS)]) + [None] * (len(COLUMNS) - len(values))
+            self.append(row)
+            n += 1
+        wb.close()
+        logger.info(f"Importadas {n} operaciones desde {xlsx_path}")
+        return n
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) in (b"\n", b"\r")
+
+
+def _cell(col: str, value: str) -> Any:
+    """Los números vuelven a ser números en el Excel (el CSV sólo guarda texto)."""
+    if value == "":
+        return None
+    if col in _NUMERIC:
+        try:
+            f = float(value)
+            return int(f) if f.is_integer() and "." not in value else f
+        except ValueError:
+            return value
+    return value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Diario de operaciones: exportación a Excel.")
+    parser.add_argument("cmd", choices=("export", "import-excel"))
+    parser.add_argument("--journal", default=str(JOURNAL_PATH))
+    parser.add_argument("--out", default=str(XLSX_PATH), help="Ruta del .xlsx")
+    parser.add_argument("--if-stale", action="store_true", help="Sólo exporta si el diario es más reciente.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    journal = Journal(args.journal)
+    if args.cmd == "import-excel":
+        print(f"Importadas: {journal.import_excel(args.out)}")
+        return
+    if args.if_stale and not journal.is_export_stale(args.out):
+        print("Excel al día; no se exporta.")
+        return
+    print(f"Exportadas: {journal.export_excel(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
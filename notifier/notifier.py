@@ -2,19 +2,19 @@
 import os
 import logging
 import requests
-from openpyxl import Workbook, load_workbook
-from datetime import datetime
-from utils.path import XLSX_PATH
+from utils.path import JOURNAL_PATH, XLSX_PATH
 import config
-from logic.risk_manager import registrar_resultado
+from notifier.dispatcher import api_url
+from notifier.journal import Journal, journal_row
 
-# XLSX_PATH ya contiene la ruta completa del archivo, por lo que solo
-# es necesario convertirlo a cadena para usarlo con openpyxl.
+# El diario CSV es el registro principal; el Excel se genera a demanda
+# (python -m notifier.journal export) con las mismas columnas.
+JOURNAL_FILE = str(JOURNAL_PATH)
 SIGNAL_FILE = str(XLSX_PATH)
 
 
 def enviar_telegram(texto: str, buttons: list = None):
-    url = f"https://api.telegram.org/bot{config.TELEGRAM_TOKEN}/sendMessage"
+    url = api_url(config.TELEGRAM_TOKEN, "sendMessage")
     payload = {
         "chat_id": config.TELEGRAM_CHAT_ID,
         "text": texto,
@@ -34,34 +34,13 @@ def enviar_telegram(texto: str, buttons: list = None):
 
 
 def guardar_operacion(op: dict, decision: str) -> None:
-    """Guarda la operación y la decisión del usuario en un archivo Excel."""
-    if not os.path.exists(SIGNAL_FILE):
-        wb = Workbook()
-        ws = wb.active
-        ws.append([
-            "Fecha", "Criptomoneda", "Tipo", "Entrada", "TP", "SL", "RSI",
-            "MACD", "Vitalidad", "Grids", "Score", "Decisión"
-        ])
-    else:
-        wb = load_workbook(SIGNAL_FILE)
-        ws = wb.active
-
-    ws.append([
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        op.get("Criptomoneda"),
-        op.get("Señal"),
-        op.get("Precio"),
-        op.get("TP"),
-        op.get("SL"),
-        op.get("RSI"),
-        op.get("MACD"),
-        op.get("Vitalidad"),
-        op.get("Grids"),
-        op.get("Score"),
-        decision
-    ])
-    wb.save(SIGNAL_FILE)
-    logging.info(f"Operación guardada como '{decision}' en el archivo Excel")
+    """Añade la operación y la decisión del usuario al diario (append-only, O(1))."""
+    journal = Journal(JOURNAL_FILE)
+    # Primera vez con diario: se migra el Excel que hubiera (una sola vez)
+    if not os.path.exists(JOURNAL_FILE) and os.path.exists(SIGNAL_FILE):
+        journal.import_excel(SIGNAL_FILE)
+    journal.append(journal_row(op, decision))
+    logging.info(f"Operación guardada como '{decision}' en el diario")
 
 
 def manejar_callback(callback_data: str, symbol: str, memoria: dict) -> None:
@@ -78,6 +57,8 @@ def manejar_callback(callback_data: str, symbol: str, memoria: dict) -> None:
         except ValueError:
             logging.error(f"PNL inválido en callback: {callback_data}")
             return
+        from logic.risk_manager import registrar_resultado
+
         registrar_resultado(pnl)
         enviar_telegram(
             f"Resultado para {symbol} registrado: {pnl:.2f} USDT"
@@ -90,7 +71,7 @@ def manejar_callback(callback_data: str, symbol: str, memoria: dict) -> None:
         logging.error(f"Operación para {symbol} no encontrada en memoria")
         return
 
-    # Registrar la decisión en el archivo Excel
+    # Registrar la decisión en el diario
     guardar_operacion(operacion, decision)
 
     # Enviar confirmación de registro al usuario
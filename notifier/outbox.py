@@ -0,0 +1,323 @@
+# notifier/outbox.py
+# -*- coding: utf-8 -*-
+"""
+Outbox transaccional (SQLite) para la entrega de señales a Telegram.
+
+El escaneo NO envía: registra cada señal seleccionada en la tabla `outbox`
+en la MISMA transacción que actualiza el cooldown por símbolo y el cupo
+diario (claves con TTL de utils.state_store, ns "cooldown" y "day_count").
+Si el proceso muere después, nada se pierde ni se desincroniza: la señal
+queda pendiente y el estado refleja exactamente lo encolado.
+
+Un trabajador de entrega (OutboxWorker) drena la tabla por separado:
+- reclama filas pendientes con un lease (otro proceso no las toma a la vez),
+- las envía con notifier.dispatcher (rate limit, 429/5xx con reintento),
+- marca `sent` / `failed`, o reprograma con backoff si el fallo es transitorio.
+
+La clave de idempotencia es el hash de la señal (main._hash_signal): la misma
+señal encolada dos veces no se duplica ni vuelve a consumir cupo. La entrega
+es "al menos una vez": si el proceso cae entre el 200 de Telegram y el
+commit de `sent`, el mensaje se reenvía al expirar el lease. Mientras el
+despachador de ESTE proceso siga reintentando una fila (429/5xx pueden
+alargarlo más que el lease), la fila no se vuelve a reclamar aquí aunque el
+lease haya vencido (Outbox.in_flight).
+
+Uso (CLI):
+  python -m notifier.outbox stats
+  python -m notifier.outbox drain [--loop 30]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import Future, wait
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from utils.state_store import STATE_PATH, StateStore
+
+logger = logging.getLogger("outbox")
+
+# El outbox vive en el mismo fichero que el estado (utils.state_store): la
+# señal y su cooldown/cupo se escriben en una única transacción
+OUTBOX_PATH = STATE_PATH
+
+PENDING, SENT, FAILED = "pending", "sent", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key             TEXT PRIMARY KEY,
+    symbol          TEXT NOT NULL,
+    chat_id         TEXT NOT NULL,
+    text            TEXT NOT NULL,
+    parse_mode      TEXT,
+    status          TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    lease_until     REAL NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    message_id      INTEGER,
+    created_at      REAL NOT NULL,
+    sent_at         REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+@dataclass
+class OutboxItem:
+    key: str
+    symbol: str
+    chat_id: str
+    text: str
+    parse_mode: Optional[str] = "Markdown"
+    attempts: int = 0
+
+
+# ─────────────────────────────────────────────────────────
+# Almacén
+# ─────────────────────────────────────────────────────────
+
+class Outbox:
+    COOLDOWN_NS = "cooldown"
+    DAY_NS = "day_count"
+    DAY_TTL = 2 * 86400      # el cupo de un día sólo interesa ese día
+
+    def __init__(self, path: str = OUTBOX_PATH, lease_s: float = 120.0, cooldown_s: float = 24 * 3600):
+        self.path = path
+        self.lease_s = float(lease_s)
+        self.cooldown_s = float(cooldown_s)
+        self.state = StateStore(path)
+        # Misma conexión/lock que el StateStore: transacciones compartidas
+        self._conn = self.state.conn
+        self._lock = self.state.lock
+        # Claves entregándose en este proceso (futuro del despachador sin
+        # resolver): claim() las salta aunque su lease haya expirado
+        self.in_flight: Set[str] = set()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.state.close()
+
+    def _tx(self):
+        return self.state.transaction()
+
+    # ---------- escaneo ----------
+    def enqueue(self, items: Iterable[OutboxItem], day: str, now: Optional[float] = None) -> List[str]:
+        """
+        Encola las señales y, en la misma transacción, fija su cooldown y suma
+        al cupo del día. Devuelve las claves realmente nuevas (las repetidas se
+        ignoran y no consumen cupo).
+        """
+        now = time.time() if now is None else float(now)
+        nuevas: List[str] = []
+        with self._tx() as c:
+            for it in items:
+                cur = c.execute(
+                    "INSERT OR IGNORE INTO outbox (key, symbol, chat_id, text, parse_mode, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (it.key, it.symbol, str(it.chat_id), it.text, it.parse_mode, now),
+                )
+                if cur.rowcount == 0:
+                    continue
+                nuevas.append(it.key)
+                self.state.set(self.COOLDOWN_NS, it.symbol, now, ttl=self.cooldown_s, now=now)
+            if nuevas:
+                self.state.incr(self.DAY_NS, day, len(nuevas), ttl=self.DAY_TTL, now=now)
+        return nuevas
+
+    def last_sent(self) -> Dict[str, float]:
+        """{symbol: ts_epoch} de los símbolos aún en cooldown."""
+        return {k: float(v) for k, v in self.state.items(self.COOLDOWN_NS).items()}
+
+    def sent_today(self, day: str) -> int:
+        return int(self.state.get(self.DAY_NS, day, 0))
+
+    # ---------- entrega ----------
+    def claim(self, limit: int = 50, now: Optional[float] = None, hold: bool = False) -> List[OutboxItem]:
+        """
+        Reclama (lease) hasta `limit` filas pendientes vencidas, en orden de
+        llegada, saltando las que siguen en vuelo en este proceso. Con
+        `hold=True` las reclamadas quedan en vuelo hasta release().
+        """
+        now = time.time() if now is None else float(now)
+        with self._tx() as c:
+            busy = sorted(self.in_flight)
+            skip = f"AND key NOT IN ({', '.join('?' * len(busy))}) " if busy else ""
+            rows = c.execute(
+                "SELECT key, symbol, chat_id, text, parse_mode, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? AND lease_until <= ? "
+                + skip + "ORDER BY created_at, rowid LIMIT ?",
+                (now, now, *busy, int(limit)),
+            ).fetchall()
+            c.executemany(
+                "UPDATE outbox SET lease_until = ?, attempts = attempts + 1 WHERE key = ?",
+                [(now + self.lease_s, r["key"]) for r in rows],
+            )
+            if hold:
+                self.in_flight.update(r["key"] for r in rows)
+        return [OutboxItem(r["key"], r["symbol"], r["chat_id"], r["text"], r["parse_mode"], r["attempts"] + 1)
+                for r in rows]
+
+    def release(self, key: str) -> None:
+        """La entrega de `key` en este proceso terminó (con o sin éxito)."""
+        with self._lock:
+            self.in_flight.discard(key)
+
+    def mark_sent(self, key: str, message_id: Optional[int] = None, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else float(now)
+        with self._tx() as c:
+            c.execute(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, message_id = ?, lease_until = 0, last_error = NULL "
+                "WHERE key = ?",
+                (now, message_id, key),
+            )
+
+    def mark_retry(self, key: str, error: str, delay: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else float(now)
+        with self._tx() as c:
+            c.execute(
+                "UPDATE outbox SET next_attempt_at = ?, lease_until = 0, last_error = ? WHERE key = ?",
+                (now + float(delay), error, key),
+            )
+
+    def mark_failed(self, key: str, error: str) -> None:
+        with self._tx() as c:
+            c.execute(
+                "UPDATE outbox SET status = 'failed', lease_until = 0, last_error = ? WHERE key = ?",
+                (error, key),
+            )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM outbox WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        out = {PENDING: 0, SENT: 0, FAILED: 0}
+        out.update({r["status"]: int(r["n"]) for r in rows})
+        return out
+
+
+# ─────────────────────────────────────────────────────────
+# Trabajador de entrega
+# ─────────────────────────────────────────────────────────
+
+class OutboxWorker:
+    """
+    Drena el outbox a través de un TelegramDispatcher. Cada envío ya hace sus
+    propios reintentos (429/5xx/red); si aun así falla de forma transitoria,
+    la fila se reprograma con backoff hasta `max_rounds` rondas.
+    """
+
+    def __init__(self, outbox: Outbox, dispatcher: Any, max_rounds: int = 5,
+                 backoff_base: float = 60.0, batch: int = 50):
+        self.outbox = outbox
+        self.dispatcher = dispatcher
+        self.max_rounds = max(1, int(max_rounds))
+        self.backoff_base = float(backoff_base)
+        self.batch = max(1, int(batch))
+
+    def submit_due(self) -> List[Future]:
+        """Reclama las filas vencidas y las entrega al despachador (no bloquea)."""
+        from notifier.dispatcher import OutboundMessage
+
+        futures: List[Future] = []
+        while True:
+            items = self.outbox.claim(self.batch, hold=True)
+            for it in items:
+                fut = self.dispatcher.submit(OutboundMessage(
+                    chat_id=it.chat_id,
+                    text=it.text,
+                    parse_mode=it.parse_mode,
+                    disable_web_page_preview=False,
+                    key=it.key,
+                ))
+                fut.add_done_callback(lambda f, it=it: self._settle(it, f))
+                futures.append(fut)
+            if len(items) < self.batch:
+                return futures
+
+    def drain(self, timeout: Optional[float] = None) -> Dict[str, int]:
+        """Entrega lo vencido y espera el resultado (hasta `timeout`)."""
+        futures = self.submit_due()
+        if futures:
+            wait(futures, timeout=timeout)
+        return self.outbox.stats()
+
+    def _settle(self, it: OutboxItem, fut: Future) -> None:
+        try:
+            res = fut.result()
+            if res.ok:
+                self.outbox.mark_sent(it.key, res.message_id)
+                return
+            error = str(res.error or res.status)
+            # 4xx distinto de 429 (p. ej. Markdown inválido): no se arregla reintentando
+            permanent = res.status is not None and 400 <= res.status < 500 and res.status != 429
+            if permanent or it.attempts >= self.max_rounds:
+                logger.error(f"Outbox: {it.symbol} descartado tras {it.attempts} rondas: {error}")
+                self.outbox.mark_failed(it.key, error)
+            else:
+                delay = min(3600.0, self.backoff_base * 2 ** (it.attempts - 1))
+                logger.warning(f"Outbox: {it.symbol} reprogramado en {delay:.0f}s ({error})")
+                self.outbox.mark_retry(it.key, error, delay)
+        except Exception as e:
+            # La fila conserva el lease y se reintentará cuando expire
+            logger.error(f"Outbox: no se pudo registrar la entrega de {it.symbol}: {e}")
+        finally:
+            self.outbox.release(it.key)
+
+
+def default_worker(outbox: Outbox) -> Optional[OutboxWorker]:
+    """Trabajador con el despachador compartido de config; None sin credenciales."""
+    import config
+    from notifier.dispatcher import get_dispatcher
+
+    token = getattr(config, "TELEGRAM_TOKEN", None)
+    if not token:
+        logger.error("Faltan credenciales de Telegram: el outbox queda pendiente")
+        return None
+    s = getattr(config, "OUTBOX", None) or {}
+    return OutboxWorker(
+        outbox,
+        get_dispatcher(token),
+        max_rounds=s.get("max_rounds", 5),
+        backoff_base=s.get("backoff_base", 60.0),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Outbox de señales: estado y entrega.")
+    parser.add_argument("cmd", choices=("stats", "drain"))
+    parser.add_argument("--path", default=OUTBOX_PATH)
+    parser.add_argument("--loop", type=float, default=0.0, help="Segundos entre drenados (0 = una vez).")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Espera máxima por drenado (s).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    outbox = Outbox(args.path)
+    if args.cmd == "stats":
+        print(json.dumps(outbox.stats(), indent=2))
+        return
+
+    worker = default_worker(outbox)
+    if worker is None:
+        raise SystemExit(1)
+    while True:
+        print(json.dumps(worker.drain(args.timeout)))
+        if args.loop <= 0:
+            break
+        time.sleep(args.loop)
+    from notifier.dispatcher import shutdown
+
+    shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,13 @@ from __future__ import annotations
 
 import os
 import json
+import logging
 import time
 from dataclasses import dataclass
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from utils.logger import get_audit_logger
+from utils.state_store import STATE_PATH, StateStore
 from notifier.telegram import TelegramNotifier
 
 # --- Intenta leer config (valores por defecto si no existe) ---
@@ -26,7 +28,8 @@ except Exception:
         TELEGRAM_TIMEOUT = 10
     config = _Cfg()  # type: ignore
 
-audit = get_audit_logger()
+# El handler a fichero (audit.log) se instala al crear un Sender, no al importar
+audit = logging.getLogger("audit")
 
 
 # ======================= utilidades =======================
@@ -51,46 +54,46 @@ def _as_float(x, default: Optional[float] = None) -> Optional[float]:
 
 class SenderState:
     """
-    Maneja el estado de últimos envíos por (symbol|bias) para aplicar cooldown entre ejecuciones.
+    Último envío por (symbol|bias) para aplicar cooldown entre ejecuciones.
+    Vive en el StateStore (utils.state_store, ns "sender"): cada marca es una
+    escritura O(1) con TTL = cooldown, de modo que las entradas viejas caducan.
+    El sender_state.json anterior se importa una vez.
     """
-    def __init__(self, path: Optional[str] = None) -> None:
-        if path is None:
-            # Guardamos el estado junto a este archivo por simplicidad
-            base = os.path.dirname(os.path.abspath(__file__))
-            path = os.path.join(base, "sender_state.json")
-        self.path = path
-        self.data: Dict[str, Any] = {"last_sent": {}}  # {"BTCUSDT|LONG": ts, ...}
-        self._load()
-
-    def _load(self) -> None:
+    NS = "sender"
+    LEGACY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sender_state.json")
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None) -> None:
+        self.path = path or STATE_PATH
+        self.ttl = ttl
+        self.store = StateStore(self.path)
+        self._import_legacy()
+
+    def _import_legacy(self) -> None:
+        if self.store.get("meta", "sender_json_imported") is not None:
+            return
         try:
-            if os.path.exists(self.path):
-                with open(self.path, "r", encoding="utf-8") as f:
-                    raw = json.load(f)
-                    if isinstance(raw, dict):
-                        self.data.update(raw)
+            with open(self.LEGACY_PATH, "r", encoding="utf-8") as f:
+                raw = json.load(f)
         except Exception:
-            # Estado corrupto → reiniciamos
-            self.data = {"last_sent": {}}
+            raw = {}
+        now = _now_ts()
+        with self.store.transaction():
+            for key, ts in (raw.get("last_sent", {}) if isinstance(raw, dict) else {}).items():
+                left = None if self.ttl is None else float(ts) + self.ttl - now
+                if left is None or left > 0:
+                    self.store.set(self.NS, key, float(ts), ttl=left, now=now)
+            self.store.set("meta", "sender_json_imported", now, now=now)
 
     def save(self) -> None:
-        try:
-            tmp_path = self.path + ".tmp"
-            with open(tmp_path, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, self.path)
-        except Exception:
-            pass
+        """Compatibilidad: cada mark_sent() ya queda confirmado."""
 
     # API
     def last_sent_ts(self, symbol: str, bias: str) -> Optional[float]:
-        key = f"{symbol}|{bias}"
-        ts = self.data.get("last_sent", {}).get(key)
+        ts = self.store.get(self.NS, f"{symbol}|{bias}")
         return float(ts) if ts is not None else None
 
     def mark_sent(self, symbol: str, bias: str, ts: Optional[float] = None) -> None:
-        key = f"{symbol}|{bias}"
-        self.data.setdefault("last_sent", {})[key] = float(ts or _now_ts())
+        self.store.set(self.NS, f"{symbol}|{bias}", float(ts or _now_ts()), ttl=self.ttl)
 
 
 # ======================= normalización de candidatos =======================
@@ -248,13 +251,18 @@ class Sender:
         send_top_n: Optional[int] = None,
         cooldown_minutes: Optional[int] = None,
         exclude_symbols: Optional[Iterable[str]] = None,
+        digest: Optional[Dict[str, Any]] = None,
     ) -> None:
+        get_audit_logger()
         self.notifier = notifier
-        self.state = SenderState(state_path)
+        # Modo digest: {"enabled": bool, "min_signals": int, "buttons": bool}
+        self.digest = {"enabled": False, "min_signals": 5, "buttons": True,
+                       **(digest if digest is not None else (_get_cfg("TELEGRAM_DIGEST", None) or {}))}
 
         self.min_score = float(min_score if min_score is not None else _get_cfg("MIN_SCORE_ALERTA", 55.0))
         self.send_top_n = int(send_top_n if send_top_n is not None else _get_cfg("SEND_TOP_N", 5))
         self.cooldown_minutes = int(cooldown_minutes if cooldown_minutes is not None else _get_cfg("COOLDOWN_MINUTES", 30))
+        self.state = SenderState(state_path, ttl=self.cooldown_minutes * 60)
 
         ex = exclude_symbols if exclude_symbols is not None else _get_cfg("EXCLUDE_SYMBOLS", [])
         self.exclude_symbols = set([s.upper() for s in (ex or [])])
@@ -297,6 +305,7 @@ class Sender:
         evaluated_total: Optional[int] = None,
         overrides: Optional[Dict[str, Any]] = None,
         dry_run: bool = False,
+        digest: Optional[bool] = None,
     ) -> Dict[str, Any]:
         """
         Envía una tanda a Telegram:
@@ -304,6 +313,8 @@ class Sender:
         - evaluated_total: total de símbolos evaluados (para pie del mensaje).
         - overrides: dict con ajustes de grids (ej. {"min_step_pct":0.015, "max_step_pct":0.035, "min_grids":6, "max_grids":30})
         - dry_run: si True, no envía; solo simula.
+        - digest: fuerza (True/False) el modo digest; por defecto se usa si está
+          activo en TELEGRAM_DIGEST y hay al menos min_signals señales.
         Devuelve {evaluated, eligible, to_send, sent_ok, sent_fail, skipped}.
         """
         # Normaliza
@@ -331,19 +342,44 @@ class Sender:
         eligible.sort(key=self._sort_key, reverse=True)
         to_send = eligible[: max(0, int(self.send_top_n))]
 
-        # Envío
+        # Envío: se encolan todas en el despachador (envío concurrente dentro de
+        # los límites de Telegram) y después se recogen los resultados
         sent_ok, sent_fail = 0, 0
         sent_symbols: List[str] = []
-
-        for idx, c in enumerate(to_send, start=1):
-            payload = _to_telegram_payload(
+        pending: List[Tuple[CandidateView, Any]] = []
+        payloads = [
+            _to_telegram_payload(
                 c,
                 evaluated_total=evaluated_total,
                 eligible_total=len(eligible),
-                sent_so_far=sent_ok,  # se irá actualizando
+                sent_so_far=idx - 1,
                 overrides=overrides,
             )
+            for idx, c in enumerate(to_send, start=1)
+        ]
+        if digest is None:
+            digest = bool(self.digest["enabled"]) and len(to_send) >= int(self.digest["min_signals"])
+
+        if digest and to_send and not dry_run:
+            # Una (o pocas) tablas en vez de un mensaje por señal
+            try:
+                futures = self.notifier.submit_digest(payloads, buttons=bool(self.digest["buttons"]))
+                ok = all(f.result().ok for f in futures)
+            except Exception as e:
+                ok = False
+                audit.info(f"Telegram EXC → digest: {e}")
+            if ok:
+                sent_ok = len(to_send)
+                for c in to_send:
+                    sent_symbols.append(c.symbol)
+                    self.state.mark_sent(c.symbol, c.bias)
+                audit.info(f"Telegram OK → digest de {len(to_send)} señales en {len(futures)} mensajes")
+            else:
+                sent_fail = len(to_send)
+                audit.info(f"Telegram FAIL → digest de {len(to_send)} señales")
+            payloads = []
 
+        for c, payload in zip(to_send, payloads):
             if dry_run:
                 audit.info(f"[DRY RUN] {c.symbol} {c.bias} score={c.score:.2f} → NO enviado")
                 sent_ok += 1  # contamos como 'simulado'
@@ -351,23 +387,26 @@ class Sender:
                 continue
 
             try:
-                ok = self.notifier.send_signal(payload)
-                if ok:
+                pending.append((c, self.notifier.submit_signal(payload)))
+            except Exception as e:
+                sent_fail += 1
+                audit.info(f"Telegram EXC → {c.symbol}: {e}")
+
+        for c, fut in pending:
+            try:
+                result = fut.result()
+                if result.ok:
                     sent_ok += 1
                     sent_symbols.append(c.symbol)
                     self.state.mark_sent(c.symbol, c.bias)
                     audit.info(f"Telegram OK → {c.symbol} (score {c.score:.2f})")
                 else:
                     sent_fail += 1
-                    audit.info(f"Telegram FAIL → {c.symbol} (score {c.score:.2f})")
+                    audit.info(f"Telegram FAIL → {c.symbol} (score {c.score:.2f}): {result.error}")
             except Exception as e:
                 sent_fail += 1
                 audit.info(f"Telegram EXC → {c.symbol}: {e}")
 
-        # Persistimos estado si hubo envíos reales
-        if not dry_run and (sent_ok > 0 or sent_fail > 0):
-            self.state.save()
-
         # Resumen de consola
         audit.info(
             f"✅ Enviados a Telegram: {sent_ok}/{len(to_send)}"
@@ -397,13 +436,19 @@ def build_sender_from_config() -> Sender:
     if not token or not chat_id:
         raise RuntimeError("Config incompleta: define TELEGRAM_BOT_TOKEN (o TELEGRAM_TOKEN) y TELEGRAM_CHAT_ID")
 
-    notifier = TelegramNotifier(token=token, chat_id=chat_id, timeout=timeout)
+    notifier = TelegramNotifier(
+        token=token,
+        chat_id=chat_id,
+        timeout=timeout,
+        detail_path=os.path.join("output", "logs", ".digest_details.json"),
+    )
 
     return Sender(
         notifier=notifier,
-        state_path=None,  # usa sender_state.json por defecto junto a este archivo
+        state_path=None,  # StateStore por defecto (output/logs/state.sqlite3)
         min_score=_get_cfg("MIN_SCORE_ALERTA", 55.0),
         send_top_n=_get_cfg("SEND_TOP_N", 5),
         cooldown_minutes=_get_cfg("COOLDOWN_MINUTES", 30),
         exclude_symbols=_get_cfg("EXCLUDE_SYMBOLS", []),
+        digest=_get_cfg("TELEGRAM_DIGEST", None),
     )
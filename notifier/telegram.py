@@ -1,10 +1,14 @@
 # notifier/telegram.py
 from __future__ import annotations
-import time
+import hashlib
+import json
 import math
+import os
 import re
-import requests
-from typing import Dict, List, Tuple, Optional
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, Tuple, Optional
+
+from notifier.dispatcher import OutboundMessage, TelegramDispatcher, get_dispatcher
 
 
 class TelegramNotifier:
@@ -25,8 +29,22 @@ class TelegramNotifier:
       - "grid_step": fuerza el step; recalcula n.
       - "grids": fuerza el nº de grids; recalcula step.
       - Si vienen ambos, se respetan ambos (sujeto a clamps de seguridad).
+
+    Envío: los mensajes pasan por notifier.dispatcher (cola + límites de
+    Telegram + retry_after). submit_signal() no bloquea; send_signal() espera
+    el resultado.
+
+    Modo digest (send_digest/submit_digest): el top-N va en una o varias
+    tablas compactas (cortadas al límite de 4096 caracteres de Telegram) en
+    lugar de un mensaje por señal. Con botones, cada símbolo lleva un botón
+    inline (callback_data "d:<clave>") y la tarjeta completa se pide a
+    demanda con detail_for()/send_detail() al recibir el callback_query.
     """
 
+    MAX_TEXT = 4096          # límite de caracteres por mensaje de Telegram
+    DETAIL_PREFIX = "d:"
+    MAX_DETAILS = 500        # tarjetas recordadas para los botones
+
     def __init__(
         self,
         token: str,
@@ -40,10 +58,17 @@ class TelegramNotifier:
         # límites de seguridad para nº de grids
         min_grids: int = 6,
         max_grids: int = 30,
+        # envío
+        dispatcher: Optional[TelegramDispatcher] = None,
+        api_base: Optional[str] = None,   # None → TELEGRAM_API_BASE de config
+        # digest: JSON con las tarjetas de detalle (sobrevive al proceso)
+        detail_path: Optional[str] = None,
     ):
-        self.base = f"https://api.telegram.org/bot{token}/sendMessage"
         self.chat_id = chat_id
         self.timeout = timeout
+        self.dispatcher = dispatcher or get_dispatcher(token, api_base)
+        self.detail_path = detail_path
+        self._details: Dict[str, Dict] = self._load_details()
 
         self.min_step_pct = float(min_step_pct)
         self.max_step_pct = float(max_step_pct)
@@ -79,22 +104,158 @@ class TelegramNotifier:
           "context": ["ADX=31.9", "RR≈2.40R", "ATR%≈0.0434"]
         }
         """
-        text = self._format(signal)
-        payload = {
-            "chat_id": self.chat_id,
-            "text": text,
-            "parse_mode": "Markdown",
-            "disable_web_page_preview": True,
-        }
-        for i in range(retry + 1):
-            try:
-                r = requests.post(self.base, json=payload, timeout=self.timeout)
-                if r.ok:
-                    return True
-            except Exception:
-                pass
-            time.sleep(1 + i)
-        return False
+        result = self.submit_signal(signal, retry=retry).result()
+        return result.ok
+
+    def submit_signal(self, signal: Dict, retry: int = 2) -> Future:
+        """Encola la señal sin esperar la entrega; Future → DeliveryResult."""
+        msg = OutboundMessage(chat_id=self.chat_id, text=self._format(signal), parse_mode="Markdown")
+        return self.dispatcher.submit(msg, max_attempts=retry + 1)
+
+    # -------------------- digest --------------------
+
+    def submit_digest(
+        self,
+        signals: Iterable[Dict],
+        *,
+        title: str = "DIGEST",
+        buttons: bool = True,
+        retry: int = 2,
+    ) -> List[Future]:
+        """Encola el top-N como tablas compactas; un Future por mensaje."""
+        futures: List[Future] = []
+        for text, markup in self.format_digest(signals, title=title, buttons=buttons):
+            msg = OutboundMessage(chat_id=self.chat_id, text=text, parse_mode="Markdown", reply_markup=markup)
+            futures.append(self.dispatcher.submit(msg, max_attempts=retry + 1))
+        return futures
+
+    def send_digest(self, signals: Iterable[Dict], **kwargs) -> bool:
+        """Como submit_digest() pero espera; True si se entregaron todos los mensajes."""
+        return all(f.result().ok for f in self.submit_digest(signals, **kwargs))
+
+    def format_digest(
+        self,
+        signals: Iterable[Dict],
+        *,
+        title: str = "DIGEST",
+        buttons: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Devuelve [(texto, reply_markup)] con las señales en tablas monoespaciadas,
+        cada texto <= limit (4096 por defecto). El pie (Evaluados/Elegibles) sale
+        del primer payload que lo traiga y va sólo en el último mensaje.
+        """
+        sigs = list(signals)
+        if not sigs:
+            return []
+        limit = int(limit or self.MAX_TEXT)
+
+        header = f"{'#':>2} {'SYMBOL':<12} {'SIDE':<5} {'SCORE':>5} {'ENTRY':>11} {'SL':>11} {'TP':>11} {'RR':>4}"
+        rows = [self._digest_row(i, s) for i, s in enumerate(sigs, start=1)]
+        footer = self._digest_footer(sigs)
+
+        # Margen fijo para título "(i/n)", cercas ``` y pie
+        overhead = len(title) + len(footer) + len(header) + 64
+        if overhead + max(len(r) + 1 for r in rows) > limit:
+            raise ValueError(f"limit={limit} demasiado pequeño para una fila del digest")
+
+        chunks: List[List[int]] = [[]]
+        used = overhead
+        for i, row in enumerate(rows):
+            if chunks[-1] and used + len(row) + 1 > limit:
+                chunks.append([])
+                used = overhead
+            chunks[-1].append(i)
+            used += len(row) + 1
+
+        out: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+        for n, idx in enumerate(chunks, start=1):
+            page = f" ({n}/{len(chunks)})" if len(chunks) > 1 else ""
+            lines = [f"📋 *{self._esc(title)}* — {len(sigs)} señales{page}", "```", header]
+            lines += [rows[i] for i in idx]
+            lines.append("```")
+            if n == len(chunks) and footer:
+                lines.append(footer)
+            markup = self._digest_buttons([sigs[i] for i in idx]) if buttons else None
+            out.append(("\n".join(lines), markup))
+        if buttons:
+            self._save_details()
+        return out
+
+    def detail_for(self, callback_data: str) -> Optional[str]:
+        """Tarjeta completa (formato de send_signal) para un botón del digest."""
+        if not str(callback_data).startswith(self.DETAIL_PREFIX):
+            return None
+        s = self._details.get(str(callback_data)[len(self.DETAIL_PREFIX):])
+        return self._format(s) if s is not None else None
+
+    def send_detail(self, callback_data: str, retry: int = 2) -> Optional[Future]:
+        """Envía la tarjeta pedida desde un botón; None si el botón no es del digest o caducó."""
+        text = self.detail_for(callback_data)
+        if text is None:
+            return None
+        msg = OutboundMessage(chat_id=self.chat_id, text=text, parse_mode="Markdown")
+        return self.dispatcher.submit(msg, max_attempts=retry + 1)
+
+    def _digest_row(self, i: int, s: Dict) -> str:
+        rr = self._rr_ratio(s)
+        score = s.get("score")
+        score_txt = f"{float(score):5.1f}" if isinstance(score, (int, float)) else f"{'?':>5}"
+        # Dentro del bloque ``` no se interpreta Markdown: sólo se evita el propio `
+        sym = str(s["symbol"]).replace("`", "")[:12]
+        return (
+            f"{i:>2} {sym:<12} {str(s.get('bias', '')).upper()[:5]:<5} {score_txt} "
+            f"{self._fmt_num(s['entry']):>11} {self._fmt_num(s['stop_loss']):>11} "
+            f"{self._fmt_num(s['take_profit']):>11} {(f'{rr:.1f}' if rr is not None else '-'):>4}"
+        )
+
+    def _digest_footer(self, sigs: List[Dict]) -> str:
+        for s in sigs:
+            if s.get("evaluated") is not None or s.get("eligible") is not None:
+                return f"Evaluados: {s.get('evaluated', '?')} | Elegibles: {s.get('eligible', '?')} | Enviados: {len(sigs)}"
+        return ""
+
+    def _digest_buttons(self, sigs: List[Dict], per_row: int = 3) -> Dict[str, Any]:
+        keyboard: List[List[Dict[str, str]]] = []
+        for s in sigs:
+            key = self._detail_key(s)
+            self._details.pop(key, None)
+            self._details[key] = s
+            btn = {"text": f"🔎 {s['symbol']}", "callback_data": f"{self.DETAIL_PREFIX}{key}"}
+            if not keyboard or len(keyboard[-1]) >= per_row:
+                keyboard.append([])
+            keyboard[-1].append(btn)
+        while len(self._details) > self.MAX_DETAILS:
+            self._details.pop(next(iter(self._details)))
+        return {"inline_keyboard": keyboard}
+
+    @staticmethod
+    def _detail_key(s: Dict) -> str:
+        raw = f"{s.get('symbol')}|{str(s.get('bias', '')).upper()}|{s.get('entry')}|{s.get('stop_loss')}|{s.get('take_profit')}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]   # callback_data <= 64 bytes
+
+    def _load_details(self) -> Dict[str, Dict]:
+        if not self.detail_path:
+            return {}
+        try:
+            with open(self.detail_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def _save_details(self) -> None:
+        if not self.detail_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.detail_path) or ".", exist_ok=True)
+            tmp_path = self.detail_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._details, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.detail_path)
+        except Exception:
+            pass
 
     # ==================== Formato / lógica ====================
 
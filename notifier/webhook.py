@@ -0,0 +1,251 @@
+# notifier/webhook.py
+# -*- coding: utf-8 -*-
+"""
+Webhook de Telegram para las decisiones tomadas con botones inline.
+
+Flujo de un callback_query:
+1. Se descarta si el update_id ya se procesó (Telegram reintenta el webhook
+   si no recibe 200 a tiempo).
+2. Se resuelve el símbolo: "Decisión|SYMBOL" en callback_data o, si el botón
+   sólo lleva la decisión, por el message_id del mensaje con botones.
+3. La operación pendiente se RECLAMA (lectura + borrado en una transacción):
+   dos pulsaciones concurrentes no registran dos veces.
+4. Se responde al instante con answerCallbackQuery EN LA PROPIA respuesta
+   del webhook (sin otra petición HTTP), dentro del plazo de Telegram.
+5. Lo lento (diario de operaciones + confirmación al chat, vía
+   notifier.notifier.manejar_callback) va a un pool de hilos, fuera de la
+   petición.
+
+Las operaciones pendientes viven en el StateStore (utils.state_store) con
+dos índices: por símbolo y por message_id, con TTL. Sustituyen al dict
+`memoria` en proceso, que se perdía entre ejecuciones.
+
+Los botones de detalle del digest ("d:<clave>", notifier.telegram) también
+se atienden aquí.
+
+Uso:
+  python -m notifier.webhook --port 8443 [--set-webhook https://host/telegram/webhook]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.state_store import STATE_PATH, StateStore
+
+logger = logging.getLogger("webhook")
+
+WEBHOOK_PATH = "/telegram/webhook"
+PENDING_TTL = 7 * 86400          # una decisión pendiente más de una semana ya no interesa
+UPDATE_TTL = 86400               # ventana de deduplicación de update_id
+DETAIL_PATH = os.path.join("output", "logs", ".digest_details.json")
+
+
+# ─────────────────────────────────────────────────────────
+# Operaciones pendientes (persistentes)
+# ─────────────────────────────────────────────────────────
+
+class PendingOps:
+    """Operaciones a la espera de decisión, indexadas por símbolo y por message_id."""
+
+    OP_NS = "pending_op"
+    MSG_NS = "pending_msg"
+
+    def __init__(self, store: Optional[StateStore] = None, ttl: float = PENDING_TTL):
+        self.store = store or StateStore(STATE_PATH)
+        self.ttl = float(ttl)
+
+    def add(self, symbol: str, op: Dict[str, Any], message_id: Optional[Any] = None) -> None:
+        with self.store.transaction():
+            self.store.set(self.OP_NS, symbol, {"op": op, "message_id": message_id}, ttl=self.ttl)
+            if message_id not in (None, ""):
+                self.store.set(self.MSG_NS, str(message_id), symbol, ttl=self.ttl)
+
+    def symbol_for(self, message_id: Any) -> Optional[str]:
+        return self.store.get(self.MSG_NS, str(message_id))
+
+    # Interfaz tipo dict (la que espera manejar_callback como `memoria`)
+    def get(self, symbol: str, default: Any = None) -> Any:
+        entry = self.store.get(self.OP_NS, symbol)
+        return entry["op"] if entry else default
+
+    def pop(self, symbol: str, default: Any = None) -> Any:
+        """Lee y borra en una transacción: sólo un llamador obtiene la operación."""
+        with self.store.transaction():
+            entry = self.store.get(self.OP_NS, symbol)
+            if entry is None:
+                return default
+            self.store.delete(self.OP_NS, symbol)
+            if entry.get("message_id") not in (None, ""):
+                self.store.delete(self.MSG_NS, str(entry["message_id"]))
+        return entry["op"]
+
+    def seen_update(self, update_id: Any) -> bool:
+        """True si el update ya llegó antes; si no, lo marca como visto."""
+        if update_id is None:
+            return False
+        with self.store.transaction():
+            if self.store.get("tg_update", str(update_id)) is not None:
+                return True
+            self.store.set("tg_update", str(update_id), 1, ttl=UPDATE_TTL)
+        return False
+
+
+# ─────────────────────────────────────────────────────────
+# Procesado de callbacks
+# ─────────────────────────────────────────────────────────
+
+class CallbackHandler:
+    def __init__(self, pending: Optional[PendingOps] = None, workers: int = 4, notifier: Any = None):
+        self.pending = pending or PendingOps()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="tg-callback")
+        self.notifier = notifier        # TelegramNotifier para los botones de detalle del digest
+        self.futures: List[Future] = []
+
+    def close(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+
+    def handle_update(self, update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Procesa un update y devuelve la respuesta del webhook (método de la
+        Bot API a ejecutar, normalmente answerCallbackQuery) o None.
+        """
+        cq = update.get("callback_query")
+        if not isinstance(cq, dict):
+            return None
+        if self.pending.seen_update(update.get("update_id")):
+            return None
+        data = str(cq.get("data") or "")
+        text, job = self._route(data, cq)
+        if job is not None:
+            self.futures = [f for f in self.futures if not f.done()]
+            self.futures.append(self.executor.submit(self._run, *job))
+        return {"method": "answerCallbackQuery", "callback_query_id": cq.get("id"), "text": text}
+
+    def _route(self, data: str, cq: Dict[str, Any]) -> Tuple[str, Optional[tuple]]:
+        if data.startswith("d:"):
+            if self.notifier is None:
+                return "Detalle no disponible", None
+            return "Enviando detalle…", (self.notifier.send_detail, data)
+
+        partes = data.split("|")
+        decision = partes[0]
+        if decision.lower() == "resultado":
+            symbol = partes[1] if len(partes) >= 2 else "?"
+            return f"Resultado de {symbol} recibido", (_manejar, data, symbol, {})
+
+        symbol = partes[1] if len(partes) >= 2 else None
+        if symbol is None:
+            msg_id = (cq.get("message") or {}).get("message_id")
+            symbol = self.pending.symbol_for(msg_id) if msg_id is not None else None
+        if not symbol:
+            return "Operación no encontrada", None
+        op = self.pending.pop(symbol)
+        if op is None:
+            return f"{symbol}: ya registrada o caducada", None
+        # manejar_callback espera sólo la decisión y la operación en `memoria`
+        return f"{symbol}: {decision} registrada", (_manejar, decision, symbol, {symbol: op})
+
+    @staticmethod
+    def _run(fn, *args: Any) -> None:
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.error(f"Callback fallido ({getattr(fn, '__name__', fn)}): {e}")
+
+
+def _manejar(data: str, symbol: str, memoria: Dict[str, Any]) -> None:
+    from notifier.notifier import manejar_callback
+
+    manejar_callback(data, symbol, memoria)
+
+
+# ─────────────────────────────────────────────────────────
+# Servidor (Flask)
+# ─────────────────────────────────────────────────────────
+
+def create_app(handler: Optional[CallbackHandler] = None, secret: Optional[str] = None):
+    """
+    App Flask con el endpoint del webhook. Si hay `secret` (o
+    TELEGRAM_WEBHOOK_SECRET en config), se exige la cabecera
+    X-Telegram-Bot-Api-Secret-Token que Telegram envía con setWebhook.
+    """
+    from flask import Flask, jsonify, request
+
+    if secret is None:
+        import config
+
+        secret = getattr(config, "TELEGRAM_WEBHOOK_SECRET", "") or ""
+    handler = handler or CallbackHandler()
+    app = Flask("telegram_webhook")
+    app.config["CALLBACK_HANDLER"] = handler
+
+    @app.post(WEBHOOK_PATH)
+    def webhook():
+        if secret and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != secret:
+            return jsonify({"ok": False}), 403
+        update = request.get_json(silent=True) or {}
+        try:
+            reply = handler.handle_update(update)
+        except Exception as e:
+            # 200 igualmente: un error nuestro no debe hacer que Telegram reintente sin fin
+            logger.error(f"Update {update.get('update_id')} con error: {e}")
+            reply = None
+        return jsonify(reply or {})
+
+    @app.get("/health")
+    def health():
+        return jsonify({"ok": True})
+
+    return app
+
+
+def set_webhook(url: str, secret: str = "") -> Dict[str, Any]:
+    import config
+    import requests
+
+    from notifier.dispatcher import api_url
+
+    payload = {"url": url, "allowed_updates": ["callback_query"]}
+    if secret:
+        payload["secret_token"] = secret
+    resp = requests.post(api_url(config.TELEGRAM_TOKEN, "setWebhook"), json=payload, timeout=10)
+    return resp.json()
+
+
+def main() -> None:
+    import config
+
+    parser = argparse.ArgumentParser(description="Webhook de Telegram para decisiones con botones.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--workers", type=int, default=4, help="Hilos para diario/confirmaciones.")
+    parser.add_argument("--set-webhook", default=None, help="URL pública a registrar en Telegram.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    secret = getattr(config, "TELEGRAM_WEBHOOK_SECRET", "") or ""
+    if args.set_webhook:
+        print(set_webhook(args.set_webhook, secret))
+
+    notifier = None
+    if getattr(config, "TELEGRAM_TOKEN", "") and getattr(config, "TELEGRAM_CHAT_ID", ""):
+        from notifier.telegram import TelegramNotifier
+
+        notifier = TelegramNotifier(config.TELEGRAM_TOKEN, config.TELEGRAM_CHAT_ID, detail_path=DETAIL_PATH)
+    handler = CallbackHandler(workers=args.workers, notifier=notifier)
+    try:
+        create_app(handler, secret).run(host=args.host, port=args.port, threaded=True)
+    finally:
+        handler.close()
+        from notifier.dispatcher import shutdown
+
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
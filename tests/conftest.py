@@ -1,3 +1,4 @@
+import importlib
 import sys
 import types
 from pathlib import Path
@@ -8,6 +9,9 @@ sys.path.insert(0, str(repo_root))
 
 import pytest
 
+from tests.helpers import fake_analyzer
+
+
 @pytest.fixture(autouse=True, scope="session")
 def stub_config_module():
     cfg = types.ModuleType("config")
@@ -30,3 +34,69 @@ def stub_config_module():
     sys.modules.pop("config", None)
     if str(repo_root) in sys.path:
         sys.path.remove(str(repo_root))
+
+
+# ─────────────────────────────────────────────────────────
+# Config relajada (backtest / sweep)
+# ─────────────────────────────────────────────────────────
+
+@pytest.fixture
+def relaxed_cfg(monkeypatch):
+    import logic.analyzer as an
+    import logic.backtest as bt
+
+    monkeypatch.setattr(bt.config, "USE_GLOBAL_TREND_FILTER", False, raising=False)
+    monkeypatch.setattr(bt.config, "BIAS_MODE", "relaxed", raising=False)
+    monkeypatch.setattr(bt.config, "MIN_SCORE_ALERTA", 0, raising=False)
+    monkeypatch.setattr(bt.config, "VOLUMEN_MINIMO_USDT", 0, raising=False)
+    monkeypatch.setattr(bt.config, "MAX_ATR_PCT", None, raising=False)
+    monkeypatch.setattr(an, "ADX_MIN", 0)
+    monkeypatch.setattr(an, "MAX_ATR_PCT", None)
+
+
+# ─────────────────────────────────────────────────────────
+# Escaneos de main contra utils.fake_binance
+# ─────────────────────────────────────────────────────────
+
+@pytest.fixture
+def fresh_symbols(monkeypatch):
+    # Otros tests sustituyen data.symbols por stubs: se importa el módulo real
+    monkeypatch.delitem(sys.modules, "data.symbols", raising=False)
+    return importlib.import_module("data.symbols")
+
+
+@pytest.fixture
+def isolated_output(tmp_path, monkeypatch):
+    """Caché HTTP y logs en tmp_path: un escaneo de prueba no escribe en output/."""
+    monkeypatch.setattr("utils.data_loader.CACHE_DIR", str(tmp_path / "http"))
+    monkeypatch.setattr("utils.logger._LOG_DIR", tmp_path / "logs")
+    return tmp_path
+
+
+@pytest.fixture
+def scan_env(isolated_output, fresh_symbols, monkeypatch):
+    """
+    main listo para run_once() bajo FakeBinance: analizador determinista
+    (`env.analyzer`, sustituible), macro neutra, sin entrega y outbox/tracker en
+    tmp_path. `env.calls` registra los símbolos analizados y `env.deliveries`
+    cada arranque de la entrega.
+    """
+    import main
+    from utils.macro import MacroState
+
+    env = types.SimpleNamespace(main=main, calls=[], deliveries=[], analyzer=fake_analyzer)
+
+    def _analyze(sym, *args, **kwargs):
+        env.calls.append(sym)
+        return env.analyzer(sym, *args, **kwargs)
+
+    monkeypatch.setattr(main, "analizar_simbolo", _analyze)
+    monkeypatch.setattr(main, "_ANALYSIS_CACHE", None)
+    monkeypatch.setattr(main, "get_macro_state", lambda: MacroState(None, None, None, None, 0.0))
+    monkeypatch.setattr(main, "_start_delivery", env.deliveries.append)
+    monkeypatch.setattr(main, "OUTBOX_PATH", str(isolated_output / "state.sqlite3"))
+    for name in ("LAST_TOP_PATH", "SYMBOL_LOCK_PATH", "DAY_COUNT_PATH"):    # estado JSON heredado
+        monkeypatch.setattr(main, name, str(isolated_output / name))
+    monkeypatch.setattr("logic.tracker.TRACKER_PATH", str(isolated_output / "tracker.json"))
+    monkeypatch.setattr(main, "get_usdt_futures_universe", fresh_symbols.get_usdt_futures_universe)
+    return env
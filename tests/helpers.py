@@ -0,0 +1,47 @@
+"""Datos sintéticos compartidos por los tests (los fixtures viven en conftest.py)."""
+
+import types
+
+import numpy as np
+
+# ─────────────────────────────────────────────────────────
+# Klines sintéticas (backtest / sweep)
+# ─────────────────────────────────────────────────────────
+
+DAY = 86_400_000
+T0 = 1641168000000  # lunes 2022-01-03 UTC
+
+
+def synthetic_daily(n=400, seed=1):
+    rng = np.random.default_rng(seed)
+    c = 100 * np.exp(np.cumsum(rng.normal(0.002, 0.03, n)))
+    o = np.r_[c[0], c[:-1]]
+    h = np.maximum(o, c) * (1 + rng.uniform(0, 0.02, n))
+    l = np.minimum(o, c) * (1 - rng.uniform(0, 0.02, n))
+    v = rng.uniform(1e6, 3e6, n)
+    return [[T0 + i * DAY, o[i], h[i], l[i], c[i], v[i], T0 + (i + 1) * DAY - 1] for i in range(n)]
+
+
+def synthetic_weekly(daily):
+    out = []
+    for i in range(0, len(daily), 7):
+        ch = daily[i:i + 7]
+        out.append([ch[0][0], ch[0][1], max(r[2] for r in ch), min(r[3] for r in ch),
+                    ch[-1][4], sum(r[5] for r in ch), ch[0][0] + 7 * DAY - 1])
+    return out
+
+
+# ─────────────────────────────────────────────────────────
+# Escaneos de main contra utils.fake_binance
+# ─────────────────────────────────────────────────────────
+
+SYMBOLS = ["AAAUSDT", "BBBUSDT", "BTCUSDT", "ETHUSDT"]
+SCORES = {"AAAUSDT": 61.0, "BBBUSDT": 90.0, "BTCUSDT": 70.0, "ETHUSDT": 75.0}
+
+
+def fake_analyzer(sym, kl_d, kl_w, *args, **kwargs):
+    """analizar_simbolo determinista: LONG al último cierre con score SCORES[sym]."""
+    px = float(kl_d[-1][4])
+    tec = types.SimpleNamespace(symbol=sym, bias="LONG", tipo="LONG", entry=px, precio=px, stop_loss=px * 0.95,
+                                sl=px * 0.95, take_profit=px * 1.1, tp=px * 1.1, score_model="test")
+    return tec, SCORES[sym], {}, None
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import logic.analyzer as an
+import logic.backtest as bt
+from tests.helpers import synthetic_daily, synthetic_weekly
+
+
+def test_vectorized_signals_match_analizar_simbolo(relaxed_cfg):
+    daily = synthetic_daily()
+    feat = bt.compute_features(daily, synthetic_weekly(daily))
+    sig = bt.build_signals(feat, bt.SignalParams(adx_min=0, max_atr_pct=None, min_score=0, vol_min=0))
+
+    checked = 0
+    for t in range(150, len(daily), 5):
+        prefix = daily[: t + 1]
+        out = an.analizar_simbolo("TESTUSDT", prefix, synthetic_weekly(prefix), False, False)
+        if out is None:
+            assert not sig["valid"][t]
+            continue
+        tec, score, _, _ = out
+        assert sig["valid"][t]
+        assert sig["score"][t] == pytest.approx(score, abs=1e-9)
+        assert sig["sl"][t] == pytest.approx(tec.stop_loss)
+        assert sig["tp"][t] == pytest.approx(tec.take_profit)
+        checked += 1
+    assert checked > 10
+
+
+def test_simulate_trades_first_touch_and_expiry():
+    high = np.array([10, 11, 12, 10, 10, 10, 10], dtype=float)
+    low = np.array([9, 9.5, 9.8, 8.0, 9.5, 9.5, 9.5], dtype=float)
+    close = np.array([10, 10.5, 11, 9, 10, 10, 10], dtype=float)
+    sim = bt.simulate_trades(
+        high, low, close,
+        idx=np.array([0, 0, 3, 5]),
+        side=np.array([1, 1, -1, 1]),
+        entry=np.array([10.0, 10.0, 9.0, 10.0]),
+        sl=np.array([9.0, 7.0, 11.0, 9.0]),
+        tp=np.array([11.5, 20.0, 7.0, 12.0]),
+        horizon=3,
+    )
+    assert list(sim["outcome"]) == ["TP", "EXPIRED", "EXPIRED", "OPEN"]
+    assert sim["r"][0] == pytest.approx(1.5)
+    assert sim["exit_idx"][1] == 3 and sim["r"][1] == pytest.approx(-1 / 3)
+    assert sim["exit_idx"][3] == 6
+
+
+def test_run_backtest_from_disk(tmp_path, relaxed_cfg):
+    for i, sym in enumerate(("AAAUSDT", "BBBUSDT")):
+        daily = synthetic_daily(seed=i + 1)
+        bt.save_klines(str(tmp_path), sym, "1d", daily)
+        bt.save_klines(str(tmp_path), sym, "1w", synthetic_weekly(daily))
+
+    trades, stats = bt.run_backtest(str(tmp_path), horizon=30)
+    assert set(trades["symbol"]) <= {"AAAUSDT", "BBBUSDT"}
+    assert stats["signals"] == len(trades) > 0
+    assert stats["tp"] + stats["sl"] + stats["expired"] + stats["open"] == stats["signals"]
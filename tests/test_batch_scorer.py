@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from logic.analyzer import _score_signal_v2
+from logic.batch_scorer import build_feature_array, features_row, percentile_rank, score_batch
+
+CFG = SimpleNamespace(MAX_ATR_PCT=0.08, VOLUMEN_MINIMO_USDT=30_000_000)
+
+
+def _features(n, seed=3):
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in range(n):
+        bias = "LONG" if i % 2 else "SHORT"
+        entry = float(rng.uniform(1, 100))
+        risk = entry * float(rng.uniform(0.01, 0.1))
+        sign = 1 if bias == "LONG" else -1
+        out.append({
+            "bias": bias,
+            "entry": entry,
+            "sl": entry - sign * risk,
+            "sp": entry + sign * risk * float(rng.uniform(0.5, 4)),
+            "adx": float(rng.uniform(5, 45)),
+            "atr_pct": float(rng.uniform(0, 0.15)),
+            "vol_usdt_24h": float(rng.uniform(0, 1e8)),
+            "vol_3d_up": bool(rng.integers(2)),
+            "trend": ["Alcista", "Bajista", "Lateral"][i % 3],
+            "consolidando": bool(rng.integers(2)),
+            "regime_align": bool(rng.integers(2)),
+        })
+    return out
+
+
+def test_batch_matches_per_symbol_scores():
+    feats = _features(60)
+    arr = build_feature_array(features_row(f"S{i}", f) for i, f in enumerate(feats))
+    scores, factors = score_batch(arr, CFG)
+    for i, f in enumerate(feats):
+        ref, ref_factors, _ = _score_signal_v2(f, CFG)
+        assert np.isclose(scores[i], ref)
+        for block, value in ref_factors.items():
+            assert np.isclose(factors[block][i], value)
+
+
+def test_percentile_rank_ties_and_nan():
+    r = percentile_rank(np.array([3.0, 1.0, 3.0, np.nan, 2.0]))
+    assert np.allclose(r[[0, 1, 2, 4]], [5 / 6, 0.0, 5 / 6, 1 / 3])
+    assert np.isnan(r[3])
+
+
+def test_cross_terms_reward_relative_strength_by_side():
+    feats = _features(4)
+    rets = [-0.15, 0.30, 0.05, 0.10]  # vs BTC +0.10
+    arr = build_feature_array(features_row(f"S{i}", f, r) for i, (f, r) in enumerate(zip(feats, rets)))
+    base, _ = score_batch(arr, CFG)
+    scores, factors = score_batch(arr, CFG, cross={"rel_strength": 9}, benchmark_ret=0.10)
+    # S0 SHORT con -25% relativo lidera; S1 LONG con +20% relativo va después
+    assert np.allclose(factors["cross_section"], [9.0, 6.0, 3.0, 0.0])
+    assert np.all(scores >= base)
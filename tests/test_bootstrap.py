@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from utils.bootstrap import BootstrapError, BootTask, run_bootstrap
+
+
+def _sleep(value, s):
+    def fn():
+        time.sleep(s)
+        return value
+    return fn
+
+
+def _boom():
+    raise RuntimeError("sin red")
+
+
+def test_tasks_run_concurrently_with_degraded_fallbacks():
+    # a y b sólo terminan si corren a la vez (la barrera se rompe si van en serie)
+    barrier = threading.Barrier(2, timeout=2)
+    release, finished = threading.Event(), threading.Event()
+
+    def _meet(value):
+        def fn():
+            barrier.wait()
+            return value
+        return fn
+
+    def _hang():
+        release.wait(5)
+        finished.set()
+        return "S"
+
+    res = run_bootstrap([
+        BootTask("a", _meet("A"), timeout=3),
+        BootTask("b", _meet("B"), timeout=3),
+        BootTask("slow", _hang, timeout=0.2, fallback="neutral"),
+        BootTask("err", _boom, timeout=2, fallback=lambda: {"neutral": True}),
+    ])
+    assert not finished.is_set()        # no se espera a la tarea colgada
+    release.set()
+    assert res["a"].value == "A" and not res["a"].degraded
+    assert res["b"].value == "B" and not res["b"].degraded
+    assert res["slow"].value == "neutral" and res["slow"].degraded and "timeout" in res["slow"].error
+    assert res["err"].value == {"neutral": True} and res["err"].error == "sin red"
+
+
+def test_required_task_failure_raises():
+    with pytest.raises(BootstrapError, match="universe"):
+        run_bootstrap([
+            BootTask("macro", _sleep(1, 0), timeout=1),
+            BootTask("universe", _boom, timeout=1, required=True),
+        ])
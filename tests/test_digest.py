@@ -0,0 +1,67 @@
+from concurrent.futures import Future
+
+from notifier.dispatcher import DeliveryResult
+from notifier.sender import Sender
+from notifier.telegram import TelegramNotifier
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.sent = []
+
+    def submit(self, msg, max_attempts=None):
+        self.sent.append(msg)
+        fut = Future()
+        fut.set_result(DeliveryResult(True, 1, 200, message_id=len(self.sent)))
+        return fut
+
+
+def _signals(n):
+    return [
+        {"symbol": f"COIN{i:03d}USDT", "bias": "LONG" if i % 2 else "SHORT", "score": 90 - i * 0.5,
+         "entry": 100.0 + i, "stop_loss": 95.0 + i if i % 2 else 105.0 + i,
+         "take_profit": 110.0 + i if i % 2 else 90.0 + i, "evaluated": 400, "eligible": n}
+        for i in range(n)
+    ]
+
+
+def _notifier(tmp_path=None):
+    path = str(tmp_path / "details.json") if tmp_path else None
+    return TelegramNotifier("T", "42", dispatcher=FakeDispatcher(), detail_path=path)
+
+
+def test_digest_splits_at_limit_and_keeps_every_row():
+    tn = _notifier()
+    msgs = tn.format_digest(_signals(120), buttons=False)
+    assert len(msgs) > 1
+    assert all(len(text) <= TelegramNotifier.MAX_TEXT for text, _ in msgs)
+    body = "\n".join(text for text, _ in msgs)
+    assert all(f"COIN{i:03d}USDT" in body for i in range(120))
+    assert msgs[0][0].startswith("📋 *DIGEST* — 120 señales (1/")
+    assert "Evaluados: 400" in msgs[-1][0] and "Evaluados" not in msgs[0][0]
+
+
+def test_detail_buttons_resolve_to_full_card(tmp_path):
+    tn = _notifier(tmp_path)
+    (text, markup), = tn.format_digest(_signals(4))
+    buttons = [b for row in markup["inline_keyboard"] for b in row]
+    assert len(buttons) == 4 and all(len(b["callback_data"].encode()) <= 64 for b in buttons)
+    # Otro proceso (p. ej. el webhook) resuelve el botón desde el fichero de detalles
+    other = _notifier(tmp_path)
+    card = other.detail_for(buttons[1]["callback_data"])
+    assert "FUTURES SIGNAL" in card and "COIN001USDT" in card
+    assert other.detail_for("otra|cosa") is None
+    assert other.send_detail(buttons[0]["callback_data"]).result().ok
+
+
+def test_sender_uses_digest_above_threshold(tmp_path, isolated_output):
+    tn = _notifier()
+    sender = Sender(tn, state_path=str(tmp_path / "state.sqlite3"), min_score=0, send_top_n=10,
+                    digest={"enabled": True, "min_signals": 5})
+    res = sender.send_batch(_signals(8))
+    assert res["sent_ok"] == 8 and len(tn.dispatcher.sent) == 1
+    # Por debajo del umbral: un mensaje por señal
+    small = Sender(_notifier(), state_path=str(tmp_path / "s2.sqlite3"), min_score=0,
+                   digest={"enabled": True, "min_signals": 5})
+    small.send_batch(_signals(3))
+    assert len(small.notifier.dispatcher.sent) == 3
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import requests
+
+from notifier.dispatcher import OutboundMessage, TelegramDispatcher, TokenBucket
+
+
+class _Resp:
+    def __init__(self, status, body=None):
+        self.status_code = status
+        self.ok = 200 <= status < 300
+        self._body = body or {}
+        self.headers = {}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    """Sustituto de requests.Session: responde según un guion por chat."""
+
+    def __init__(self, script=None, delay=0.0, gate=None):
+        self.script = script or {}
+        self.delay = delay
+        self.gate = gate        # threading.Event: retiene cada envío hasta que se active
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def post(self, url, json=None, timeout=None):
+        t = time.monotonic()
+        if self.gate is not None:
+            self.gate.wait(5)
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls.append((t, json["chat_id"], json["text"]))
+            queue = self.script.get(json["chat_id"], [])
+            step = queue.pop(0) if queue else 200
+        if isinstance(step, Exception):
+            raise step
+        if step == 429:
+            return _Resp(429, {"ok": False, "parameters": {"retry_after": 0.3}})
+        return _Resp(step, {"ok": step == 200, "result": {"message_id": len(self.calls)}})
+
+
+def _dispatcher(session, **kw):
+    kw = {"workers": 4, "chat_rate": 20, "chat_burst": 1, "backoff_base": 0.05, **kw}
+    return TelegramDispatcher("T", session=session, **kw)
+
+
+def test_token_bucket_reserves_future_slots():
+    now = [0.0]
+    b = TokenBucket(2.0, burst=2, clock=lambda: now[0])
+    assert [b.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    b.block(3.0)
+    assert b.reserve() >= 3.0
+
+
+def test_submit_does_not_block_and_respects_chat_rate():
+    gate = threading.Event()
+    session = FakeSession(gate=gate)
+    d = _dispatcher(session)
+    futs = [d.submit(OutboundMessage("A", f"m{i}")) for i in range(5)]
+    futs += [d.submit(OutboundMessage("B", f"m{i}")) for i in range(5)]
+    # Con la red retenida, submit() ya ha devuelto todos los futures sin resolver
+    assert not any(f.done() for f in futs)
+    gate.set()
+    assert d.flush(5) and all(f.result().ok for f in futs)
+
+    times_a = [t for t, chat, _ in session.calls if chat == "A"]
+    assert times_a[-1] - times_a[0] >= 4 / 20 - 0.02        # 20 msg/s por chat
+    assert d.close(1)
+
+
+def test_retry_after_and_permanent_errors():
+    session = FakeSession({"A": [429, 200], "B": [400], "C": [requests.ConnectionError("x"), 502, 200]})
+    d = _dispatcher(session)
+    t0 = time.perf_counter()
+    fa, fb, fc = (d.submit(OutboundMessage(c, "hola")) for c in "ABC")
+    ra, rb, rc = fa.result(5), fb.result(5), fc.result(5)
+    assert ra.ok and ra.attempts == 2
+    assert [t for t, chat, _ in session.calls if chat == "A"][1] - t0 >= 0.3
+    assert not rb.ok and rb.attempts == 1 and rb.status == 400
+    assert rc.ok and rc.attempts == 3
+    assert d.stats["throttled"] == 1 and d.stats["failed"] == 1
+    d.close(1)
@@ -0,0 +1,39 @@
+import requests
+
+from notifier import dispatcher
+from notifier.dispatcher import OutboundMessage, TelegramDispatcher
+from utils.fake_telegram import BotFaults, FakeTelegram
+
+
+def test_enviar_telegram_goes_to_configured_base(monkeypatch):
+    import utils.telegram as ut
+
+    monkeypatch.setattr(ut.config, "TELEGRAM_TOKEN", "T", raising=False)
+    monkeypatch.setattr(ut.config, "TELEGRAM_CHAT_ID", "42", raising=False)
+    with FakeTelegram() as fake, fake.override_api_base():
+        ut.enviar_telegram("hola *mundo*")
+        dispatcher.shutdown(5)
+        ut.responder_callback("cb1", "ok")
+    assert fake.texts("42") == ["hola *mundo*"]
+    assert fake.messages[0]["payload"]["parse_mode"] == "Markdown"
+    assert fake.callbacks[0]["payload"] == {"callback_query_id": "cb1", "text": "ok"}
+
+
+def test_validation_and_per_chat_429():
+    with FakeTelegram(BotFaults(chat_rate=5)) as fake:
+        url = f"{fake.url}/botT/sendMessage"
+        assert requests.post(url, json={"chat_id": 1, "text": "x" * 4097}, timeout=5).status_code == 400
+        d = TelegramDispatcher("T", api_base=fake.url, chat_rate=100, chat_burst=3, backoff_base=0.05)
+        results = [f.result(10) for f in [d.submit(OutboundMessage("7", f"m{i}")) for i in range(3)]]
+        d.close(5)
+    assert all(r.ok for r in results)
+    assert sorted(fake.texts("7")) == ["m0", "m1", "m2"]     # con reintentos no se garantiza el orden
+    assert d.stats["throttled"] >= 1 and fake.status[429] >= 1
+
+
+def test_injected_timeout_is_reported():
+    with FakeTelegram(BotFaults(p_timeout=1.0, hang_s=0.5)) as fake:
+        d = TelegramDispatcher("T", api_base=fake.url, timeout=0.1, max_attempts=1)
+        res = d.submit(OutboundMessage("1", "x")).result(10)
+        d.close(5)
+    assert not res.ok and res.status is None and "timed out" in res.error.lower()
@@ -0,0 +1,61 @@
+from logic.incremental import MISS, AnalysisCache, KlineFingerprint
+from tests.helpers import SYMBOLS
+from utils.fake_binance import FakeBinance
+
+
+def _kl(open_time, close, volume):
+    return [[open_time, close, close, close, close, volume, open_time + 1]]
+
+
+def test_cache_serves_only_unchanged_fingerprints():
+    cache = AnalysisCache(close_tol_pct=0.5, volume_tol_pct=10)
+    cache.begin_scan(("ctx",))
+    fp = KlineFingerprint.from_klines(_kl(1000, 100.0, 50.0))
+    assert cache.lookup("AAA", fp) is MISS
+    cache.store("AAA", fp, None)              # "sin señal" también se cachea
+
+    cache.begin_scan(("ctx",))
+    assert cache.lookup("AAA", KlineFingerprint.from_klines(_kl(1000, 100.3, 54.0))) is None
+    assert cache.lookup("AAA", KlineFingerprint.from_klines(_kl(1000, 101.0, 50.0))) is MISS   # cierre
+    assert cache.lookup("AAA", KlineFingerprint.from_klines(_kl(1000, 100.0, 60.0))) is MISS   # volumen
+    assert cache.lookup("AAA", KlineFingerprint.from_klines(_kl(2000, 100.0, 50.0))) is MISS   # vela nueva
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    cache.begin_scan(("otro sesgo",))         # contexto distinto → todo inválido
+    assert len(cache) == 0
+    cache.store("AAA", fp, "r")
+    cache.begin_scan(("otro sesgo",), full=True)
+    assert cache.lookup("AAA", fp) is MISS
+
+
+def test_tick_rescan_skips_unchanged_symbols(scan_env):
+    main, calls = scan_env.main, scan_env.calls
+    signal = scan_env.analyzer
+    # Sólo BBB da señal: es el único que entra en cooldown al encolarse
+    scan_env.analyzer = lambda sym, *a, **kw: signal(sym, *a, **kw) if sym == "BBBUSDT" else None
+
+    with FakeBinance(symbols=SYMBOLS) as fake, fake.override_bases():
+        main.run_once()
+        first, n_req = len(calls), len(fake.requests)
+        main.run_once(full_rescan=False)
+        assert len(calls) == first                      # nada cambió: todo desde caché
+        tick_req = len(fake.requests) - n_req
+        main.run_once(full_rescan=True)
+        cooling = set(main._open_outbox().last_sent())
+    assert sorted(calls[:first]) == sorted(SYMBOLS) and cooling == {"BBBUSDT"}
+    assert tick_req < n_req                             # sin velas semanales en el tick
+    # Cierre de vela: se reanaliza todo salvo lo que entró en cooldown
+    assert sorted(calls[first:]) == sorted(s for s in SYMBOLS if s not in cooling)
+
+
+def test_threshold_change_invalidates_cached_results(scan_env, monkeypatch):
+    main, calls = scan_env.main, scan_env.calls
+    scan_env.analyzer = lambda sym, *a, **kw: None     # sin señales: nada entra en cooldown
+
+    with FakeBinance(symbols=SYMBOLS) as fake, fake.override_bases():
+        main.run_once()
+        main.run_once(full_rescan=False)
+        assert len(calls) == len(SYMBOLS)
+        monkeypatch.setattr(main.config, "MIN_SCORE_ALERTA", 20, raising=False)
+        main.run_once(full_rescan=False)
+    assert sorted(calls[len(SYMBOLS):]) == sorted(SYMBOLS)
@@ -0,0 +1,45 @@
+from openpyxl import Workbook, load_workbook
+
+import notifier.notifier as notifier
+from notifier.journal import COLUMNS, Journal
+
+OP = {"Criptomoneda": "BTCUSDT", "Señal": "LONG", "Precio": 25000.5, "TP": 26000, "SL": 24500,
+      "RSI": 55, "MACD": 1.2, "Vitalidad": 1.3, "Grids": 3, "Score": 60}
+
+
+def test_guardar_operacion_appends_and_exports_same_layout(tmp_path, monkeypatch):
+    monkeypatch.setattr(notifier, "JOURNAL_FILE", str(tmp_path / "ops.csv"))
+    monkeypatch.setattr(notifier, "SIGNAL_FILE", str(tmp_path / "ops.xlsx"))
+    notifier.guardar_operacion(OP, "Aceptada")
+    notifier.guardar_operacion({**OP, "Criptomoneda": "ETH,USDT"}, "Rechazada")
+
+    journal = Journal(notifier.JOURNAL_FILE)
+    assert len(journal) == 2
+    assert journal.export_excel(notifier.SIGNAL_FILE) == 2
+    rows = list(load_workbook(notifier.SIGNAL_FILE).active.iter_rows(values_only=True))
+    assert list(rows[0]) == COLUMNS
+    assert rows[1][1:] == ("BTCUSDT", "LONG", 25000.5, 26000, 24500, 55, 1.2, 1.3, 3, 60, "Aceptada")
+    assert rows[2][1] == "ETH,USDT" and rows[2][-1] == "Rechazada"
+    assert not journal.is_export_stale(notifier.SIGNAL_FILE)
+
+
+def test_truncated_tail_is_ignored(tmp_path):
+    journal = Journal(str(tmp_path / "ops.csv"))
+    journal.append(["2024-01-01 00:00:00"] + ["x"] * (len(COLUMNS) - 1))
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write("2024-01-02 00:00:00,ETHUSDT,LO")      # escritura cortada por un fallo
+    assert len(journal) == 1
+    journal.append(["2024-01-03 00:00:00"] + ["y"] * (len(COLUMNS) - 1))
+    assert [r[0] for r in journal.rows()] == ["2024-01-01 00:00:00", "2024-01-03 00:00:00"]
+
+
+def test_existing_excel_is_migrated_once(tmp_path, monkeypatch):
+    xlsx = tmp_path / "ops.xlsx"
+    wb = Workbook()
+    wb.active.append(COLUMNS)
+    wb.active.append(["2023-12-31 10:00:00", "SOLUSDT", "SHORT", 100, 90, 105, 40, -0.5, 0.9, 6, 70, "Aceptada"])
+    wb.save(xlsx)
+    monkeypatch.setattr(notifier, "JOURNAL_FILE", str(tmp_path / "ops.csv"))
+    monkeypatch.setattr(notifier, "SIGNAL_FILE", str(xlsx))
+    notifier.guardar_operacion(OP, "Aceptada")
+    assert [r[1] for r in Journal(notifier.JOURNAL_FILE).rows()] == ["SOLUSDT", "BTCUSDT"]
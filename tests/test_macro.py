@@ -0,0 +1,64 @@
+import json
+import threading
+import time
+
+import pytest
+
+import utils.macro as macro
+
+
+@pytest.fixture
+def macro_env(tmp_path, monkeypatch):
+    path = tmp_path / "macro.json"
+    monkeypatch.setattr(macro, "_cache_path", lambda: str(path))
+    monkeypatch.setattr(macro, "_STATE", None)
+    monkeypatch.setattr(macro, "_REFRESH", None)
+    monkeypatch.setattr(macro, "_settings", lambda: ("^VIX", "DX=F", 1.0, 10.0))
+
+    def write(age_h, vix=15.0):
+        path.write_text(json.dumps({"vix_last": vix, "vix_pc5": 0.0, "dxy_last": 100.0,
+                                    "dxy_pc5": 0.0, "ts": time.time() - age_h * 3600}))
+
+    return path, write
+
+
+def test_fresh_cache_never_fetches(macro_env, monkeypatch):
+    _, write = macro_env
+    write(0.5)
+    monkeypatch.setattr(macro, "_fetch", lambda *a: pytest.fail("no debería refrescar"))
+    assert macro.get_macro_state().vix_last == 15.0
+
+
+def test_stale_cache_served_immediately_and_refreshed_in_background(macro_env, monkeypatch):
+    path, write = macro_env
+    write(3.0)
+    release = threading.Event()
+
+    def slow_fetch(*a):
+        release.wait(5)
+        return macro.MacroState(30.0, 1.0, 101.0, 0.5, ts=time.time())
+
+    monkeypatch.setattr(macro, "_fetch", slow_fetch)
+    t0 = time.perf_counter()
+    assert macro.get_macro_state().vix_last == 15.0
+    assert time.perf_counter() - t0 < 1.0
+    # Un segundo acceso mientras refresca no lanza otro hilo
+    assert macro.get_macro_state().vix_last == 15.0
+
+    release.set()
+    assert macro.wait_for_refresh(5)
+    assert macro.get_macro_state().vix_last == 30.0
+    assert json.loads(path.read_text())["vix_last"] == 30.0
+
+
+def test_max_staleness_forces_blocking_refresh(macro_env, monkeypatch):
+    _, write = macro_env
+    write(20.0)
+    monkeypatch.setattr(macro, "_fetch", lambda *a: macro.MacroState(25.0, 0.0, 99.0, 0.0, ts=time.time()))
+    assert macro.get_macro_state().vix_last == 25.0
+
+    # Si el refresco bloqueante no trae datos se conserva el estado anterior
+    monkeypatch.setattr(macro, "_STATE", None)
+    write(20.0)
+    monkeypatch.setattr(macro, "_fetch", lambda *a: macro.MacroState(None, None, None, None, ts=time.time()))
+    assert macro.get_macro_state().vix_last == 15.0
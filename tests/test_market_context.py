@@ -49,3 +49,34 @@ def test_obtener_contexto_mercado(monkeypatch):
     assert ctx.apto_long
     assert not ctx.apto_short
     assert ctx.mercado_favorable
+
+
+def _to_klines(df):
+    ts = (df.index.astype("int64") // 10**6).tolist()
+    return [[t, o, h, l, c, v, t + 86_399_999]
+            for t, o, h, l, c, v in zip(ts, df["Open"], df["High"], df["Low"], df["Close"], df["Volume"])]
+
+
+def test_contexto_con_klines_binance_solo_usa_yfinance_para_macro(monkeypatch):
+    pedidos = []
+
+    def fake_descargar(ticker: str, interval: str, period: str = "400d"):
+        pedidos.append(ticker)
+        if ticker == "UUP":
+            return _make_df(up=False)
+        if ticker == "^VIX":
+            return _make_df(up=False, rows=120)
+        return pd.DataFrame()
+
+    monkeypatch.setattr(mc, "_descargar_seguro", fake_descargar)
+    monkeypatch.setattr(mc, "registrar_contexto_csv", lambda *a, **k: "")
+
+    ctx = mc.obtener_contexto_mercado(
+        btc_d_klines=_to_klines(_make_df(up=True)),
+        btc_w_klines=_to_klines(_make_df(up=True)),
+        eth_d_klines=_to_klines(_make_df(up=True)),
+        eth_w_klines=_to_klines(_make_df(up=True)),
+    )
+    assert sorted(pedidos) == ["UUP", "^VIX"]
+    assert ctx.btc_alcista and ctx.eth_alcista
+    assert ctx.apto_long
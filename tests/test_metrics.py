@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from tests.helpers import SYMBOLS
+from utils import metrics
+from utils.fake_binance import FakeBinance
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.configure(True)
+    metrics.reset()
+    yield metrics
+    metrics.configure(False)
+    metrics.reset()
+
+
+def test_disabled_timer_is_shared_noop():
+    metrics.configure(False)
+    metrics.reset()
+    with metrics.timer("a") as t1, metrics.timer("b") as t2:
+        metrics.incr("c")
+    assert t1 is t2
+    assert metrics.summary()["stages"] == {} and metrics.summary()["counters"] == {}
+    assert metrics.flush("unused.json", "unused.prom") is None
+
+
+def test_summary_quantiles_and_counters(enabled_metrics):
+    for ms in range(1, 101):
+        metrics.observe("stage", ms / 1000)
+    metrics.incr("http.cache_hit", 3)
+    with metrics.timer("timed"):
+        pass
+    data = metrics.summary()
+    st = data["stages"]["stage"]
+    assert (st["count"], st["p50_s"], st["p95_s"], st["p99_s"], st["max_s"]) == (100, 0.05, 0.095, 0.099, 0.1)
+    assert data["stages"]["timed"]["count"] == 1
+    assert data["counters"] == {"http.cache_hit": 3}
+
+
+def test_flush_writes_json_and_prometheus_and_resets(enabled_metrics, tmp_path):
+    metrics.observe("http.request", 0.2)
+    metrics.incr("http.status_200")
+    json_path, prom_path = tmp_path / "m.json", tmp_path / "prom" / "scan.prom"
+    metrics.flush(str(json_path), str(prom_path))
+
+    assert json.loads(json_path.read_text())["stages"]["http.request"]["count"] == 1
+    prom = prom_path.read_text()
+    assert 'binance_futures_scan_stage_seconds{stage="http.request",quantile="0.5"} 0.2' in prom
+    assert 'binance_futures_scan_events{name="http.status_200"} 1' in prom
+    assert metrics.summary()["stages"] == {}
+
+
+def test_run_once_records_pipeline_stages(enabled_metrics, scan_env, monkeypatch):
+    main = scan_env.main
+    monkeypatch.setattr(main, "_init_runtime", lambda: None)   # no reconfigura desde settings
+    with FakeBinance(symbols=SYMBOLS) as fake, fake.override_bases():
+        main.run_once()
+
+    stages = metrics.summary()["stages"]
+    assert stages["scan.total"]["count"] == 1
+    assert stages["scan.analizar_simbolo"]["count"] == len(SYMBOLS)
+    assert {"scan.prepare", "scan.analyze", "scan.finalize", "http.request", "outbox.enqueue"} <= set(stages)
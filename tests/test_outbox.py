@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import Future
+
+from notifier.dispatcher import DeliveryResult
+from notifier.outbox import Outbox, OutboxItem, OutboxWorker
+
+
+def _item(key, symbol="BTCUSDT"):
+    return OutboxItem(key=key, symbol=symbol, chat_id="1", text=f"señal {key}")
+
+
+class FakeDispatcher:
+    """Resuelve cada submit() con el siguiente DeliveryResult del guion."""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.sent = []
+
+    def submit(self, msg, max_attempts=None):
+        self.sent.append(msg)
+        fut = Future()
+        res = self.results.pop(0) if self.results else DeliveryResult(True, 1, 200, message_id=len(self.sent))
+        fut.set_result(res)
+        return fut
+
+
+def test_enqueue_is_atomic_with_cooldown_and_idempotent(tmp_path):
+    ob = Outbox(str(tmp_path / "o.sqlite3"))
+    t0 = time.time()
+    new = ob.enqueue([_item("a"), _item("b", "ETHUSDT")], "2024-01-01", now=t0)
+    assert new == ["a", "b"]
+    assert ob.last_sent() == {"BTCUSDT": t0, "ETHUSDT": t0}
+    assert ob.sent_today("2024-01-01") == 2
+    # La misma señal no se duplica ni consume cupo otra vez
+    assert ob.enqueue([_item("a")], "2024-01-01", now=t0 + 1) == []
+    assert ob.sent_today("2024-01-01") == 2 and ob.last_sent()["BTCUSDT"] == t0
+    # El estado sobrevive al proceso: otra conexión ve lo mismo
+    ob.close()
+    again = Outbox(str(tmp_path / "o.sqlite3"))
+    assert again.stats()["pending"] == 2
+
+
+def test_claim_leases_rows(tmp_path):
+    ob = Outbox(str(tmp_path / "o.sqlite3"), lease_s=60)
+    ob.enqueue([_item("a"), _item("b", "ETHUSDT")], "d", now=0.0)
+    assert [i.key for i in ob.claim(now=10.0)] == ["a", "b"]
+    assert ob.claim(now=20.0) == []                   # en lease
+    assert len(ob.claim(now=80.0)) == 2               # lease expirado (p. ej. proceso caído)
+    assert ob.get("a")["attempts"] == 2
+
+
+def test_worker_marks_sent_retry_and_failed(tmp_path):
+    ob = Outbox(str(tmp_path / "o.sqlite3"))
+    ob.enqueue([_item("ok"), _item("net", "ETHUSDT"), _item("bad", "XRPUSDT")], "d")
+    disp = FakeDispatcher([
+        DeliveryResult(True, 1, 200, message_id=7),
+        DeliveryResult(False, 5, 502, error="HTTP 502"),
+        DeliveryResult(False, 1, 400, error="can't parse entities"),
+    ])
+    stats = OutboxWorker(ob, disp, backoff_base=30).drain(timeout=1)
+    assert stats == {"pending": 1, "sent": 1, "failed": 1}
+    assert ob.get("ok")["message_id"] == 7
+    assert ob.get("net")["next_attempt_at"] > ob.get("net")["created_at"]
+    assert ob.get("bad")["last_error"] == "can't parse entities"
+    # Nada vencido todavía: el siguiente drenado no reenvía
+    assert OutboxWorker(ob, disp).drain(timeout=1)["pending"] == 1 and len(disp.sent) == 3
+
+
+def test_in_flight_rows_are_not_reclaimed_after_lease(tmp_path):
+    ob = Outbox(str(tmp_path / "o.sqlite3"), lease_s=0.01)
+    ob.enqueue([_item("a")], "d")
+    pending = []
+
+    class SlowDispatcher(FakeDispatcher):
+        # El despachador sigue reintentando en memoria: el futuro no se resuelve
+        def submit(self, msg, max_attempts=None):
+            self.sent.append(msg)
+            pending.append(Future())
+            return pending[-1]
+
+    disp = SlowDispatcher([])
+    OutboxWorker(ob, disp).submit_due()
+    time.sleep(0.02)                                  # lease expirado
+    # Otro ciclo del mismo proceso (p. ej. el siguiente despertar del daemon)
+    assert OutboxWorker(ob, disp).submit_due() == [] and len(disp.sent) == 1
+    pending[0].set_result(DeliveryResult(True, 1, 200, message_id=1))
+    assert ob.get("a")["status"] == "sent" and ob.in_flight == set()
@@ -0,0 +1,31 @@
+from tests.helpers import SCORES, SYMBOLS
+from utils.fake_binance import FakeBinance
+
+
+def test_prioritize_by_prior_score_then_volume():
+    import main
+
+    prior = {"CCC": 80.0, "DDD": 80.0}
+    volumes = {"AAA": 5e6, "BBB": 9e8, "DDD": 1e6, "CCC": 2e6}
+    assert main._prioritize(["AAA", "BBB", "CCC", "DDD", "EEE"], prior, volumes) == ["CCC", "DDD", "BBB", "AAA", "EEE"]
+
+
+def test_full_scan_records_coverage_and_priorities(scan_env, monkeypatch):
+    main = scan_env.main
+    monkeypatch.setattr(main.config, "SCAN_DEADLINE_S", 0, raising=False)
+    with FakeBinance(symbols=SYMBOLS) as fake, fake.override_bases():
+        main.run_once()
+    state = main._open_outbox().state
+    assert state.get("scan", "coverage")["coverage"] == 1.0
+    assert state.items(main.PRIORITY_NS) == SCORES
+    assert sorted(scan_env.calls) == sorted(SYMBOLS)
+
+
+def test_deadline_finalizes_with_partial_coverage(scan_env, monkeypatch):
+    main = scan_env.main
+    monkeypatch.setattr(main.config, "SCAN_DEADLINE_S", 1e-6, raising=False)
+    with FakeBinance(symbols=SYMBOLS) as fake, fake.override_bases():
+        main.run_once()
+    cov = main._open_outbox().state.get("scan", "coverage")
+    assert cov["deadline_hit"] and cov["visited"] == 0 and cov["total"] == len(SYMBOLS)
+    assert scan_env.calls == []
@@ -0,0 +1,44 @@
+import threading
+from datetime import datetime, timezone
+
+from utils.scheduler import Scheduler, next_wakeup
+
+
+def _ts(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_next_wakeup_prefers_candle_closes_over_ticks():
+    # Domingo 23:59:50 → cierre semanal (lunes 00:00 + delay)
+    w = next_wakeup(_ts(2024, 6, 2, 23, 59, 50), tick_minutes=60, close_delay_s=30)
+    assert (w.at, w.kind, w.is_close) == (_ts(2024, 6, 3, 0, 0, 30), "weekly", True)
+    # Martes a media mañana → siguiente hora en punto + delay
+    w = next_wakeup(_ts(2024, 6, 4, 10, 15), tick_minutes=60, close_delay_s=30)
+    assert (w.at, w.kind) == (_ts(2024, 6, 4, 11, 0, 30), "tick")
+    # Martes 23:30 con ticks horarios: el tick de medianoche es el cierre diario
+    w = next_wakeup(_ts(2024, 6, 4, 23, 30), tick_minutes=60, close_delay_s=30)
+    assert (w.at, w.kind) == (_ts(2024, 6, 5, 0, 0, 30), "daily")
+    # Justo en el instante del cierre: el siguiente, nunca el mismo
+    w = next_wakeup(_ts(2024, 6, 5, 0, 0, 30), tick_minutes=0, close_delay_s=30)
+    assert (w.at, w.kind) == (_ts(2024, 6, 6, 0, 0, 30), "daily")
+
+
+def test_stop_interrupts_sleep_and_lets_current_cycle_finish():
+    sched = Scheduler(tick_minutes=0, close_delay_s=30)
+    kinds, done = [], []
+
+    def job(w):
+        kinds.append(w.kind)
+        sched.stop()                 # como un SIGTERM a mitad de escaneo
+        done.append(True)            # el ciclo en curso termina igualmente
+
+    sched.run(job, run_now=True)
+    assert kinds == ["startup"] and done == [True]
+
+    # Durmiendo hasta el próximo cierre: stop() despierta al instante
+    sched2 = Scheduler(tick_minutes=0, close_delay_s=30)
+    t = threading.Thread(target=sched2.run, args=(lambda w: None,), kwargs={"run_now": False})
+    t.start()
+    sched2.stop()
+    t.join(5)
+    assert not t.is_alive() and sched2.runs == 0
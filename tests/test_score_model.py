@@ -0,0 +1,73 @@
+import copy
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from logic.score_model import DEFAULT_MODELS, ScoringModelError, _specs, compile_model, get_model
+from logic.scorer import calcular_score
+
+
+def test_transforms_and_refs():
+    spec = {
+        "version": "t1",
+        "refs": {"CAP": 0.1},
+        "factors": {
+            "band": {"feature": "x", "transform": "band", "points": [0, 1, 2, 3], "weight": 1},
+            "steps": {"feature": "x", "transform": "steps", "thresholds": [[1, 0.5], [2, 1.0]], "weight": 1},
+            "scaled": {"feature": "x", "transform": "piecewise", "scale": "CAP",
+                       "points": [[0, 0], [20, 1]], "weight": 1},
+            "side": {"feature": "x", "transform": "flag", "weight": 1,
+                     "by_side": {"LONG": {}, "SHORT": {"negate": True}}},
+        },
+    }
+    model = compile_model("t", spec, SimpleNamespace(CAP=0.2))
+    x = np.array([0.0, 0.5, 1.5, 2.5, 3.0, np.nan])
+    comp = model.components({"x": x}, side=np.array([1, 1, -1, -1, 0, 1]))
+    assert np.allclose(comp["band"], [0, 0.5, 1, 0.5, 0, 0])
+    assert np.allclose(comp["steps"], [0, 0, 0.5, 1, 1, 0])
+    assert np.allclose(comp["scaled"], [0, 0.125, 0.375, 0.625, 0.75, 0])
+    assert np.allclose(comp["side"], [0, 1, 0, 0, 0, 0])
+    assert model.tag == "t@t1"
+    # Las referencias se pueden sobreescribir al evaluar (p. ej. desde el sweep)
+    assert model.components({"x": np.array([2.0])}, np.array([1]), refs={"CAP": 0.0})["scaled"][0] == 0.0
+
+
+def test_invalid_spec_is_rejected():
+    with pytest.raises(ScoringModelError, match="desconocida"):
+        compile_model("bad", {"factors": {"a": {"feature": "x", "transform": "nope", "weight": 1}}})
+    with pytest.raises(ScoringModelError, match="inválida"):
+        compile_model("bad", {"factors": {"a": {"feature": "x", "transform": "flag"}}})
+
+
+def test_weights_come_from_the_spec():
+    spec = copy.deepcopy(DEFAULT_MODELS["signal_v2"])
+    spec["factors"]["rr"]["weight"] = 36
+    model = compile_model("signal_v2", spec)
+    feats = {"rr": 1.5, "adx": 22.0, "atr_pct": 0.05, "vol_usdt": 5e7, "vol_3d_up": True,
+             "trend": 1, "consolidando": False, "regime_align": True}
+    refs = {"MAX_ATR_PCT": 0.1, "VOLUMEN_MINIMO_USDT": 25e6}
+    base, _ = get_model("signal_v2").evaluate_one(feats, "LONG", refs=refs)
+    score, factors = model.evaluate_one(feats, "LONG", refs=refs)
+    assert factors["risk_reward"] == 18.0 and score == pytest.approx(base + 9.0)
+
+
+def test_calcular_score_uses_v1_model():
+    tec = SimpleNamespace(precio=100.0, rsi_1d=50.0, rsi_1w=40.0, ema20=105.0, ema50=102.0, ema200=95.0,
+                          volumen_actual=110.0, volumen_promedio=100.0, atr=15.0, tipo="LONG",
+                          tp=130.0, sl=90.0, entry=100.0)
+    total, factors = calcular_score(tec)
+    # trend 30 | RSI 1d 12·1 + 1w 8·0.5 | ATR% 15% en banda ideal | vitalidad 1.1 → 0.85 | R 3 → 1
+    assert factors == {"trend": 30.0, "momentum": 16.0, "volatility": 15.0, "volume": 8.5, "risk_reward": 25.0}
+    assert total == 94.5
+
+
+def test_settings_override_merges_per_factor():
+    cfg = SimpleNamespace(SCORING_MODELS={"signal_v2": {"factors": {"rr": {"points": [[0, 0], [6, 1]]}}}})
+    spec = _specs(cfg)["signal_v2"]
+    assert spec["factors"]["rr"] == {**DEFAULT_MODELS["signal_v2"]["factors"]["rr"], "points": [[0, 0], [6, 1]]}
+    assert spec["factors"]["adx"] == DEFAULT_MODELS["signal_v2"]["factors"]["adx"]
+    assert spec["refs"] == DEFAULT_MODELS["signal_v2"]["refs"] and spec["clip"] == [0, 100]
+    feats = {k: np.zeros(1) for k in ("adx", "atr_pct", "vol_usdt", "vol_3d_up", "trend", "consolidando", "regime_align")}
+    comp = compile_model("signal_v2", spec).components({**feats, "rr": np.array([3.0])})
+    assert comp["rr"][0] == pytest.approx(0.5)
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from logic.analyzer import _score_signal_v2
+from logic.score_model import get_model
+from logic.selector import TopKSelector
+
+
+def test_bounded_heap_keeps_best_eligible_with_stable_ties():
+    sel = TopKSelector(3, eligible=lambda s: s != "COOL")
+    for sym, score in [("A", 60), ("B", 80), ("COOL", 99), ("C", 70), ("D", 70), ("E", 65), ("F", 90)]:
+        sel.offer(sym, score, sym)
+    # D empata con C pero llegó después; E no supera el umbral
+    assert sel.items() == ["F", "B", "C"]
+    assert sel.threshold == 70 and sel.ineligible == 1 and sel.offered == 7
+
+    assert sel.prune("COOL", 100)
+    assert sel.prune("G", 70) and not sel.prune("G", 70.5)
+    assert sel.pruned == 1
+
+
+def test_zero_capacity_prunes_everything():
+    sel = TopKSelector(0)
+    assert sel.prune("A", 100) and not sel.offer("A", 100, "A") and sel.items() == []
+
+
+def test_upper_bound_dominates_v2_score():
+    model = get_model("signal_v2")
+    cfg = SimpleNamespace(**{k: v for k, v in model.refs.items()})
+    rng = np.random.default_rng(5)
+    for i in range(500):
+        vol = float(rng.uniform(0, 2 * model.refs["VOLUMEN_MINIMO_USDT"] * 1.5))
+        entry = float(rng.uniform(1, 10))
+        feat = {"bias": "LONG", "entry": entry, "sl": entry * 0.95, "sp": entry * float(rng.uniform(1, 1.3)),
+                "adx": float(rng.uniform(0, 50)), "atr_pct": float(rng.uniform(0, 0.2)), "vol_usdt_24h": vol,
+                "vol_3d_up": bool(i % 2), "trend": ["Alcista", "Lateral"][i % 2],
+                "consolidando": bool(i % 3 == 0), "regime_align": bool(i % 5)}
+        score = _score_signal_v2(feat, cfg)[0]
+        assert score <= model.upper_bound({"vol_usdt": vol}) + 1e-9
+    assert model.upper_bound({"vol_usdt": 0.0}) == model.upper_bound() - model.weights["volume"]
@@ -0,0 +1,61 @@
+import pytest
+
+from tests.helpers import SYMBOLS
+from utils.fake_binance import FakeBinance
+from utils.shards import load_shards, parse_spec, partition, read_open_symbols, shard_of, write_shard
+
+
+def test_partition_is_deterministic_and_complete():
+    syms = [f"S{i}USDT" for i in range(200)]
+    parts = [partition(syms, i, 4) for i in range(4)]
+    assert sorted(s for p in parts for s in p) == sorted(syms)
+    assert all(parts) and shard_of("BTCUSDT", 4) == shard_of("BTCUSDT", 4)
+    assert parse_spec("3/4") == (3, 4)
+    with pytest.raises(ValueError):
+        parse_spec("4/4")
+
+
+def test_merge_waits_and_reports_missing(tmp_path):
+    write_shard(str(tmp_path), "r1", 0, 2, {"ok": True, "symbols": 1})
+    shards, missing = load_shards(str(tmp_path), "r1", 2, wait_s=0.2, poll_s=0.05)
+    assert [sh["index"] for sh in shards] == [0] and missing == [1]
+    assert not list(tmp_path.glob("r1/*.tmp"))
+
+
+def _texts(path):
+    from notifier.outbox import Outbox
+
+    return sorted(it.text for it in Outbox(path).claim(limit=1000))
+
+
+def test_sharded_scan_matches_single_process(scan_env, tmp_path, monkeypatch):
+    # Analizador determinista (scan_env): lo que se prueba es el reparto y la fusión
+    main = scan_env.main
+
+    def _isolate(name):
+        monkeypatch.setattr(main, "_ANALYSIS_CACHE", None)
+        monkeypatch.setattr(main, "OUTBOX_PATH", str(tmp_path / f"{name}.sqlite3"))
+        monkeypatch.setattr("logic.tracker.TRACKER_PATH", str(tmp_path / f"{name}-tracker.json"))
+        return main.OUTBOX_PATH
+
+    shard_dir = str(tmp_path / "shards")
+    with FakeBinance(symbols=SYMBOLS) as fake, fake.override_bases():
+        single = _isolate("single")
+        main.run_once()
+        sharded = _isolate("sharded")
+        for i in range(3):
+            main.run_shard(i, 3, scan_id="t", shard_dir=shard_dir)
+        main.run_merge(3, scan_id="t", shard_dir=shard_dir, wait_s=0)
+
+    assert _texts(sharded) == _texts(single) != []
+    assert not (tmp_path / "shards" / "t").exists()       # fusión completa: shards purgados
+
+    # Siguiente scan con workers en otro host (tracker local vacío): las klines
+    # de lo abierto salen del conjunto que publicó el coordinador
+    assert read_open_symbols(shard_dir) == set(SYMBOLS)
+    _isolate("worker-host")
+    with FakeBinance(symbols=SYMBOLS) as fake, fake.override_bases():
+        for i in range(3):
+            main.run_shard(i, 3, scan_id="t2", shard_dir=shard_dir)
+    shards, _ = load_shards(shard_dir, "t2", 3)
+    assert {sym for sh in shards for sym in sh["tracked"]} == set(SYMBOLS)
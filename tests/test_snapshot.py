@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+import utils.data_loader as dl
+import utils.macro as macro
+from utils import snapshot
+
+KLINES = [[1, "1", "2", "0.5", "1.5", "10", 2]]
+
+
+class _Resp:
+    status_code = 200
+    headers: dict = {}
+    text = ""
+
+    def json(self):
+        return KLINES
+
+
+def test_record_then_replay_without_network(tmp_path, monkeypatch):
+    path = str(tmp_path / "scan.pkl.gz")
+    calls = []
+    monkeypatch.setattr(dl.SESSION, "get", lambda url, **kw: calls.append(url) or _Resp())
+
+    class _Ticker:
+        def __init__(self, symbol):
+            pass
+
+        def history(self, **kw):
+            return pd.DataFrame({"Close": [float(i) for i in range(1, 11)]})
+
+    monkeypatch.setattr("yfinance.Ticker", _Ticker)
+
+    with snapshot.record(path):
+        assert dl.get_klines("BTCUSDT", "1d", limit=5) == KLINES
+        recorded = macro._last_and_pc5("^VIX")
+    assert len(calls) == 1
+
+    def _offline(*a, **kw):
+        raise AssertionError("red usada durante replay")
+
+    monkeypatch.setattr(dl.SESSION, "get", _offline)
+    monkeypatch.setattr("yfinance.Ticker", _offline)
+    with snapshot.replay(path) as snap:
+        assert dl.get_klines("BTCUSDT", "1d", limit=5) == KLINES
+        assert macro._last_and_pc5("^VIX") == recorded
+        # Petición no grabada: get_klines degrada a [] y se anota el fallo
+        assert dl.get_klines("ETHUSDT", "1d", limit=5) == []
+    assert len(snap.misses) == 1
+    assert snapshot.active() is None
+
+
+def test_replay_reraises_recorded_failures(tmp_path):
+    path = str(tmp_path / "s.pkl.gz")
+
+    def _boom():
+        raise ValueError("caído")
+
+    with snapshot.record(path):
+        with pytest.raises(ValueError):
+            snapshot.fetch_json(("x",), _boom)
+    with snapshot.replay(path):
+        with pytest.raises(snapshot.SnapshotError, match="caído"):
+            snapshot.fetch_json(("x",), _boom)
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("pandas", "numpy", "ta", "yfinance", "scipy", "openpyxl", "binance", "flask")
+# Presupuesto del import en frío de main (medido ~0.2 s; antes ~1.1 s)
+BUDGET_S = float(os.getenv("STARTUP_BUDGET_S", "0.6"))
+
+
+def _importtime(module, cwd):
+    """{módulo: tiempo acumulado (s)} según `python -X importtime`."""
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    times = {}
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        times[parts[2].strip()] = int(parts[1]) / 1e6
+    return times
+
+
+def test_main_cold_import_is_light_and_side_effect_free(tmp_path):
+    times = _importtime("main", tmp_path)
+    assert not [m for m in HEAVY if m in times], sorted(m for m in times if m.split(".")[0] in HEAVY)
+    assert times["main"] < BUDGET_S, f"import main: {times['main']:.3f}s > {BUDGET_S}s"
+    # Ni logs ni cachés: los directorios se crean al primer uso
+    assert not (tmp_path / "output").exists()
@@ -0,0 +1,49 @@
+import json
+import time
+
+import pytest
+
+from notifier.outbox import Outbox
+from utils.state_store import StateStore
+
+
+def test_ttl_counters_and_purge(tmp_path):
+    st = StateStore(str(tmp_path / "s.sqlite3"))
+    st.set("ns", "a", {"x": 1}, ttl=10, now=100.0)
+    st.set("ns", "b", "forever")
+    assert st.get("ns", "a", now=105.0) == {"x": 1}
+    assert st.get("ns", "a", "gone", now=111.0) == "gone"
+    assert st.incr("c", "day", 2, ttl=50, now=100.0) == 2
+    assert st.incr("c", "day", 3, now=120.0) == 5          # el TTL se mantiene desde la creación
+    assert st.get("c", "day", now=151.0) is None
+    assert st.purge(now=200.0) == 2 and st.items("ns") == {"b": "forever"}
+
+
+def test_nested_transaction_rolls_back_as_a_unit(tmp_path):
+    st = StateStore(str(tmp_path / "s.sqlite3"))
+    with pytest.raises(RuntimeError):
+        with st.transaction():
+            st.set("ns", "a", 1)
+            st.incr("ns", "n")
+            raise RuntimeError("fallo a mitad")
+    assert st.items("ns") == {}
+
+
+def test_json_state_is_migrated_once(tmp_path, monkeypatch):
+    import main
+
+    now = time.time()
+    paths = {"SYMBOL_LOCK_PATH": {"OLDUSDT": now - 90_000, "NEWUSDT": now - 600},
+             "DAY_COUNT_PATH": {"2020-01-01": 9, time.strftime("%Y-%m-%d", time.gmtime(now)): 4},
+             "LAST_TOP_PATH": {"hash": "h", "ts": "2020-01-01T00:00:00+00:00"}}
+    for name, data in paths.items():
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps(data))
+        monkeypatch.setattr(main, name, str(path))
+    ob = Outbox(str(tmp_path / "state.sqlite3"), cooldown_s=86_400)
+    assert main._migrate_json_state(ob, now)
+    assert ob.last_sent() == {"NEWUSDT": now - 600}      # el caducado no se importa
+    assert ob.sent_today(time.strftime("%Y-%m-%d", time.gmtime(now))) == 4
+    assert ob.state.items("day_count") == {time.strftime("%Y-%m-%d", time.gmtime(now)): 4}
+    assert ob.state.get("scan", "last_top") is None
+    assert not main._migrate_json_state(ob, now)
@@ -0,0 +1,62 @@
+import pytest
+
+import logic.backtest as bt
+import logic.sweep as sw
+from tests.helpers import synthetic_daily, synthetic_weekly
+
+
+@pytest.fixture
+def klines_dir(tmp_path):
+    for i, sym in enumerate(("AAAUSDT", "BBBUSDT", "CCCUSDT")):
+        daily = synthetic_daily(seed=i + 10)
+        bt.save_klines(str(tmp_path), sym, "1d", daily)
+        bt.save_klines(str(tmp_path), sym, "1w", synthetic_weekly(daily))
+    return str(tmp_path)
+
+
+def test_sweep_default_combo_matches_backtest(klines_dir, relaxed_cfg):
+    _, stats = bt.run_backtest(klines_dir, horizon=30)
+    table = sw.run_sweep({"min_score": [0]}, klines_dir, horizon=30, workers=1)
+    row = table.iloc[0]
+    assert row["signals"] == stats["signals"]
+    assert row["total_r"] == pytest.approx(stats["total_r"])
+    assert row["max_drawdown_r"] == pytest.approx(stats["max_drawdown_r"])
+
+
+def test_sweep_process_pool_matches_in_process(klines_dir, relaxed_cfg):
+    grid = {"tp_r_mult": [1.5, 3.0], "atr_sl_mult": [1.5, 2.5], "w_rr": [18.0, 30.0]}
+    panel, used = sw.build_panel(klines_dir, horizon=30)
+    assert used == ["AAAUSDT", "BBBUSDT", "CCCUSDT"]
+
+    serial = sw.run_sweep(grid, horizon=30, workers=1, panel=panel)
+    parallel = sw.run_sweep(grid, horizon=30, workers=2, panel=panel)
+    assert len(parallel) == 8
+    assert list(parallel["total_r"]) == sorted(parallel["total_r"], reverse=True)
+    assert parallel.to_dict("records") == serial.to_dict("records")
+
+
+def test_expand_grid_rejects_unknown_params():
+    with pytest.raises(ValueError):
+        sw.expand_grid({"lookback": [10]})
+
+
+def test_sweep_follows_edited_model(klines_dir, relaxed_cfg, monkeypatch):
+    import logic.analyzer as an
+    from logic.score_model import DEFAULT_MODELS, compile_model, merge_spec
+
+    # Transformación del R:R cambiada y un factor nuevo: el sweep no puede asumir la spec por defecto
+    spec = merge_spec(DEFAULT_MODELS["signal_v2"], {"factors": {
+        "rr": {"points": [[0, 0], [6, 1]]},
+        "adx_extra": {"feature": "adx", "transform": "piecewise", "points": [[20, 0], [40, 1]],
+                      "weight": 5, "block": "trend"},
+    }})
+    monkeypatch.setattr(an, "_V2_MODEL", compile_model("signal_v2", spec))
+    assert "adx_extra" in sw.fixed_components() and "rr" not in sw.fixed_components()
+
+    panel, _ = sw.build_panel(klines_dir, horizon=30)
+    for min_score in (0, 40, 55):
+        monkeypatch.setattr(bt.config, "MIN_SCORE_ALERTA", min_score, raising=False)
+        _, stats = bt.run_backtest(klines_dir, horizon=30)
+        row = sw.run_sweep({"min_score": [min_score]}, horizon=30, workers=1, panel=panel).iloc[0]
+        assert row["signals"] == stats["signals"]
+        assert row["total_r"] == pytest.approx(stats["total_r"])
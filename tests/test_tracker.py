@@ -0,0 +1,50 @@
+import pytest
+
+from logic.tracker import SignalTracker, score_bucket
+
+DAY = 86_400_000
+T0 = 1_700_006_400_000  # 00:00 UTC
+
+
+def _k(i, high, low, close):
+    return [T0 + i * DAY, close, high, low, close, 1.0, T0 + (i + 1) * DAY - 1]
+
+
+def test_advance_uses_only_new_candles_and_records_r(tmp_path):
+    path = str(tmp_path / "tracker.json")
+    tr = SignalTracker(path)
+    tr.add("AAAUSDT", "LONG", 72, entry=100, sl=90, tp=130, sig_id="a", ts=(T0 + DAY // 2) / 1000)
+
+    klines = [_k(0, 101, 99, 100), _k(1, 105, 95, 104), _k(2, 110, 100, 108)]
+    # La vela 2 está en formación: no cuenta como vela cerrada
+    assert tr.update("AAAUSDT", klines, now_ms=T0 + 2 * DAY + 1000) == []
+    sig = tr.open["a"]
+    assert sig.bars == 1 and sig.last_bar == T0 + DAY
+    tr.save()
+
+    # Nuevo proceso: sólo se miran velas posteriores a la última procesada
+    tr = SignalTracker(path)
+    klines += [_k(3, 131, 104, 125)]
+    closed = tr.update("AAAUSDT", klines, now_ms=T0 + 3 * DAY + 1000)
+    assert [s.outcome for s in closed] == ["TP"]
+    assert closed[0].r == pytest.approx(3.0)
+    assert not tr.has_open("AAAUSDT")
+
+
+def test_sl_wins_ties_expiry_and_stats(tmp_path):
+    tr = SignalTracker(str(tmp_path / "t.json"))
+    tr.add("AAAUSDT", "SHORT", 68, entry=100, sl=110, tp=80, sig_id="s", ts=T0 / 1000)
+    tr.add("BBBUSDT", "LONG", 81, entry=100, sl=95, tp=120, sig_id="l", ts=T0 / 1000, horizon=2)
+
+    tr.update("AAAUSDT", [_k(0, 100, 100, 100), _k(1, 111, 79, 100)], now_ms=T0 + 5 * DAY)
+    tr.update("BBBUSDT", [_k(0, 100, 100, 100), _k(1, 101, 99, 100), _k(2, 103, 99, 102)], now_ms=T0 + 5 * DAY)
+
+    out = {s.id: s for s in tr.closed}
+    assert out["s"].outcome == "SL" and out["s"].r == pytest.approx(-1.0)
+    assert out["l"].outcome == "EXPIRED" and out["l"].r == pytest.approx(0.4)
+
+    st = tr.stats()
+    assert st["closed"] == 2 and st["open"] == 0
+    assert st["by_bias"]["SHORT"]["sl"] == 1
+    assert set(st["by_score"]) == {"60-70", "80-90"}
+    assert score_bucket(66.5) == "60-70"
@@ -0,0 +1,53 @@
+from concurrent.futures import wait
+
+import notifier.notifier as notifier
+from notifier.journal import Journal
+from notifier.webhook import WEBHOOK_PATH, CallbackHandler, PendingOps, create_app
+from utils.state_store import StateStore
+
+OP = {"Criptomoneda": "SOLUSDT", "Señal": "LONG", "Precio": 140.0, "TP": 150.0, "SL": 135.0, "Score": 80}
+
+
+def _update(update_id, data, message_id=10):
+    return {"update_id": update_id,
+            "callback_query": {"id": f"cb{update_id}", "data": data, "message": {"message_id": message_id}}}
+
+
+def _setup(tmp_path, monkeypatch):
+    sent = []
+    monkeypatch.setattr(notifier, "JOURNAL_FILE", str(tmp_path / "ops.csv"))
+    monkeypatch.setattr(notifier, "SIGNAL_FILE", str(tmp_path / "ops.xlsx"))
+    monkeypatch.setattr(notifier, "enviar_telegram", lambda texto, buttons=None: sent.append(texto))
+    pending = PendingOps(StateStore(str(tmp_path / "state.sqlite3")))
+    handler = CallbackHandler(pending, workers=2)
+    return create_app(handler, secret="s3"), handler, pending, sent
+
+
+def test_callback_is_acked_inline_and_journaled_in_background(tmp_path, monkeypatch):
+    app, handler, pending, sent = _setup(tmp_path, monkeypatch)
+    pending.add("SOLUSDT", OP, message_id=10)
+    client = app.test_client()
+    hdr = {"X-Telegram-Bot-Api-Secret-Token": "s3"}
+
+    assert client.post(WEBHOOK_PATH, json=_update(1, "Aceptada")).status_code == 403
+    reply = client.post(WEBHOOK_PATH, json=_update(1, "Aceptada"), headers=hdr).get_json()
+    assert reply == {"method": "answerCallbackQuery", "callback_query_id": "cb1", "text": "SOLUSDT: Aceptada registrada"}
+    # Reintento del mismo update y segunda pulsación: no se registra dos veces
+    assert client.post(WEBHOOK_PATH, json=_update(1, "Aceptada"), headers=hdr).get_json() == {}
+    again = client.post(WEBHOOK_PATH, json=_update(2, "Rechazada|SOLUSDT"), headers=hdr).get_json()
+    assert again["text"] == "SOLUSDT: ya registrada o caducada"
+
+    wait(handler.futures, timeout=5)
+    handler.close()
+    rows = list(Journal(notifier.JOURNAL_FILE).rows())
+    assert [(r[1], r[-1]) for r in rows] == [("SOLUSDT", "Aceptada")]
+    assert sent == ["Operación para SOLUSDT guardada como 'Aceptada'"]
+
+
+def test_pending_ops_survive_restart_and_index_by_message(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    PendingOps(StateStore(path)).add("ETHUSDT", OP, message_id=77)
+    reopened = PendingOps(StateStore(path))
+    assert reopened.symbol_for(77) == "ETHUSDT"
+    assert reopened.pop("ETHUSDT") == OP
+    assert reopened.pop("ETHUSDT") is None and reopened.symbol_for(77) is None
@@ -0,0 +1,83 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import utils.yf_cache as yc
+
+
+def _frame(tickers, days):
+    idx = pd.date_range(end=days[1], periods=days[0], freq="D")
+    cols = pd.MultiIndex.from_product([tickers, ["Open", "High", "Low", "Close", "Adj Close", "Volume"]])
+    data = np.tile(np.arange(len(idx), dtype=float)[:, None], (1, len(cols)))
+    return pd.DataFrame(data, index=idx, columns=cols)
+
+
+def test_batched_download_ttl_and_append(tmp_path, monkeypatch):
+    monkeypatch.setattr(yc, "CACHE_DIR", str(tmp_path))
+    calls = []
+
+    def fake_download(tickers, interval, period=None, start=None):
+        calls.append((tuple(tickers), period, start))
+        if start:
+            return _frame(tickers, (3, "2024-02-11"))
+        return _frame(tickers, (40, "2024-02-09"))
+
+    monkeypatch.setattr(yc, "_download", fake_download)
+
+    group = ["BTC-USD", "ETH-USD", "^VIX"]
+    vix = yc.get_frame("^VIX", "1d", "10d", group=group, fetch_period="400d")
+    assert list(vix.columns) == yc.COLUMNS and len(vix) == 11
+    # Resto del lote desde caché: una única descarga multi-ticker
+    btc = yc.get_frame("BTC-USD", "1d", "400d", group=group)
+    assert len(btc) == 40
+    assert calls == [(("^VIX", "BTC-USD", "ETH-USD"), "400d", None)]
+
+    # Caché caducada → sólo velas nuevas desde la última guardada, anexadas
+    for name in os.listdir(tmp_path):
+        old = time.time() - 10 * 3600
+        os.utime(os.path.join(tmp_path, name), (old, old))
+    frames = yc.get_frames(group, "1d")
+    assert calls[-1] == (("BTC-USD", "ETH-USD", "^VIX"), None, "2024-02-09")
+    btc = frames["BTC-USD"]
+    assert btc.index[-1] == pd.Timestamp("2024-02-11") and len(btc) == 42
+    assert btc.index.is_unique
+
+
+def test_stale_ticker_without_new_rows_is_served_and_renewed(tmp_path, monkeypatch):
+    monkeypatch.setattr(yc, "CACHE_DIR", str(tmp_path))
+    calls = []
+
+    def fake_download(tickers, interval, period=None, start=None):
+        calls.append(start)
+        return None if start else _frame(tickers, (20, "2024-02-09"))   # mercado cerrado
+
+    monkeypatch.setattr(yc, "_download", fake_download)
+    yc.get_frames(["^VIX"], "1d")
+    old = time.time() - 10 * 3600
+    os.utime(os.path.join(tmp_path, "_VIX_1d.pkl"), (old, old))
+
+    assert len(yc.get_frames(["^VIX"], "1d")["^VIX"]) == 20
+    assert len(yc.get_frames(["^VIX"], "1d")["^VIX"]) == 20
+    assert calls == [None, "2024-02-09"]            # un solo intento hasta que caduque el TTL
+
+
+def test_failed_refresh_keeps_entry_stale(tmp_path, monkeypatch):
+    monkeypatch.setattr(yc, "CACHE_DIR", str(tmp_path))
+    calls = []
+
+    def fake_download(tickers, interval, period=None, start=None):
+        calls.append(start)
+        if start:
+            raise ConnectionError("yfinance caído")
+        return _frame(tickers, (20, "2024-02-09"))
+
+    monkeypatch.setattr(yc, "_download", fake_download)
+    yc.get_frames(["^VIX"], "1d")
+    old = time.time() - 10 * 3600
+    os.utime(os.path.join(tmp_path, "_VIX_1d.pkl"), (old, old))
+
+    assert len(yc.get_frames(["^VIX"], "1d")["^VIX"]) == 20    # se sirve lo guardado
+    assert len(yc.get_frames(["^VIX"], "1d")["^VIX"]) == 20
+    assert calls == [None, "2024-02-09", "2024-02-09"]          # el error no renueva el TTL
@@ -0,0 +1,100 @@
+# utils/bootstrap.py
+# -*- coding: utf-8 -*-
+"""
+Fase de arranque concurrente del escaneo.
+
+Las tareas (macro, sesgo de mercado, universo...) son llamadas de red
+independientes: se lanzan a la vez, cada una con su timeout contado desde el
+inicio de la fase. Si una tarea falla o no termina a tiempo se usa su
+`fallback` (modo degradado) y se marca como tal; las tareas `required` sin
+resultado hacen que run_bootstrap() lance BootstrapError.
+
+Los hilos son daemon: una tarea colgada no bloquea la salida del proceso ni
+el resto del escaneo (su resultado tardío se descarta).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger("bootstrap")
+
+
+class BootstrapError(RuntimeError):
+    pass
+
+
+@dataclass
+class BootTask:
+    name: str
+    fn: Callable[[], Any]
+    timeout: float
+    fallback: Any = None        # valor (o callable sin argumentos) en modo degradado
+    required: bool = False
+
+
+@dataclass
+class BootResult:
+    value: Any
+    elapsed: float
+    degraded: bool = False
+    error: Optional[str] = None
+
+
+def _start(task: BootTask) -> Future:
+    fut: Future = Future()
+
+    def _run() -> None:
+        t0 = time.perf_counter()
+        try:
+            value = task.fn()
+        except BaseException as e:  # noqa: BLE001 - se reporta como degradado
+            fut.set_exception(e)
+        else:
+            fut.set_result((value, time.perf_counter() - t0))
+
+    threading.Thread(target=_run, name=f"boot-{task.name}", daemon=True).start()
+    return fut
+
+
+def _fallback(task: BootTask) -> Any:
+    return task.fallback() if callable(task.fallback) else task.fallback
+
+
+def run_bootstrap(tasks: Iterable[BootTask], log: Optional[logging.Logger] = None) -> Dict[str, BootResult]:
+    """Ejecuta las tareas en paralelo; devuelve {nombre: BootResult} y registra tiempos."""
+    log = log or logger
+    tasks = list(tasks)
+    t0 = time.perf_counter()
+    futures = {t.name: _start(t) for t in tasks}
+
+    results: Dict[str, BootResult] = {}
+    for task in tasks:
+        remaining = max(0.0, task.timeout - (time.perf_counter() - t0))
+        try:
+            value, elapsed = futures[task.name].result(timeout=remaining)
+            results[task.name] = BootResult(value, elapsed)
+        except FutureTimeout:
+            results[task.name] = BootResult(_fallback(task), time.perf_counter() - t0, True,
+                                            f"timeout {task.timeout:.0f}s")
+        except Exception as e:
+            results[task.name] = BootResult(_fallback(task), time.perf_counter() - t0, True, str(e))
+
+    total = time.perf_counter() - t0
+    parts = " | ".join(
+        f"{name} {r.elapsed:.2f}s" + (f" (degradado: {r.error})" if r.degraded else "")
+        for name, r in results.items()
+    )
+    log.info(f"Bootstrap {total:.2f}s → {parts}")
+
+    missing = [t.name for t in tasks if t.required and results[t.name].degraded]
+    if missing:
+        raise BootstrapError(
+            "; ".join(f"{name}: {results[name].error}" for name in missing)
+        )
+    return results
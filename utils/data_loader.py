@@ -14,6 +14,8 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from utils import metrics, snapshot
+
 logger = logging.getLogger("data_loader")
 
 # ─────────────────────────────────────────────────────────
@@ -34,8 +36,23 @@ FAPI_BASES = [
     "https://fapi.binancefuture.com",
 ]
 
+
+def _bases_from_env(var: str, default: List[str]) -> List[str]:
+    """Permite redirigir los bases (p. ej. a utils.fake_binance) vía entorno, separados por coma."""
+    raw = os.getenv(var, "").strip()
+    if not raw:
+        return default
+    return [b.strip().rstrip("/") for b in raw.split(",") if b.strip()]
+
+
+SPOT_BASES = _bases_from_env("BINANCE_SPOT_BASES", SPOT_BASES)
+FAPI_BASES = _bases_from_env("BINANCE_FAPI_BASES", FAPI_BASES)
+
 SPOT_KLINES_PATH = "/api/v3/klines"
 FAPI_KLINES_PATH = "/fapi/v1/klines"
+SPOT_EXCHANGEINFO_PATH = "/api/v3/exchangeInfo"
+FAPI_EXCHANGEINFO_PATH = "/fapi/v1/exchangeInfo"
+FAPI_TICKER_24H_PATH = "/fapi/v1/ticker/24hr"
 
 # Límite máximo soportado por el endpoint (Binance FAPI soporta 1500; Spot 1000).
 SPOT_LIMIT_MAX = 1000
@@ -43,7 +60,6 @@ FAPI_LIMIT_MAX = 1500
 
 # Caché local (en disco) para responses GET
 CACHE_DIR = os.path.join("output", ".cache", "http")
-os.makedirs(CACHE_DIR, exist_ok=True)
 
 # ─────────────────────────────────────────────────────────
 # Sesión HTTP con reintentos
@@ -66,6 +82,9 @@ def _build_session() -> requests.Session:
     adapter = HTTPAdapter(max_retries=retry, pool_connections=100, pool_maxsize=100)
     # Montamos genéricamente para https
     session.mount("https://", adapter)
+    # http sólo se usa contra servidores locales (utils.fake_binance): pool amplio y
+    # sin reintentos de urllib3, para que 429/418/5xx lleguen a _http_get_first_ok
+    session.mount("http://", HTTPAdapter(max_retries=0, pool_connections=100, pool_maxsize=100))
     # UA simple para identificar el bot (opcional)
     session.headers.update(
         {
@@ -107,6 +126,7 @@ def _cache_read(key: str, ttl_secs: int) -> Optional[Any]:
 def _cache_write(key: str, payload: Any) -> None:
     path = _cache_path(key)
     try:
+        os.makedirs(CACHE_DIR, exist_ok=True)  # al primer uso, no al importar
         with open(path, "w", encoding="utf-8") as f:
             json.dump(payload, f, ensure_ascii=False)
     except Exception as e:
@@ -141,6 +161,13 @@ def _http_get_first_ok(
         else:
             norm_params[k] = v
 
+    # Record/replay: se salta la caché en disco (la clave no depende del base)
+    if snapshot.active() is not None:
+        return snapshot.fetch_json(
+            ("binance", path, norm_params),
+            lambda: _get_from_bases(bases, path, norm_params, timeout, sleep_between),
+        )
+
     # Clave de caché estable (por URL + params)
     first_url = f"{bases[0]}{path}"
     key = _cache_key(first_url, norm_params)
@@ -148,22 +175,37 @@ def _http_get_first_ok(
     if cache_ttl > 0:
         cached = _cache_read(key, cache_ttl)
         if cached is not None:
+            metrics.incr("http.cache_hit")
             return cached
 
+    data = _get_from_bases(bases, path, norm_params, timeout, sleep_between)
+    if cache_ttl > 0:
+        _cache_write(key, data)
+    return data
+
+
+def _get_from_bases(
+    bases: List[str],
+    path: str,
+    params: Dict[str, Any],
+    timeout: Tuple[float, float],
+    sleep_between: float,
+) -> Any:
+    """GET sobre cada base en orden; devuelve el primer 200 OK (sin caché)."""
     last_err: Optional[Exception] = None
     for i, base in enumerate(bases):
         url = f"{base}{path}"
         try:
-            resp = SESSION.get(url, params=norm_params, timeout=timeout)
+            with metrics.timer("http.request"):
+                resp = SESSION.get(url, params=params, timeout=timeout)
+            metrics.incr(f"http.status_{resp.status_code}")
             if resp.status_code == 200:
                 try:
-                    data = resp.json()
+                    with metrics.timer("http.json"):
+                        return resp.json()
                 except Exception:
                     # algunos endpoints devuelven lista plana JSON; si falla json() se intenta texto
-                    data = json.loads(resp.text)
-                if cache_ttl > 0:
-                    _cache_write(key, data)
-                return data
+                    return json.loads(resp.text)
 
             # 429/418: rate limit; respetar Retry-After si viene
             if resp.status_code in (429, 418):
@@ -0,0 +1,502 @@
+# utils/fake_binance.py
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita la API REST pública de Binance (para tests y carga offline).
+
+Endpoints:
+  /fapi/v1/klines, /api/v3/klines          klines (sintéticos o desde disco)
+  /fapi/v1/exchangeInfo, /api/v3/exchangeInfo
+  /fapi/v1/ticker/24hr                     todos los símbolos o ?symbol=
+
+Un único servidor expone varios "bases" con prefijo de ruta
+(http://127.0.0.1:<port>/b0, /b1, ...) para poder inyectar fallos por base y
+probar el fallback de utils.data_loader._http_get_first_ok.
+
+Por base (FaultConfig):
+  - latencia: fija, uniforme, exponencial o lognormal
+  - probabilidad de 429 / 418 / 5xx (con Retry-After en 429/418)
+  - base caída (503 siempre)
+  - límite de peso por minuto (X-MBX-USED-WEIGHT-1M): al superarlo → 429;
+    seguir pidiendo durante el Retry-After cuenta como infracción y, tras
+    `ban_after` infracciones → 418 (baneo) como hace Binance.
+
+Datos:
+  - sintéticos: paseo aleatorio determinista por símbolo (semilla = crc32)
+  - grabados: klines guardados por logic.backtest.save_klines (<SYMBOL>_<interval>.json)
+
+Uso:
+  with FakeBinance(symbols=["BTCUSDT", "ETHUSDT"]) as fake, fake.override_bases():
+      get_klines("BTCUSDT", "1d")          # → servidor local
+
+  python -m utils.fake_binance serve --port 8080 --symbols 300 --latency-ms 40 --p429 0.01
+  python -m utils.fake_binance bench --symbols 300 --workers 16
+
+`bench` comparte proceso (y GIL) entre cliente y servidor; para medir el
+cliente en condiciones reales, lanzar `serve` aparte y exportar los bases.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+logger = logging.getLogger("fake_binance")
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000,
+    "1w": 604_800_000,
+}
+SYNTH_BARS = 1600          # histórico sintético por (símbolo, intervalo)
+WEIGHT_WINDOW_MS = 60_000
+
+
+def klines_weight(limit: int) -> int:
+    """Peso de /klines según el límite pedido (tabla de Binance Futures)."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+ENDPOINT_WEIGHT = {"exchangeInfo": 1, "ticker_all": 40, "ticker_one": 1}
+
+
+# ─────────────────────────────────────────────────────────
+# Configuración de fallos
+# ─────────────────────────────────────────────────────────
+
+@dataclass
+class FaultConfig:
+    latency_ms: float = 0.0
+    latency_dist: str = "fixed"      # fixed | uniform | exp | lognormal
+    latency_sigma: float = 0.5       # lognormal (σ) / uniform (±fracción)
+    p429: float = 0.0
+    p418: float = 0.0
+    p5xx: float = 0.0
+    retry_after_s: int = 1
+    ban_s: int = 60
+    down: bool = False               # base caída → 503 siempre
+    weight_limit: int = 0            # 0 = sin límite por minuto
+    ban_after: int = 3               # infracciones durante Retry-After antes de 418
+
+    def latency(self, rng: random.Random) -> float:
+        m = max(0.0, float(self.latency_ms)) / 1000.0
+        if m <= 0:
+            return 0.0
+        if self.latency_dist == "uniform":
+            return max(0.0, rng.uniform(m * (1 - self.latency_sigma), m * (1 + self.latency_sigma)))
+        if self.latency_dist == "exp":
+            return rng.expovariate(1.0 / m)
+        if self.latency_dist == "lognormal":
+            # media = m → mu = ln(m) - σ²/2
+            s = self.latency_sigma
+            return rng.lognormvariate(math.log(m) - s * s / 2.0, s)
+        return m
+
+
+@dataclass
+class _BaseState:
+    weight: int = 0
+    window: int = 0
+    blocked_until: float = 0.0
+    violations: int = 0
+    status: Dict[int, int] = field(default_factory=dict)
+
+
+# ─────────────────────────────────────────────────────────
+# Datos de mercado
+# ─────────────────────────────────────────────────────────
+
+class MarketData:
+    def __init__(self, symbols: List[str], data_dir: Optional[str] = None, now_ms: Optional[int] = None) -> None:
+        self.symbols = sorted(set(symbols))
+        self.data_dir = data_dir
+        self.now_ms = int(now_ms if now_ms is not None else time.time() * 1000)
+        self._cache: Dict[Tuple[str, str], List[list]] = {}
+        self._lock = threading.Lock()
+
+    def _synthetic(self, symbol: str, interval: str) -> List[list]:
+        iv = INTERVAL_MS[interval]
+        rng = np.random.default_rng(zlib.crc32(f"{symbol}|{interval}".encode()))
+        n = SYNTH_BARS
+        last_open = self.now_ms // iv * iv
+        t = last_open - (n - 1) * iv + np.arange(n, dtype=np.int64) * iv
+        scale = math.sqrt(iv / INTERVAL_MS["1d"])
+        p0 = float(np.exp(rng.uniform(-2, 10)))
+        c = p0 * np.exp(np.cumsum(rng.normal(0.0005 * scale ** 2, 0.03 * scale, n)))
+        o = np.r_[p0, c[:-1]]
+        h = np.maximum(o, c) * (1 + rng.uniform(0, 0.02 * scale, n))
+        l = np.minimum(o, c) * (1 - rng.uniform(0, 0.02 * scale, n))
+        qv = rng.uniform(2e7, 4e8, n) * (iv / INTERVAL_MS["1d"])
+        v = qv / c
+        return [
+            [int(t[i]), f"{o[i]:.8f}", f"{h[i]:.8f}", f"{l[i]:.8f}", f"{c[i]:.8f}", f"{v[i]:.4f}",
+             int(t[i] + iv - 1), f"{qv[i]:.4f}", int(qv[i] // 1000), f"{v[i] / 2:.4f}", f"{qv[i] / 2:.4f}", "0"]
+            for i in range(n)
+        ]
+
+    def series(self, symbol: str, interval: str) -> List[list]:
+        key = (symbol, interval)
+        rows = self._cache.get(key)
+        if rows is not None:
+            return rows
+        # Se genera fuera del lock (determinista: dos hilos producen lo mismo)
+        rows = []
+        if self.data_dir:
+            from logic.backtest import load_klines
+
+            rows = load_klines(self.data_dir, symbol, interval)
+        if not rows and interval in INTERVAL_MS and symbol in self.symbols:
+            rows = self._synthetic(symbol, interval)
+        with self._lock:
+            return self._cache.setdefault(key, rows)
+
+    def klines(self, symbol: str, interval: str, limit: int,
+               start: Optional[int] = None, end: Optional[int] = None) -> List[list]:
+        rows = self.series(symbol, interval)
+        if start is not None:
+            rows = [r for r in rows if int(r[0]) >= start]
+            return [r for r in rows if end is None or int(r[0]) <= end][:limit]
+        if end is not None:
+            rows = [r for r in rows if int(r[0]) <= end]
+        return rows[-limit:]
+
+    def exchange_info(self) -> Dict[str, Any]:
+        return {
+            "timezone": "UTC",
+            "serverTime": self.now_ms,
+            "symbols": [
+                {"symbol": s, "status": "TRADING", "baseAsset": s[:-4], "quoteAsset": "USDT",
+                 "contractType": "PERPETUAL"}
+                for s in self.symbols
+            ],
+        }
+
+    def ticker(self, symbol: str) -> Dict[str, Any]:
+        rows = self.series(symbol, "1d")
+        last = rows[-1] if rows else [0, "0", "0", "0", "0", "0", 0, "0"]
+        prev = float(rows[-2][4]) if len(rows) > 1 else float(last[1])
+        close = float(last[4])
+        return {
+            "symbol": symbol,
+            "lastPrice": last[4],
+            "priceChangePercent": f"{(close / prev - 1) * 100 if prev else 0.0:.3f}",
+            "volume": last[5],
+            "quoteVolume": last[7],
+            "openTime": int(last[0]),
+            "closeTime": int(last[6]),
+        }
+
+
+# ─────────────────────────────────────────────────────────
+# Servidor
+# ─────────────────────────────────────────────────────────
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # cabeceras y cuerpo van en dos writes (evita +40ms por delayed ACK)
+
+    def log_message(self, fmt: str, *args: Any) -> None:  # silencia stderr
+        logger.debug(fmt % args)
+
+    def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        status, payload, headers = self.server.fake.handle(self.path)
+        self._send(status, payload, headers)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeBinance"
+
+
+class FakeBinance:
+    """Stand-in de Binance REST en un hilo de fondo (puerto 0 = libre)."""
+
+    def __init__(
+        self,
+        symbols: Optional[List[str]] = None,
+        data_dir: Optional[str] = None,
+        n_bases: int = 2,
+        faults: Optional[Dict[int, FaultConfig]] = None,
+        default_fault: Optional[FaultConfig] = None,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        now_ms: Optional[int] = None,
+    ) -> None:
+        if symbols is None:
+            if data_dir:
+                from logic.backtest import list_symbols
+
+                symbols = list_symbols(data_dir)
+            else:
+                symbols = ["BTCUSDT", "ETHUSDT"]
+        self.data = MarketData(symbols, data_dir, now_ms)
+        self.n_bases = max(1, int(n_bases))
+        self.faults: Dict[int, FaultConfig] = {i: (faults or {}).get(i) or default_fault or FaultConfig()
+                                               for i in range(self.n_bases)}
+        self.state = [_BaseState() for _ in range(self.n_bases)]
+        self.requests: List[Tuple[int, str, int]] = []   # (base, endpoint, status)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._host, self._port = host, port
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- ciclo de vida ----------
+    def start(self) -> "FakeBinance":
+        self._server = _Server((self._host, self._port), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-binance", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeBinance":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "servidor no iniciado"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def bases(self) -> List[str]:
+        return [f"{self.url}/b{i}" for i in range(self.n_bases)]
+
+    @contextlib.contextmanager
+    def override_bases(self) -> Iterator[None]:
+        """Apunta utils.data_loader (FAPI_BASES/SPOT_BASES) a este servidor."""
+        import utils.data_loader as dl
+
+        saved = (dl.FAPI_BASES, dl.SPOT_BASES)
+        dl.FAPI_BASES, dl.SPOT_BASES = list(self.bases), list(self.bases)
+        try:
+            yield
+        finally:
+            dl.FAPI_BASES, dl.SPOT_BASES = saved
+
+    def status_counts(self, base: Optional[int] = None) -> Dict[int, int]:
+        out: Dict[int, int] = {}
+        for b, _, st in list(self.requests):
+            if base is None or b == base:
+                out[st] = out.get(st, 0) + 1
+        return out
+
+    # ---------- lógica ----------
+    def _route(self, path: str, q: Dict[str, str]) -> Tuple[int, Any, int, str]:
+        """(status, payload, peso, endpoint)."""
+        if path in ("/fapi/v1/klines", "/api/v3/klines"):
+            sym = q.get("symbol", "").upper()
+            interval = q.get("interval", "")
+            limit = int(q.get("limit", 500))
+            lmax = 1500 if path.startswith("/fapi") else 1000
+            if interval not in INTERVAL_MS:
+                return 400, {"code": -1120, "msg": "Invalid interval."}, 1, "klines"
+            if sym not in self.data.symbols and not (self.data.data_dir and self.data.series(sym, interval)):
+                return 400, {"code": -1121, "msg": "Invalid symbol."}, 1, "klines"
+            limit = max(1, min(limit, lmax))
+            start = int(q["startTime"]) if "startTime" in q else None
+            end = int(q["endTime"]) if "endTime" in q else None
+            return 200, self.data.klines(sym, interval, limit, start, end), klines_weight(limit), "klines"
+        if path in ("/fapi/v1/exchangeInfo", "/api/v3/exchangeInfo"):
+            return 200, self.data.exchange_info(), ENDPOINT_WEIGHT["exchangeInfo"], "exchangeInfo"
+        if path == "/fapi/v1/ticker/24hr":
+            sym = q.get("symbol")
+            if sym:
+                return 200, self.data.ticker(sym.upper()), ENDPOINT_WEIGHT["ticker_one"], "ticker"
+            return 200, [self.data.ticker(s) for s in self.data.symbols], ENDPOINT_WEIGHT["ticker_all"], "ticker"
+        return 404, {"code": -1, "msg": "Not found"}, 1, "unknown"
+
+    def handle(self, raw_path: str) -> Tuple[int, Any, Dict[str, str]]:
+        parsed = urlparse(raw_path)
+        path = parsed.path
+        base = 0
+        parts = path.split("/", 2)
+        if len(parts) > 2 and parts[1].startswith("b") and parts[1][1:].isdigit():
+            base, path = int(parts[1][1:]), "/" + parts[2]
+        base = min(base, self.n_bases - 1)
+        q = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        fault = self.faults[base]
+        st = self.state[base]
+
+        with self._lock:
+            delay = fault.latency(self._rng)
+            roll = self._rng.random()
+        if delay:
+            time.sleep(delay)
+
+        status, payload, weight, endpoint = self._route(path, q)
+        headers: Dict[str, str] = {}
+        now = time.time()
+        with self._lock:
+            window = int(now * 1000) // WEIGHT_WINDOW_MS
+            if st.window != window:
+                st.window, st.weight = window, 0
+
+            if fault.down:
+                status, payload = 503, {"code": -1001, "msg": "Service unavailable (fake)"}
+            elif now < st.blocked_until:
+                # Pedir durante el Retry-After es una infracción; reincidir → baneo (418)
+                st.violations += 1
+                if st.violations >= fault.ban_after:
+                    st.blocked_until = now + fault.ban_s
+                    status, payload = 418, {"code": -1003, "msg": "IP banned (fake)"}
+                else:
+                    status, payload = 429, {"code": -1003, "msg": "Too many requests (fake)"}
+                headers["Retry-After"] = str(max(1, int(math.ceil(st.blocked_until - now))))
+            elif fault.weight_limit and st.weight + weight > fault.weight_limit:
+                retry = max(1, int(math.ceil(((window + 1) * WEIGHT_WINDOW_MS) / 1000 - now)))
+                st.blocked_until = now + retry
+                status, payload = 429, {"code": -1003, "msg": "Weight limit exceeded (fake)"}
+                headers["Retry-After"] = str(retry)
+            elif roll < fault.p418:
+                st.blocked_until = now + fault.ban_s
+                status, payload = 418, {"code": -1003, "msg": "IP banned (fake)"}
+                headers["Retry-After"] = str(fault.ban_s)
+            elif roll < fault.p418 + fault.p429:
+                st.blocked_until = now + fault.retry_after_s
+                status, payload = 429, {"code": -1003, "msg": "Too many requests (fake)"}
+                headers["Retry-After"] = str(fault.retry_after_s)
+            elif roll < fault.p418 + fault.p429 + fault.p5xx:
+                status, payload = 502, {"code": -1001, "msg": "Bad gateway (fake)"}
+            elif status == 200:
+                st.weight += weight
+                st.violations = 0
+
+            headers["X-MBX-USED-WEIGHT-1M"] = str(st.weight)
+            st.status[status] = st.status.get(status, 0) + 1
+            self.requests.append((base, endpoint, status))
+        return status, payload, headers
+
+
+# ─────────────────────────────────────────────────────────
+# CLI: servir / benchmark de utils.data_loader
+# ─────────────────────────────────────────────────────────
+
+def _fault_from_args(args: argparse.Namespace) -> FaultConfig:
+    return FaultConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        p429=args.p429,
+        p418=args.p418,
+        p5xx=args.p5xx,
+        retry_after_s=args.retry_after,
+        weight_limit=args.weight_limit,
+    )
+
+
+def bench(fake: FakeBinance, workers: int = 8, interval: str = "1d", limit: int = 400) -> Dict[str, Any]:
+    """Descarga klines de todo el universo vía utils.data_loader contra el fake."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from data.symbols import get_usdt_futures_universe
+    from utils.data_loader import get_klines
+
+    lat: List[float] = []
+
+    def _one(sym: str) -> int:
+        t0 = time.perf_counter()
+        rows = get_klines(sym, interval, limit=limit, cache_ttl=0)
+        lat.append(time.perf_counter() - t0)
+        return len(rows)
+
+    with fake.override_bases():
+        t0 = time.perf_counter()
+        symbols = get_usdt_futures_universe()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+            sizes = list(ex.map(_one, symbols))
+        elapsed = time.perf_counter() - t0
+
+    q = np.percentile(lat, [50, 95, 99]) if lat else [0.0, 0.0, 0.0]
+    return {
+        "symbols": len(symbols),
+        "ok": sum(1 for n in sizes if n),
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(len(fake.requests) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(q[0] * 1000, 1),
+        "p95_ms": round(q[1] * 1000, 1),
+        "p99_ms": round(q[2] * 1000, 1),
+        "status": {str(b): fake.status_counts(b) for b in range(fake.n_bases)},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API REST de Binance.")
+    parser.add_argument("mode", choices=("serve", "bench"))
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--bases", type=int, default=2)
+    parser.add_argument("--symbols", type=int, default=50, help="Nº de símbolos sintéticos.")
+    parser.add_argument("--dir", default=None, help="Klines grabados (logic.backtest.save_klines).")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-dist", default="fixed", choices=("fixed", "uniform", "exp", "lognormal"))
+    parser.add_argument("--p429", type=float, default=0.0)
+    parser.add_argument("--p418", type=float, default=0.0)
+    parser.add_argument("--p5xx", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--weight-limit", type=int, default=0)
+    parser.add_argument("--down", default="", help="Bases caídas, separadas por coma (ej. 0).")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    symbols = None if args.dir else [f"SYN{i:03d}USDT" for i in range(args.symbols)] + ["BTCUSDT", "ETHUSDT"]
+    fault = _fault_from_args(args)
+    faults = {int(b): FaultConfig(**{**fault.__dict__, "down": True}) for b in args.down.split(",") if b.strip()}
+    fake = FakeBinance(symbols=symbols, data_dir=args.dir, n_bases=args.bases, faults=faults,
+                       default_fault=fault, port=args.port).start()
+    try:
+        if args.mode == "bench":
+            print(json.dumps(bench(fake, workers=args.workers), indent=2))
+            return
+        bases = ",".join(fake.bases)
+        print(f"Fake Binance en {fake.url}")
+        print(f"export BINANCE_FAPI_BASES={bases}")
+        print(f"export BINANCE_SPOT_BASES={bases}")
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+# utils/fake_telegram.py
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita la Bot API de Telegram (para tests y carga offline).
+
+Métodos (POST /bot<token>/<método>, cuerpo JSON o form-urlencoded):
+  sendMessage            → {"ok": true, "result": {"message_id": n, ...}}
+  answerCallbackQuery    → {"ok": true, "result": true}
+  getMe                  → bot ficticio
+
+Validaciones como las reales: chat_id obligatorio, texto no vacío y de
+4096 caracteres como máximo (400 "Bad Request: message is too long").
+
+Fallos inyectables (BotFaults, extiende utils.fake_binance.FaultConfig):
+  - latencia fija / uniforme / exponencial / lognormal
+  - p429: 429 con `parameters.retry_after` (retry_after_s)
+  - p5xx: 502 Bad Gateway
+  - p_timeout: la petición se queda colgada `hang_s` segundos (el cliente
+    vence por timeout)
+  - chat_rate: límite real por chat (mensajes/s); al superarlo → 429 con el
+    retry_after que falte, como hace Telegram
+
+Todo lo recibido queda en `fake.messages` / `fake.callbacks` (payload,
+instante y status devuelto).
+
+Uso:
+  with FakeTelegram() as fake, fake.override_api_base():
+      enviar_telegram("hola")            # → servidor local
+
+  python -m utils.fake_telegram serve --port 8081 --latency-ms 60 --p429 0.02
+  python -m utils.fake_telegram bench --messages 2000 --chats 10 --p429 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from utils.fake_binance import FaultConfig
+
+logger = logging.getLogger("fake_telegram")
+
+MAX_TEXT = 4096
+
+
+@dataclass
+class BotFaults(FaultConfig):
+    p_timeout: float = 0.0
+    hang_s: float = 15.0
+    chat_rate: float = 0.0           # 0 = sin límite por chat
+
+
+# ─────────────────────────────────────────────────────────
+# Servidor
+# ─────────────────────────────────────────────────────────
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt: str, *args: Any) -> None:  # silencia stderr
+        logger.debug(fmt % args)
+
+    def _body(self) -> Dict[str, Any]:
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n else b""
+        ctype = (self.headers.get("Content-Type") or "").split(";")[0].strip()
+        if ctype == "application/json":
+            try:
+                data = json.loads(raw or b"{}")
+                return data if isinstance(data, dict) else {}
+            except ValueError:
+                return {}
+        return {k: v[-1] for k, v in parse_qs(raw.decode("utf-8")).items()}
+
+    def do_POST(self) -> None:  # noqa: N802
+        status, payload = self.server.fake.handle(urlparse(self.path).path, self._body())
+        if status is None:
+            # timeout simulado: se cierra sin responder
+            self.close_connection = True
+            return
+        body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeTelegram"
+
+
+class FakeTelegram:
+    """Stand-in de la Bot API en un hilo de fondo (puerto 0 = libre)."""
+
+    def __init__(
+        self,
+        faults: Optional[BotFaults] = None,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.faults = faults or BotFaults()
+        self.messages: List[Dict[str, Any]] = []    # {"t", "status", "payload"}
+        self.callbacks: List[Dict[str, Any]] = []
+        self.status: Dict[int, int] = {}
+        self._chat_next: Dict[str, float] = {}      # próximo instante permitido por chat
+        self._message_id = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._host, self._port = host, port
+        self._server: Optional[_Server] = None
+
+    # ---------- ciclo de vida ----------
+    def start(self) -> "FakeTelegram":
+        self._server = _Server((self._host, self._port), _Handler)
+        self._server.fake = self
+        threading.Thread(target=self._server.serve_forever, name="fake-telegram", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeTelegram":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "servidor no iniciado"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @contextlib.contextmanager
+    def override_api_base(self) -> Iterator[None]:
+        """Apunta config.TELEGRAM_API_BASE (y los despachadores compartidos) a este servidor."""
+        import config
+        from notifier import dispatcher
+
+        saved = getattr(config, "TELEGRAM_API_BASE", None)
+        config.TELEGRAM_API_BASE = self.url
+        try:
+            yield
+        finally:
+            dispatcher.shutdown()
+            if saved is None:
+                delattr(config, "TELEGRAM_API_BASE")
+            else:
+                config.TELEGRAM_API_BASE = saved
+
+    def texts(self, chat_id: Optional[str] = None) -> List[str]:
+        """Textos entregados (status 200), en orden de llegada."""
+        return [m["payload"].get("text", "") for m in list(self.messages)
+                if m["status"] == 200 and (chat_id is None or str(m["payload"].get("chat_id")) == str(chat_id))]
+
+    # ---------- lógica ----------
+    def _error(self, code: int, description: str, **extra: Any) -> Tuple[int, Dict[str, Any]]:
+        return code, {"ok": False, "error_code": code, "description": description, **extra}
+
+    def _send_message(self, p: Dict[str, Any], now: float) -> Tuple[int, Dict[str, Any]]:
+        chat = str(p.get("chat_id") or "")
+        text = str(p.get("text") or "")
+        if not chat:
+            return self._error(400, "Bad Request: chat_id is empty")
+        if not text:
+            return self._error(400, "Bad Request: message text is empty")
+        if len(text) > MAX_TEXT:
+            return self._error(400, "Bad Request: message is too long")
+        rate = float(self.faults.chat_rate or 0.0)
+        if rate > 0:
+            nxt = self._chat_next.get(chat, 0.0)
+            if now < nxt:
+                wait = max(1, int(round(nxt - now + 0.5)))
+                return self._error(429, f"Too Many Requests: retry after {wait}",
+                                   parameters={"retry_after": wait})
+            self._chat_next[chat] = now + 1.0 / rate
+        self._message_id += 1
+        return 200, {"ok": True, "result": {
+            "message_id": self._message_id,
+            "date": int(now),
+            "chat": {"id": chat},
+            "text": text,
+        }}
+
+    def handle(self, path: str, body: Dict[str, Any]) -> Tuple[Optional[int], Dict[str, Any]]:
+        parts = path.strip("/").split("/")
+        if len(parts) != 2 or not parts[0].startswith("bot"):
+            return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+        method = parts[1]
+        f = self.faults
+
+        with self._lock:
+            delay = f.latency(self._rng)
+            roll = self._rng.random()
+        if delay:
+            time.sleep(delay)
+        if roll < f.p_timeout:
+            time.sleep(f.hang_s)
+            with self._lock:
+                self.status[0] = self.status.get(0, 0) + 1
+            return None, {}
+
+        now = time.time()
+        with self._lock:
+            if roll < f.p_timeout + f.p429:
+                status, payload = self._error(429, f"Too Many Requests: retry after {f.retry_after_s}",
+                                              parameters={"retry_after": f.retry_after_s})
+            elif roll < f.p_timeout + f.p429 + f.p5xx:
+                status, payload = self._error(502, "Bad Gateway")
+            elif method == "sendMessage":
+                status, payload = self._send_message(body, now)
+            elif method == "answerCallbackQuery":
+                status, payload = 200, {"ok": True, "result": True}
+            elif method == "getMe":
+                status, payload = 200, {"ok": True, "result": {"id": 1, "is_bot": True, "username": "fake_bot"}}
+            else:
+                status, payload = self._error(404, "Not Found: method not found")
+
+            record = {"t": now, "status": status, "payload": body}
+            if method == "answerCallbackQuery":
+                self.callbacks.append(record)
+            elif method == "sendMessage":
+                self.messages.append(record)
+            self.status[status] = self.status.get(status, 0) + 1
+        return status, payload
+
+
+# ─────────────────────────────────────────────────────────
+# CLI: servir / benchmark del despachador
+# ─────────────────────────────────────────────────────────
+
+def bench(fake: FakeTelegram, messages: int = 1000, chats: int = 5, **dispatch: Any) -> Dict[str, Any]:
+    """
+    Envía `messages` mensajes repartidos en `chats` chats con
+    notifier.dispatcher contra el fake. Latencia = submit → resultado
+    (incluye colas, rate limit y reintentos).
+    """
+    from notifier.dispatcher import OutboundMessage, TelegramDispatcher, dispatch_settings
+
+    settings = {**dispatch_settings(), **dispatch}
+    settings.pop("flush_timeout", None)
+    d = TelegramDispatcher("bench", api_base=fake.url, **settings)
+    lat: List[float] = []
+    lock = threading.Lock()
+
+    def _done(t0: float):
+        def cb(_f):
+            with lock:
+                lat.append(time.perf_counter() - t0)
+        return cb
+
+    t0 = time.perf_counter()
+    futures = []
+    for i in range(messages):
+        fut = d.submit(OutboundMessage(chat_id=str(i % max(1, chats)), text=f"bench {i}"))
+        fut.add_done_callback(_done(time.perf_counter()))
+        futures.append(fut)
+    results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - t0
+    d.close(5)
+
+    q = np.percentile(lat, [50, 95, 99]) if lat else [0.0, 0.0, 0.0]
+    return {
+        "messages": messages,
+        "chats": chats,
+        "delivered": sum(1 for r in results if r.ok),
+        "elapsed_s": round(elapsed, 3),
+        "msg_per_s": round(messages / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(q[0] * 1000, 1),
+        "p95_ms": round(q[1] * 1000, 1),
+        "p99_ms": round(q[2] * 1000, 1),
+        "max_attempts_seen": max((r.attempts for r in results), default=0),
+        "dispatcher": dict(d.stats),
+        "server_status": {str(k): v for k, v in sorted(fake.status.items())},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor local que imita la Bot API de Telegram.")
+    parser.add_argument("mode", choices=("serve", "bench"))
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-dist", default="fixed", choices=("fixed", "uniform", "exp", "lognormal"))
+    parser.add_argument("--p429", type=float, default=0.0)
+    parser.add_argument("--p5xx", type=float, default=0.0)
+    parser.add_argument("--p-timeout", type=float, default=0.0)
+    parser.add_argument("--hang", type=float, default=15.0, help="Segundos colgado en un timeout simulado.")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--chat-rate", type=float, default=0.0, help="Límite real por chat (msg/s).")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--global-rate", type=float, default=None)
+    parser.add_argument("--chat-send-rate", type=float, default=None, help="chat_rate del despachador.")
+    args = parser.parse_args()
+
+    faults = BotFaults(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        p429=args.p429,
+        p5xx=args.p5xx,
+        p_timeout=args.p_timeout,
+        hang_s=args.hang,
+        retry_after_s=args.retry_after,
+        chat_rate=args.chat_rate,
+    )
+    fake = FakeTelegram(faults, port=args.port).start()
+    try:
+        if args.mode == "bench":
+            overrides = {k: v for k, v in (("workers", args.workers), ("global_rate", args.global_rate),
+                                            ("chat_rate", args.chat_send_rate)) if v is not None}
+            print(json.dumps(bench(fake, args.messages, args.chats, **overrides), indent=2))
+            return
+        print(f"Fake Telegram en {fake.url}")
+        print(f"export TELEGRAM_API_BASE={fake.url}")
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,24 @@ import logging, os
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
 
+from utils import metrics
+
+# El directorio se crea al configurar el primer handler, no al importar
 _LOG_DIR = Path("output") / "logs"
-_LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+
+class _TimedFileHandler(RotatingFileHandler):
+    """RotatingFileHandler que anota en utils.metrics lo que cuesta escribir cada registro."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        with metrics.timer("logging.emit"):
+            super().emit(record)
+
+
+def _file_handler(name: str, backups: int) -> RotatingFileHandler:
+    _LOG_DIR.mkdir(parents=True, exist_ok=True)
+    return _TimedFileHandler(_LOG_DIR / name, maxBytes=5_000_000, backupCount=backups, encoding="utf-8")
+
 
 def setup_logging(mode: str = "production") -> None:
     level = logging.DEBUG if mode.lower() == "development" else logging.INFO
@@ -14,17 +30,20 @@ def setup_logging(mode: str = "production") -> None:
     # root logger
     logging.basicConfig(level=level, format=fmt, datefmt=datefmt)
 
-    # archivo rotativo
-    file_handler = RotatingFileHandler(_LOG_DIR / "app.log", maxBytes=5_000_000, backupCount=3, encoding="utf-8")
+    # archivo rotativo (una sola vez aunque se llame en cada ciclo del daemon)
+    root = logging.getLogger()
+    if any(isinstance(h, RotatingFileHandler) for h in root.handlers):
+        return
+    file_handler = _file_handler("app.log", 3)
     file_handler.setLevel(level)
     file_handler.setFormatter(logging.Formatter(fmt, datefmt))
-    logging.getLogger().addHandler(file_handler)
+    root.addHandler(file_handler)
 
 def get_audit_logger() -> logging.Logger:
     logger = logging.getLogger("audit")
     if not any(isinstance(h, RotatingFileHandler) for h in logger.handlers):
         fmt = "%(asctime)s | %(levelname)s | %(message)s"
-        handler = RotatingFileHandler(_LOG_DIR / "audit.log", maxBytes=5_000_000, backupCount=5, encoding="utf-8")
+        handler = _file_handler("audit.log", 5)
         handler.setFormatter(logging.Formatter(fmt, "%Y-%m-%d %H:%M:%S"))
         logger.setLevel(logging.INFO)
         logger.addHandler(handler)
@@ -1,10 +1,12 @@
 # utils/macro.py
 from __future__ import annotations
-import os, json, time
+import os, json, logging, threading, time
 from dataclasses import dataclass
 from typing import Optional, Tuple, List
 
-import yfinance as yf
+from utils import snapshot
+
+logger = logging.getLogger("macro")
 
 @dataclass
 class MacroState:
@@ -16,7 +18,12 @@ class MacroState:
 
 def _last_and_pc5(symbol: str) -> Tuple[Optional[float], Optional[float]]:
     try:
-        df = yf.Ticker(symbol).history(period="15d", interval="1d", auto_adjust=False)
+        import yfinance as yf  # diferido: arrastra pandas/aiohttp (~0.1 s)
+
+        df = snapshot.fetch_frame(
+            ("yf.history", symbol, "15d", "1d"),
+            lambda: yf.Ticker(symbol).history(period="15d", interval="1d", auto_adjust=False),
+        )
         if df.empty or len(df.index) < 6:
             return None, None
         c = df["Close"]
@@ -31,44 +38,122 @@ def _cache_path() -> str:
     os.makedirs(path, exist_ok=True)
     return os.path.join(path, "macro.json")
 
-def get_macro_state() -> MacroState:
-    # Config y cache
+# ─────────────────────────────────────────────────────────
+# Stale-while-revalidate
+#   edad < MACRO_CACHE_HOURS          → se sirve la caché
+#   edad < MACRO_MAX_STALE_HOURS      → se sirve la caché y se refresca en segundo plano
+#   sin caché o edad >= máximo        → refresco bloqueante
+# El estado nuevo se publica con un swap atómico (memoria + os.replace en disco).
+# ─────────────────────────────────────────────────────────
+
+_STATE: Optional[MacroState] = None
+_LOCK = threading.Lock()
+_REFRESH: Optional[threading.Thread] = None
+
+
+def _settings() -> Tuple[str, str, float, float]:
     try:
         import config
         vix_sym = getattr(config, "VIX_SYMBOL", "^VIX")
         dxy_sym = getattr(config, "DXY_SYMBOL", "DX=F")
         ttl_hours = float(getattr(config, "MACRO_CACHE_HOURS", 6))
+        max_stale_hours = float(getattr(config, "MACRO_MAX_STALE_HOURS", 48))
     except Exception:
-        vix_sym, dxy_sym, ttl_hours = "^VIX", "DX=F", 6.0
+        vix_sym, dxy_sym, ttl_hours, max_stale_hours = "^VIX", "DX=F", 6.0, 48.0
+    return vix_sym, dxy_sym, ttl_hours, max(max_stale_hours, ttl_hours)
 
-    cache_file = _cache_path()
-    now = time.time()
-    # lee cache
+
+def _read_cache() -> Optional[MacroState]:
     try:
-        with open(cache_file, "r", encoding="utf-8") as f:
+        with open(_cache_path(), "r", encoding="utf-8") as f:
             j = json.load(f)
-        if now - float(j.get("ts", 0)) < ttl_hours * 3600:
-            return MacroState(
-                vix_last=j.get("vix_last"), vix_pc5=j.get("vix_pc5"),
-                dxy_last=j.get("dxy_last"), dxy_pc5=j.get("dxy_pc5"),
-                ts=float(j.get("ts", now))
-            )
+        return MacroState(
+            vix_last=j.get("vix_last"), vix_pc5=j.get("vix_pc5"),
+            dxy_last=j.get("dxy_last"), dxy_pc5=j.get("dxy_pc5"),
+            ts=float(j.get("ts", 0)),
+        )
     except Exception:
-        pass
+        return None
 
-    vix_last, vix_pc5 = _last_and_pc5(vix_sym)
-    dxy_last, dxy_pc5 = _last_and_pc5(dxy_sym)
-    state = MacroState(vix_last, vix_pc5, dxy_last, dxy_pc5, ts=now)
 
-    # guarda cache (best-effort)
+def _write_cache(state: MacroState) -> None:
+    cache_file = _cache_path()
     try:
-        with open(cache_file, "w", encoding="utf-8") as f:
+        tmp_path = cache_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(state.__dict__, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cache_file)
     except Exception:
         pass
 
+
+def _fetch(vix_sym: str, dxy_sym: str) -> MacroState:
+    vix_last, vix_pc5 = _last_and_pc5(vix_sym)
+    dxy_last, dxy_pc5 = _last_and_pc5(dxy_sym)
+    return MacroState(vix_last, vix_pc5, dxy_last, dxy_pc5, ts=time.time())
+
+
+def _publish(state: MacroState) -> MacroState:
+    """Swap atómico; un refresco sin ningún dato no pisa un estado válido."""
+    global _STATE
+    if state.vix_last is None and state.dxy_last is None:
+        logger.warning("Refresco macro sin datos (VIX/DXY); se mantiene el estado anterior")
+        return _STATE or state
+    with _LOCK:
+        _STATE = state
+    _write_cache(state)
     return state
 
+
+def _refresh_async(vix_sym: str, dxy_sym: str) -> None:
+    """Lanza (como mucho) un refresco en segundo plano."""
+    global _REFRESH
+
+    def _run() -> None:
+        try:
+            _publish(_fetch(vix_sym, dxy_sym))
+        except Exception as e:
+            logger.warning(f"Refresco macro en segundo plano falló: {e}")
+
+    with _LOCK:
+        if _REFRESH is not None and _REFRESH.is_alive():
+            return
+        _REFRESH = threading.Thread(target=_run, name="macro-refresh", daemon=True)
+        _REFRESH.start()
+
+
+def wait_for_refresh(timeout: Optional[float] = None) -> bool:
+    """Espera al refresco en curso (si lo hay). True si no queda ninguno pendiente."""
+    t = _REFRESH
+    if t is not None:
+        t.join(timeout)
+        return not t.is_alive()
+    return True
+
+
+def get_macro_state() -> MacroState:
+    vix_sym, dxy_sym, ttl_hours, max_stale_hours = _settings()
+
+    # Record/replay: siempre desde utils.snapshot, sin caché ni hilos
+    if snapshot.active() is not None:
+        return _fetch(vix_sym, dxy_sym)
+
+    state = _STATE or _read_cache()
+    now = time.time()
+    age = now - state.ts if state is not None else float("inf")
+
+    if age < ttl_hours * 3600:
+        return state
+    if age < max_stale_hours * 3600:
+        _refresh_async(vix_sym, dxy_sym)
+        return state
+
+    # Sin caché o demasiado vieja: refresco bloqueante
+    fresh = _publish(_fetch(vix_sym, dxy_sym))
+    if fresh.vix_last is None and fresh.dxy_last is None and state is not None:
+        return state
+    return fresh
+
 def macro_kill_reason(bias: str, ms: MacroState) -> Optional[str]:
     """Regla dura: solo corta en escenarios realmente adversos."""
     try:
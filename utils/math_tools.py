@@ -2,7 +2,6 @@
 
 import numpy as np
 import pandas as pd
-from scipy.stats import linregress
 
 def calcular_ratio_tp_sl(tp: float, sl: float) -> float:
     """Calcula el ratio entre Take Profit y Stop Loss."""
@@ -14,6 +13,8 @@ def tendencia_lineal(data: list[float]) -> float:
     """Calcula la pendiente de una regresión lineal sobre una serie de precios."""
     if len(data) < 2:
         return 0
+    from scipy.stats import linregress  # scipy sólo si se usa (~0.3 s de import)
+
     x = np.arange(len(data))
     slope, _, _, _, _ = linregress(x, data)
     return slope
@@ -0,0 +1,201 @@
+# utils/metrics.py
+# -*- coding: utf-8 -*-
+"""
+Tiempos por etapa del pipeline de escaneo (HTTP, JSON, DataFrames,
+indicadores ta, niveles, scoring, logging, Telegram…).
+
+    from utils import metrics
+
+    with metrics.timer("analyzer.indicators"):
+        ...
+    metrics.incr("http.cache_hit")
+
+Desactivado (por defecto) timer() devuelve un context manager nulo
+compartido: el coste en el hot path es una comprobación de un booleano.
+Activado, cada muestra es un perf_counter() y un append.
+
+Las muestras se acumulan hasta flush(), que escribe el resumen de la ventana
+(p50/p95/p99, total, nº, máx. por etapa + contadores) en JSON y en formato
+Prometheus (textfile collector de node_exporter) y vacía el registro. La
+entrega a Telegram es asíncrona: lo que termine después de un flush cuenta
+en la ventana siguiente.
+
+Config (METRICS en settings.json):
+  {"enabled": false, "json_path": "output/logs/scan_metrics.json",
+   "prom_path": "output/metrics/binance_futures_scan.prom"}
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+PREFIX = "binance_futures_scan"
+QUANTILES = (0.5, 0.95, 0.99)
+DEFAULTS = {
+    "enabled": False,
+    "json_path": os.path.join("output", "logs", "scan_metrics.json"),
+    "prom_path": os.path.join("output", "metrics", f"{PREFIX}.prom"),
+}
+
+_enabled = False
+_lock = threading.Lock()
+_samples: Dict[str, List[float]] = {}
+_counters: Dict[str, float] = {}
+_since = time.time()
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+class _Timer:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "_Timer":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        observe(self.stage, time.perf_counter() - self.t0)
+
+
+_NULL = _NullTimer()
+
+
+# ─────────────────────────────────────────────────────────
+# Registro
+# ─────────────────────────────────────────────────────────
+
+def configure(enabled: bool) -> None:
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def configure_from(config: Any) -> dict:
+    """Activa/desactiva según METRICS en config; devuelve las opciones efectivas."""
+    opts = {**DEFAULTS, **(getattr(config, "METRICS", None) or {})}
+    configure(opts["enabled"])
+    return opts
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def timer(stage: str):
+    """Context manager que mide el bloque en la etapa `stage` (nulo si está desactivado)."""
+    return _Timer(stage) if _enabled else _NULL
+
+
+def observe(stage: str, seconds: float) -> None:
+    if not _enabled:
+        return
+    samples = _samples.get(stage)
+    if samples is None:
+        with _lock:
+            samples = _samples.setdefault(stage, [])
+    samples.append(float(seconds))   # list.append es atómico con el GIL
+
+
+def incr(name: str, n: float = 1) -> None:
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def reset() -> None:
+    global _samples, _counters, _since
+    with _lock:
+        _samples, _counters, _since = {}, {}, time.time()
+
+
+# ─────────────────────────────────────────────────────────
+# Resumen
+# ─────────────────────────────────────────────────────────
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    """Percentil por rango más cercano (sin numpy: se usa con el import en frío)."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def summary(reset_window: bool = False) -> Dict[str, Any]:
+    """Resumen de la ventana; con reset_window la cierra en la misma sección crítica."""
+    global _samples, _counters, _since
+    with _lock:
+        samples = {k: list(v) for k, v in _samples.items()}
+        counters = dict(_counters)
+        since = _since
+        if reset_window:
+            _samples, _counters, _since = {}, {}, time.time()
+    stages: Dict[str, Dict[str, float]] = {}
+    for stage, values in sorted(samples.items()):
+        values.sort()
+        stages[stage] = {
+            "count": len(values),
+            "total_s": round(sum(values), 6),
+            **{f"p{int(q * 100)}_s": round(_quantile(values, q), 6) for q in QUANTILES},
+            "max_s": round(values[-1], 6) if values else 0.0,
+        }
+    return {"since": since, "until": time.time(), "stages": stages, "counters": counters}
+
+
+def prometheus_text(data: Dict[str, Any]) -> str:
+    lines = [
+        f"# HELP {PREFIX}_stage_seconds Duración por etapa en la última ventana de escaneo.",
+        f"# TYPE {PREFIX}_stage_seconds summary",
+    ]
+    for stage, st in data["stages"].items():
+        for q in QUANTILES:
+            lines.append(f'{PREFIX}_stage_seconds{{stage="{stage}",quantile="{q}"}} {st[f"p{int(q * 100)}_s"]}')
+        lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {st["total_s"]}')
+        lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {st["count"]}')
+    lines += [
+        f"# HELP {PREFIX}_events Contadores de la última ventana de escaneo.",
+        f"# TYPE {PREFIX}_events gauge",
+    ]
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f'{PREFIX}_events{{name="{name}"}} {value}')
+    lines += [
+        f"# HELP {PREFIX}_last_flush_timestamp_seconds Fin de la última ventana.",
+        f"# TYPE {PREFIX}_last_flush_timestamp_seconds gauge",
+        f"{PREFIX}_last_flush_timestamp_seconds {data['until']:.3f}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _atomic_write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)   # el textfile collector nunca ve un fichero a medias
+
+
+def flush(json_path: Optional[str] = None, prom_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Escribe el resumen de la ventana y vacía el registro (None si está desactivado)."""
+    if not _enabled:
+        return None
+    data = summary(reset_window=True)
+    if json_path:
+        _atomic_write(json_path, json.dumps(data, ensure_ascii=False, indent=2))
+    if prom_path:
+        _atomic_write(prom_path, prometheus_text(data))
+    return data
@@ -6,5 +6,9 @@ OUTPUT_DIR = Path(__file__).resolve().parents[1] / "output"
 # Directory where log and CSV files are stored
 LOGS_DIR = OUTPUT_DIR / "logs"
 
+# Trade journal (append-only CSV, system of record) and its Excel export
+JOURNAL_PATH = LOGS_DIR / "operaciones.csv"
+XLSX_PATH = LOGS_DIR / "operaciones.xlsx"
+
 # Configuration file path
 CONFIG_FILE = Path("config/settings.json")
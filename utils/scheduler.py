@@ -0,0 +1,116 @@
+# utils/scheduler.py
+# -*- coding: utf-8 -*-
+"""
+Planificador del modo daemon: despierta justo después de cada cierre de vela
+(UTC) y, opcionalmente, en ticks intradía.
+
+- Cierre diario: 00:00 UTC (+ close_delay_s para que Binance publique la vela).
+- Cierre semanal: el diario del lunes 00:00 UTC (las velas 1w de Binance
+  abren el lunes) se marca como "weekly".
+- Ticks: cada `tick_minutes` alineados a la medianoche UTC (60 → cada hora
+  en punto + delay). Si un tick coincide con un cierre, gana el cierre.
+
+Scheduler.run() duerme con un threading.Event, así stop() (p. ej. desde el
+manejador de SIGTERM) despierta al instante; el trabajo en curso termina
+antes de salir.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+logger = logging.getLogger("scheduler")
+
+CLOSE_KINDS = ("weekly", "daily")
+
+
+@dataclass(frozen=True)
+class Wakeup:
+    at: float          # epoch (s)
+    kind: str          # weekly | daily | tick | startup
+
+    @property
+    def is_close(self) -> bool:
+        return self.kind in CLOSE_KINDS
+
+
+def next_wakeup(now: float, tick_minutes: int = 0, close_delay_s: float = 30.0) -> Wakeup:
+    """Próximo despertar estrictamente posterior a `now`."""
+    dt = datetime.fromtimestamp(now, timezone.utc)
+    day0 = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    delay = timedelta(seconds=float(close_delay_s))
+
+    close_at = day0 + delay
+    if close_at.timestamp() <= now:
+        close_at += timedelta(days=1)
+    close_kind = "weekly" if (close_at - delay).weekday() == 0 else "daily"
+    best = Wakeup(close_at.timestamp(), close_kind)
+
+    if tick_minutes and tick_minutes > 0:
+        step = timedelta(minutes=int(tick_minutes))
+        n = int((dt - day0 - delay) / step) + 1 if dt >= day0 + delay else 0
+        tick_at = day0 + delay + n * step
+        while tick_at.timestamp() <= now:
+            tick_at += step
+        if tick_at.timestamp() < best.at:
+            best = Wakeup(tick_at.timestamp(), "tick")
+    return best
+
+
+class Scheduler:
+    def __init__(
+        self,
+        tick_minutes: int = 0,
+        close_delay_s: float = 30.0,
+        clock: Callable[[], float] = time.time,
+        max_sleep_s: float = 60.0,
+    ):
+        self.tick_minutes = int(tick_minutes or 0)
+        self.close_delay_s = float(close_delay_s)
+        self.clock = clock
+        self.max_sleep_s = float(max_sleep_s)   # re-evalúa el reloj (suspensión, ajustes NTP)
+        self.stop_event = threading.Event()
+        self.runs = 0
+
+    def stop(self, *_args) -> None:
+        """Pide la parada (firma compatible con signal.signal)."""
+        if not self.stop_event.is_set():
+            logger.info("Parada solicitada: se termina el ciclo en curso y se sale.")
+        self.stop_event.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_event.is_set()
+
+    def _sleep_until(self, at: float) -> bool:
+        """Duerme hasta `at`; False si se pidió parar antes."""
+        while True:
+            left = at - self.clock()
+            if left <= 0:
+                return not self.stopped
+            if self.stop_event.wait(min(left, self.max_sleep_s)):
+                return False
+
+    def run(self, job: Callable[[Wakeup], None], run_now: bool = True, max_runs: Optional[int] = None) -> None:
+        """Ejecuta `job(wakeup)` en cada despertar hasta stop() (o max_runs)."""
+        pending: Optional[Wakeup] = Wakeup(self.clock(), "startup") if run_now else None
+        while not self.stopped:
+            if pending is None:
+                pending = next_wakeup(self.clock(), self.tick_minutes, self.close_delay_s)
+                at = datetime.fromtimestamp(pending.at, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+                logger.info(f"Próximo ciclo ({pending.kind}) a las {at} UTC")
+                if not self._sleep_until(pending.at):
+                    break
+            try:
+                job(pending)
+            except Exception as e:
+                logger.error(f"Ciclo {pending.kind} fallido: {e}")
+            pending = None
+            self.runs += 1
+            if max_runs is not None and self.runs >= max_runs:
+                break
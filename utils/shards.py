@@ -0,0 +1,160 @@
+# utils/shards.py
+# -*- coding: utf-8 -*-
+"""
+Escaneo por particiones (shards) con fusión posterior.
+
+- Cada worker (`python main.py --shard i/N`) toma la partición
+  sha1(símbolo) % N del universo, descarga y analiza, y escribe un shard
+  compacto: candidatos (sin recorte por cooldown/cupo), lote transversal,
+  klines de los símbolos con seguimiento abierto y contadores.
+- El coordinador (`python main.py --merge N`) espera los N shards del mismo
+  `scan_id`, los fusiona y aplica UNA vez top N, cooldown, cupo diario,
+  anti-spam y entrega (main._finalize). También deja en priority.json los
+  scores del scan, que los workers usan para ordenar el siguiente, y en
+  open_signals.json los símbolos con seguimiento abierto, cuyas klines
+  deben incluir los workers en su shard.
+
+Sirve entre procesos de una máquina y entre máquinas que comparten un
+directorio: la partición usa sha1 (estable entre procesos y hosts, a
+diferencia de hash()), cada shard se escribe a un temporal y se publica con
+os.replace, y el coordinador sólo lee ficheros completos. El estado (outbox,
+cooldowns, tracker) lo toca sólo el coordinador.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("shards")
+
+SHARD_DIR = os.path.join("output", "shards")
+FORMAT_VERSION = 1
+PRIORITY_FILE = "priority.json"
+OPEN_FILE = "open_signals.json"
+
+
+def shard_of(symbol: str, count: int) -> int:
+    """Partición determinista de un símbolo (igual en cualquier proceso o host)."""
+    digest = hashlib.sha1(symbol.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % max(1, int(count))
+
+
+def partition(symbols: List[str], index: int, count: int) -> List[str]:
+    return [s for s in symbols if shard_of(s, count) == index]
+
+
+def parse_spec(spec: str) -> Tuple[int, int]:
+    """'2/4' → (2, 4), con 0 <= i < N."""
+    try:
+        i, n = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard inválido '{spec}': se espera i/N") from None
+    if n < 1 or not 0 <= i < n:
+        raise ValueError(f"Shard inválido '{spec}': se espera 0 <= i < N")
+    return i, n
+
+
+def default_scan_id(now: Optional[float] = None, minutes: int = 60) -> str:
+    """Id de ronda común a workers y coordinador: la hora UTC truncada a `minutes`."""
+    ts = time.time() if now is None else float(now)
+    step = max(1, int(minutes)) * 60
+    return datetime.fromtimestamp(ts - ts % step, timezone.utc).strftime("%Y%m%dT%H%M")
+
+
+def shard_path(shard_dir: str, scan_id: str, index: int, count: int) -> str:
+    return os.path.join(shard_dir, scan_id, f"shard-{index:03d}-of-{count:03d}.pkl.gz")
+
+
+def write_shard(shard_dir: str, scan_id: str, index: int, count: int, payload: Dict[str, Any]) -> str:
+    path = shard_path(shard_dir, scan_id, index, count)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {"version": FORMAT_VERSION, "scan_id": scan_id, "index": index, "count": count,
+            "ts": time.time(), **payload}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return path
+
+
+def load_shards(
+    shard_dir: str, scan_id: str, count: int, wait_s: float = 0.0, poll_s: float = 1.0,
+) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """
+    Espera hasta `wait_s` a que estén los `count` shards del scan. Devuelve
+    (shards leídos, índices que faltan).
+    """
+    deadline = time.time() + max(0.0, float(wait_s))
+    loaded: Dict[int, Dict[str, Any]] = {}
+    while True:
+        for i in range(count):
+            if i in loaded:
+                continue
+            path = shard_path(shard_dir, scan_id, i, count)
+            if not os.path.exists(path):
+                continue
+            try:
+                with gzip.open(path, "rb") as f:
+                    data = pickle.load(f)
+            except Exception as e:
+                logger.error(f"Shard ilegible {path}: {e}")
+                continue
+            if data.get("version") != FORMAT_VERSION:
+                logger.error(f"Shard {path} con versión {data.get('version')} (esperada {FORMAT_VERSION})")
+                continue
+            loaded[i] = data
+        missing = [i for i in range(count) if i not in loaded]
+        if not missing or time.time() >= deadline:
+            return [loaded[i] for i in sorted(loaded)], missing
+        time.sleep(min(poll_s, max(0.0, deadline - time.time())))
+
+
+def _write_json(shard_dir: str, name: str, data: Any) -> None:
+    path = os.path.join(shard_dir, name)
+    os.makedirs(shard_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def read_priorities(shard_dir: str) -> Dict[str, float]:
+    """Scores del último scan fusionado (orden de análisis de los workers)."""
+    try:
+        with open(os.path.join(shard_dir, PRIORITY_FILE), "r", encoding="utf-8") as f:
+            return {str(k): float(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def write_priorities(shard_dir: str, scores: Dict[str, float]) -> None:
+    _write_json(shard_dir, PRIORITY_FILE, scores)
+
+
+def read_open_symbols(shard_dir: str) -> Set[str]:
+    """
+    Símbolos con señal abierta según el tracker del coordinador. Los workers
+    pueden correr en otro host: su tracker local no sirve para decidirlo.
+    """
+    try:
+        with open(os.path.join(shard_dir, OPEN_FILE), "r", encoding="utf-8") as f:
+            return {str(s) for s in json.load(f)}
+    except (OSError, ValueError, TypeError):
+        return set()
+
+
+def write_open_symbols(shard_dir: str, symbols: Set[str]) -> None:
+    _write_json(shard_dir, OPEN_FILE, sorted(symbols))
+
+
+def purge_scan(shard_dir: str, scan_id: str) -> None:
+    shutil.rmtree(os.path.join(shard_dir, scan_id), ignore_errors=True)
@@ -0,0 +1,253 @@
+# utils/snapshot.py
+# -*- coding: utf-8 -*-
+"""
+Grabación y reproducción (record/replay) de todas las entradas HTTP de un escaneo.
+
+Un snapshot es UN fichero comprimido (pickle + gzip) con:
+  - "http":   respuestas JSON de Binance (klines, exchangeInfo, ticker 24h)
+  - "frames": DataFrames de yfinance (macro VIX/DXY y contexto de mercado)
+  - "meta":   fecha de grabación y contadores
+
+Los módulos de datos llaman a fetch_json()/fetch_frame() con una clave
+estable (endpoint + parámetros) y una función que hace la petición real:
+
+  - sin snapshot activo → se llama a la función (comportamiento normal)
+  - modo "record"       → se llama y se guarda la respuesta (o el error)
+  - modo "replay"       → se devuelve lo grabado, sin red; si falta → SnapshotMiss
+
+Con un snapshot activo se saltan las cachés locales (disco/memoria) para que
+la grabación vea todas las respuestas y la reproducción no dependa de ellas.
+
+Uso típico (CLI):
+  python -m utils.snapshot record output/snapshots/scan.pkl.gz
+  python -m utils.snapshot replay output/snapshots/scan.pkl.gz --repeat 5 --out salida.json
+
+Nota: el formato es pickle; sólo deben cargarse snapshots propios (confiables).
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gzip
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("snapshot")
+
+SNAPSHOT_DIR = os.path.join("output", "snapshots")
+MODES = ("record", "replay")
+
+
+class SnapshotError(RuntimeError):
+    pass
+
+
+class SnapshotMiss(SnapshotError):
+    """La petición no está en el snapshot que se reproduce."""
+
+
+class _Failure:
+    """Error grabado: en replay se vuelve a lanzar como SnapshotError."""
+
+    def __init__(self, exc: BaseException) -> None:
+        self.kind = type(exc).__name__
+        self.msg = str(exc)
+
+
+def _key(parts: Any) -> str:
+    return json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+
+
+# ─────────────────────────────────────────────────────────
+# Snapshot
+# ─────────────────────────────────────────────────────────
+
+class Snapshot:
+    def __init__(self, path: str, mode: str) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Modo de snapshot desconocido: {mode}")
+        self.path = path
+        self.mode = mode
+        self.http: Dict[str, Any] = {}
+        self.frames: Dict[str, Any] = {}
+        self.meta: Dict[str, Any] = {}
+        self.misses: List[str] = []
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self._load()
+
+    # ---------- persistencia ----------
+    def _load(self) -> None:
+        with gzip.open(self.path, "rb") as f:
+            raw = pickle.load(f)
+        self.http = raw.get("http", {})
+        self.frames = raw.get("frames", {})
+        self.meta = raw.get("meta", {})
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.meta.update({"recorded_at": time.time(), "http": len(self.http), "frames": len(self.frames)})
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            pickle.dump({"meta": self.meta, "http": self.http, "frames": self.frames}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    # ---------- record / replay ----------
+    def _fetch(self, store: Dict[str, Any], parts: Any, fetch: Callable[[], Any]) -> Any:
+        key = _key(parts)
+        if self.mode == "replay":
+            with self._lock:
+                if key not in store:
+                    self.misses.append(key)
+                    raise SnapshotMiss(f"No grabado en snapshot: {key}")
+                value = store[key]
+            if isinstance(value, _Failure):
+                raise SnapshotError(f"{value.kind} (grabado): {value.msg}")
+            return value
+
+        try:
+            value = fetch()
+        except Exception as e:
+            with self._lock:
+                store[key] = _Failure(e)
+            raise
+        with self._lock:
+            store[key] = value
+        return value
+
+    def fetch_json(self, parts: Any, fetch: Callable[[], Any]) -> Any:
+        return self._fetch(self.http, parts, fetch)
+
+    def fetch_frame(self, parts: Any, fetch: Callable[[], Any]) -> Any:
+        value = self._fetch(self.frames, parts, fetch)
+        # Copia: quien llama puede mutar el DataFrame y la repetición debe ser idéntica
+        return value.copy() if hasattr(value, "copy") else value
+
+
+# ─────────────────────────────────────────────────────────
+# Snapshot activo (global del proceso)
+# ─────────────────────────────────────────────────────────
+
+_ACTIVE: Optional[Snapshot] = None
+
+
+def active() -> Optional[Snapshot]:
+    return _ACTIVE
+
+
+def fetch_json(parts: Any, fetch: Callable[[], Any]) -> Any:
+    snap = _ACTIVE
+    return fetch() if snap is None else snap.fetch_json(parts, fetch)
+
+
+def fetch_frame(parts: Any, fetch: Callable[[], Any]) -> Any:
+    snap = _ACTIVE
+    return fetch() if snap is None else snap.fetch_frame(parts, fetch)
+
+
+@contextlib.contextmanager
+def activate(path: str, mode: str) -> Iterator[Snapshot]:
+    """Activa un snapshot durante el bloque; en "record" se guarda al salir."""
+    global _ACTIVE
+    if _ACTIVE is not None:
+        raise SnapshotError("Ya hay un snapshot activo")
+    snap = Snapshot(path, mode)
+    _ACTIVE = snap
+    try:
+        yield snap
+    finally:
+        _ACTIVE = None
+        if mode == "record":
+            snap.save()
+            logger.info(f"Snapshot guardado en {path}: {len(snap.http)} HTTP, {len(snap.frames)} frames")
+
+
+def record(path: str) -> "contextlib.AbstractContextManager[Snapshot]":
+    return activate(path, "record")
+
+
+def replay(path: str) -> "contextlib.AbstractContextManager[Snapshot]":
+    return activate(path, "replay")
+
+
+# ─────────────────────────────────────────────────────────
+# Escaneo completo aislado (para la CLI)
+# ─────────────────────────────────────────────────────────
+
+def run_scan() -> List[str]:
+    """
+    Ejecuta main.run_once() con estado aislado (cooldowns/top/cupo/tracker en un
+    directorio temporal) y sin enviar a Telegram. Devuelve los mensajes que quedaron
+    en el outbox, para poder comparar salidas entre versiones del analizador.
+    """
+    import main
+    import logic.tracker as tracker
+    import notifier.outbox as outbox_mod
+
+    saved = {name: getattr(main, name) for name in
+             ("LAST_TOP_PATH", "SYMBOL_LOCK_PATH", "DAY_COUNT_PATH", "OUTBOX_PATH", "_start_delivery")}
+    saved_tracker = tracker.TRACKER_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            main.LAST_TOP_PATH = os.path.join(tmp, ".last_top.json")
+            main.SYMBOL_LOCK_PATH = os.path.join(tmp, ".symbol_last.json")
+            main.DAY_COUNT_PATH = os.path.join(tmp, ".day_count.json")
+            main.OUTBOX_PATH = os.path.join(tmp, "outbox.sqlite3")
+            main._start_delivery = lambda outbox: None
+            tracker.TRACKER_PATH = os.path.join(tmp, ".signal_tracker.json")
+            main.run_once()
+            cached = main._OUTBOXES.pop(main.OUTBOX_PATH, None)
+            if cached is not None:
+                cached.close()
+            # Lo que se habría enviado es lo que quedó encolado
+            ob = outbox_mod.Outbox(main.OUTBOX_PATH)
+            sent = [item.text for item in ob.claim(limit=10_000)]
+            ob.close()
+        finally:
+            for name, value in saved.items():
+                setattr(main, name, value)
+            tracker.TRACKER_PATH = saved_tracker
+    return sent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Graba o reproduce las entradas HTTP de un escaneo completo.")
+    parser.add_argument("mode", choices=MODES + ("info",))
+    parser.add_argument("path", help="Fichero de snapshot (.pkl.gz)")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeticiones en replay (para medir tiempos).")
+    parser.add_argument("--out", default=None, help="JSON con los mensajes generados (para diff).")
+    args = parser.parse_args()
+
+    if args.mode == "info":
+        snap = Snapshot(args.path, "replay")
+        print(json.dumps(snap.meta, indent=2, default=str))
+        return
+
+    runs = 1 if args.mode == "record" else max(1, args.repeat)
+    timings: List[float] = []
+    messages: List[str] = []
+    for _ in range(runs):
+        with activate(args.path, args.mode) as snap:
+            t0 = time.perf_counter()
+            messages = run_scan()
+            timings.append(time.perf_counter() - t0)
+        if snap.misses:
+            print(f"Aviso: {len(snap.misses)} peticiones no estaban en el snapshot")
+
+    print(f"{args.mode}: {len(messages)} señales | "
+          f"min {min(timings):.3f}s | max {max(timings):.3f}s | n={len(timings)}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(messages, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# utils/state_store.py
+# -*- coding: utf-8 -*-
+"""
+Almacén clave-valor embebido (SQLite en modo WAL) para el estado del bot:
+cooldowns por símbolo, cupo diario, hash del último top, cooldown del Sender…
+
+- Una fila por clave (ns, key): cada actualización es O(1), sin reescribir
+  ficheros JSON completos.
+- TTL por clave (`expires_at`): lo caducado no se devuelve y purge() lo borra,
+  así el estado no crece con cada símbolo o día que pasa.
+- transaction(): varias escrituras en un único commit; es reentrante, de modo
+  que el outbox (notifier.outbox) comparte conexión y transacción con él.
+
+Los valores se guardan como JSON (str, números, dicts…).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+STATE_PATH = os.path.join("output", "logs", "state.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    ns         TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (ns, key)
+);
+CREATE INDEX IF NOT EXISTS kv_expiry ON kv (expires_at) WHERE expires_at IS NOT NULL;
+"""
+
+_ALIVE = "(expires_at IS NULL OR expires_at > ?)"
+
+
+class StateStore:
+    def __init__(self, path: str = STATE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Conexión compartida entre hilos (p. ej. callbacks de entrega): se
+        # serializa con un RLock, que también hace reentrante transaction()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        self._depth = 0
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(_SCHEMA)
+        self.purge()
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transacción de escritura (BEGIN IMMEDIATE); las anidadas se unen a la exterior."""
+        with self.lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self.conn
+                finally:
+                    self._depth -= 1
+                return
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self.conn.execute("COMMIT")
+            finally:
+                self._depth = 0
+
+    # ---------- lectura ----------
+    def get(self, ns: str, key: str, default: Any = None, now: Optional[float] = None) -> Any:
+        now = time.time() if now is None else float(now)
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT value FROM kv WHERE ns = ? AND key = ? AND {_ALIVE}", (ns, key, now)
+            ).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def items(self, ns: str, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else float(now)
+        with self.lock:
+            rows = self.conn.execute(f"SELECT key, value FROM kv WHERE ns = ? AND {_ALIVE}", (ns, now)).fetchall()
+        return {r["key"]: json.loads(r["value"]) for r in rows}
+
+    # ---------- escritura ----------
+    def set(self, ns: str, key: str, value: Any, ttl: Optional[float] = None, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else float(now)
+        expires = None if ttl is None else now + float(ttl)
+        with self.transaction() as c:
+            c.execute(
+                "INSERT INTO kv (ns, key, value, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(ns, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (ns, key, json.dumps(value, ensure_ascii=False), expires),
+            )
+
+    def incr(self, ns: str, key: str, n: int = 1, ttl: Optional[float] = None, now: Optional[float] = None) -> int:
+        """Suma `n` al contador (0 si no existe o caducó); el TTL se fija al crearlo."""
+        now = time.time() if now is None else float(now)
+        with self.transaction():
+            current = self.get(ns, key, None, now)
+            if current is None:
+                value = int(n)
+                self.set(ns, key, value, ttl, now)
+            else:
+                value = int(current) + int(n)
+                self.conn.execute("UPDATE kv SET value = ? WHERE ns = ? AND key = ?", (json.dumps(value), ns, key))
+        return value
+
+    def delete(self, ns: str, key: str) -> None:
+        with self.transaction() as c:
+            c.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key))
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Borra las claves caducadas; devuelve cuántas."""
+        now = time.time() if now is None else float(now)
+        with self.transaction() as c:
+            return c.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)).rowcount
@@ -2,11 +2,11 @@
 from __future__ import annotations
 
 import logging
-import time
 from typing import Any, Dict, Optional, List
 
 import requests
 import config
+from notifier.dispatcher import api_url
 
 # ───────────────────────── helpers ─────────────────────────
 
@@ -71,26 +71,23 @@ def _format_signal_text(s: Dict) -> str:
 
 class TelegramNotifier:
     def __init__(self, token: str, chat_id: str, timeout: int = 15):
-        self.base = f"https://api.telegram.org/bot{token}/sendMessage"
+        self.token = token
         self.chat_id = chat_id
         self.timeout = timeout
 
     def send_signal(self, signal: Dict, retry: int = 2) -> bool:
-        text = _format_signal_text(signal)
-        payload = {
-            "chat_id": str(self.chat_id),
-            "text": text,
-            "parse_mode": "Markdown",
-        }
-        for i in range(retry + 1):
-            try:
-                r = requests.post(self.base, json=payload, timeout=self.timeout)
-                if r.ok:
-                    return True
-            except Exception as e:
-                logging.warning("Fallo envío Telegram (intento %s): %s", i + 1, e)
-            time.sleep(1 + i)
-        return False
+        from notifier.dispatcher import OutboundMessage, get_dispatcher
+
+        msg = OutboundMessage(
+            chat_id=str(self.chat_id),
+            text=_format_signal_text(signal),
+            parse_mode="Markdown",
+            disable_web_page_preview=False,
+        )
+        result = get_dispatcher(self.token).submit(msg, max_attempts=retry + 1).result()
+        if not result.ok:
+            logging.warning("Fallo envío Telegram tras %s intentos: %s", result.attempts, result.error)
+        return result.ok
 
 # ───────────────────────── wrappers de compatibilidad ─────────────────────────
 
@@ -144,7 +141,22 @@ def enviar_telegram(
         logging.error("Faltan credenciales de Telegram")
         return
 
-    url = f"https://api.telegram.org/bot{config.TELEGRAM_TOKEN}/sendMessage"
+    # Por defecto no bloquea: el mensaje queda en el despachador compartido
+    # (notifier.dispatcher) y se entrega en segundo plano / al salir del proceso
+    if bool(getattr(config, "TELEGRAM_ASYNC", True)):
+        from notifier.dispatcher import OutboundMessage, get_dispatcher
+
+        get_dispatcher(config.TELEGRAM_TOKEN).submit(OutboundMessage(
+            chat_id=str(config.TELEGRAM_CHAT_ID),
+            text=texto,
+            parse_mode=parse_mode,
+            disable_notification=disable_notification,
+            thread_id=thread_id,
+            disable_web_page_preview=False,
+        ))
+        return
+
+    url = api_url(config.TELEGRAM_TOKEN, "sendMessage")
     payload = {
         "chat_id": str(config.TELEGRAM_CHAT_ID),
         "text": texto,
@@ -165,13 +177,19 @@ def enviar_telegram_con_botones(
     botones: List[str],
     parse_mode: str = "Markdown",
     thread_id: Optional[int] = None,
+    symbol: Optional[str] = None,
+    operacion: Optional[Dict[str, Any]] = None,
 ) -> str:
-    """Envía mensaje con botones inline. Devuelve el message_id si tuvo éxito."""
+    """
+    Envía mensaje con botones inline. Devuelve el message_id si tuvo éxito.
+    Con `symbol` + `operacion`, la operación queda pendiente de decisión en el
+    StateStore (notifier.webhook.PendingOps) para que el webhook la encuentre.
+    """
     if not getattr(config, "TELEGRAM_TOKEN", None) or not getattr(config, "TELEGRAM_CHAT_ID", None):
         logging.error("Faltan credenciales de Telegram")
         return ""
 
-    url = f"https://api.telegram.org/bot{config.TELEGRAM_TOKEN}/sendMessage"
+    url = api_url(config.TELEGRAM_TOKEN, "sendMessage")
     keyboard = [[{"text": b, "callback_data": b}] for b in botones]
     payload = {
         "chat_id": str(config.TELEGRAM_CHAT_ID),
@@ -186,17 +204,25 @@ def enviar_telegram_con_botones(
         resp = requests.post(url, json=payload, timeout=15)
         resp.raise_for_status()
         data = resp.json()
-        return str(data.get("result", {}).get("message_id", ""))
+        message_id = str(data.get("result", {}).get("message_id", ""))
     except Exception as e:
         logging.error(f"Error enviando mensaje con botones: {e}")
         return ""
+    if symbol and operacion is not None:
+        try:
+            from notifier.webhook import PendingOps
+
+            PendingOps().add(symbol, operacion, message_id)
+        except Exception as e:
+            logging.error(f"No se pudo registrar la operación pendiente de {symbol}: {e}")
+    return message_id
 
 def responder_callback(callback_id: str, text: str) -> None:
     """Confirma el callback en Telegram (cuando uses webhooks)."""
     if not getattr(config, "TELEGRAM_TOKEN", None):
         logging.error("Faltan credenciales de Telegram")
         return
-    url = f"https://api.telegram.org/bot{config.TELEGRAM_TOKEN}/answerCallbackQuery"
+    url = api_url(config.TELEGRAM_TOKEN, "answerCallbackQuery")
     payload = {"callback_query_id": callback_id, "text": text}
     try:
         resp = requests.post(url, data=payload, timeout=10)
@@ -0,0 +1,204 @@
+# utils/yf_cache.py
+# -*- coding: utf-8 -*-
+"""
+Capa de datos yfinance por lotes con caché en disco.
+
+- Una sola llamada yf.download por intervalo para TODOS los tickers que haya
+  que refrescar (multi-ticker, group_by="ticker").
+- Cada (ticker, intervalo) se guarda como pickle OHLCV float64 en
+  output/.cache/yf; la frescura se mide con el mtime y un TTL por intervalo
+  (YF_CACHE_TTL en settings, en segundos).
+- Refresco incremental: si hay caché caducada sólo se piden las velas desde la
+  última guardada (se re-descarga esa vela, que pudo estar en formación) y se
+  anexan; sólo los tickers sin caché piden el `period` completo.
+
+Con utils.snapshot activo (record/replay) no se lee ni se escribe la caché.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from utils import snapshot
+
+logger = logging.getLogger("yf_cache")
+
+CACHE_DIR = os.path.join("output", ".cache", "yf")
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# TTL por intervalo (s): la vela diaria de cripto cambia durante el día
+DEFAULT_TTL = {"1d": 3600, "1wk": 6 * 3600}
+
+
+def _ttl(interval: str) -> float:
+    try:
+        import config
+
+        table = {**DEFAULT_TTL, **(getattr(config, "YF_CACHE_TTL", None) or {})}
+    except Exception:
+        table = DEFAULT_TTL
+    return float(table.get(interval, 3600))
+
+
+def _path(ticker: str, interval: str) -> str:
+    safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in ticker)
+    return os.path.join(CACHE_DIR, f"{safe}_{interval}.pkl")
+
+
+def _read(ticker: str, interval: str) -> Optional[pd.DataFrame]:
+    try:
+        return pd.read_pickle(_path(ticker, interval))
+    except Exception:
+        return None
+
+
+def _write(ticker: str, interval: str, df: pd.DataFrame) -> None:
+    path = _path(ticker, interval)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.debug(f"No se pudo escribir caché {path}: {e}")
+
+
+def _touch(ticker: str, interval: str) -> None:
+    """Renueva el mtime de la entrada (el TTL vuelve a contar) sin reescribirla."""
+    try:
+        os.utime(_path(ticker, interval))
+    except OSError as e:
+        logger.debug(f"No se pudo renovar caché {ticker} {interval}: {e}")
+
+
+def _is_fresh(ticker: str, interval: str) -> bool:
+    try:
+        return time.time() - os.stat(_path(ticker, interval)).st_mtime < _ttl(interval)
+    except OSError:
+        return False
+
+
+def _period_days(period: str) -> Optional[int]:
+    p = period.strip().lower()
+    units = {"d": 1, "wk": 7, "mo": 30, "y": 365}
+    for suffix, mult in units.items():
+        if p.endswith(suffix) and p[: -len(suffix)].isdigit():
+            return int(p[: -len(suffix)]) * mult
+    return None
+
+
+def _trim(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    days = _period_days(period)
+    if days is None or df.empty:
+        return df
+    return df[df.index >= df.index[-1] - pd.Timedelta(days=days)]
+
+
+def _split(raw: Optional[pd.DataFrame], tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    """Separa el DataFrame multi-ticker en un OHLCV por ticker."""
+    out: Dict[str, pd.DataFrame] = {}
+    if raw is None or raw.empty:
+        return out
+    for t in tickers:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if t not in raw.columns.get_level_values(0):
+                continue
+            df = raw[t]
+        else:
+            df = raw
+        df = df[[c for c in COLUMNS if c in df.columns]].astype(float).dropna(how="all")
+        if not df.empty:
+            out[t] = df
+    return out
+
+
+def _download(tickers: List[str], interval: str, period: Optional[str] = None,
+              start: Optional[str] = None) -> Optional[pd.DataFrame]:
+    import yfinance as yf  # import diferido: en caché caliente no se carga yfinance
+
+    kwargs = {"start": start} if start else {"period": period}
+    return snapshot.fetch_frame(
+        ("yf.download", sorted(tickers), interval, kwargs),
+        lambda: yf.download(
+            tickers,
+            interval=interval,
+            group_by="ticker",
+            progress=False,
+            auto_adjust=False,
+            threads=True,
+            **kwargs,
+        ),
+    )
+
+
+def _safe_download(tickers: List[str], interval: str, **kwargs) -> Optional[Dict[str, pd.DataFrame]]:
+    """{ticker: OHLCV} de la descarga; None si falló (distinto de "sin filas")."""
+    try:
+        return _split(_download(tickers, interval, **kwargs), tickers)
+    except Exception as e:
+        logger.error(f"Error descargando {tickers} {interval}: {e}")
+        return None
+
+
+def get_frames(tickers: Iterable[str], interval: str, period: str = "400d") -> Dict[str, pd.DataFrame]:
+    """
+    OHLCV por ticker ({ticker: DataFrame}); los tickers sin datos no aparecen.
+    Como mucho dos descargas por llamada: tickers nuevos (period) y caducados (start).
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if snapshot.active() is not None:
+        return {t: _trim(df, period) for t, df in (_safe_download(tickers, interval, period=period) or {}).items()}
+
+    frames: Dict[str, pd.DataFrame] = {}
+    cold: List[str] = []
+    stale: Dict[str, pd.DataFrame] = {}
+    for t in tickers:
+        df = _read(t, interval)
+        if df is None or df.empty:
+            cold.append(t)
+        elif _is_fresh(t, interval):
+            frames[t] = df
+        else:
+            stale[t] = df
+
+    if cold:
+        for t, df in (_safe_download(cold, interval, period=period) or {}).items():
+            _write(t, interval, df)
+            frames[t] = df
+
+    if stale:
+        since = min(df.index[-1] for df in stale.values())
+        fresh = _safe_download(list(stale), interval, start=since.strftime("%Y-%m-%d"))
+        for t, old in stale.items():
+            new = None if fresh is None else fresh.get(t)
+            if new is None or new.empty:
+                # Se sirve lo guardado. Sólo si la descarga respondió sin filas
+                # nuevas (p. ej. ^VIX/DX=F en fin de semana) se renueva la entrada;
+                # tras un error sigue caducada y se reintenta en la siguiente llamada
+                if fresh is not None:
+                    _touch(t, interval)
+                frames[t] = old
+                continue
+            merged = pd.concat([old[old.index < new.index[0]], new])
+            merged = _trim(merged[~merged.index.duplicated(keep="last")], period)
+            _write(t, interval, merged)
+            frames[t] = merged
+
+    return {t: _trim(frames[t], period) for t in tickers if t in frames}
+
+
+def get_frame(ticker: str, interval: str, period: str = "400d",
+              group: Optional[Iterable[str]] = None, fetch_period: Optional[str] = None) -> pd.DataFrame:
+    """
+    OHLCV de un ticker recortado a `period`. Si hay que descargar, se refresca a
+    la vez todo `group` (mismo intervalo) con `fetch_period` (por defecto `period`)
+    para que las siguientes llamadas del grupo salgan de caché.
+    """
+    tickers = [ticker] + [t for t in (group or []) if t != ticker]
+    df = get_frames(tickers, interval, fetch_period or period).get(ticker)
+    return pd.DataFrame() if df is None else _trim(df, period)